@@ -0,0 +1,170 @@
+"""
+Vectorized statistics for many digit sequences at once.
+
+Sequences are concatenated into one flat array with a sequence id per
+element, so frequencies, transition matrices, run lengths, gap statistics
+and entropy for every sequence come out of a handful of bincount and
+ufunc.at calls instead of a Python loop per sequence.
+"""
+import csv
+import io
+
+import numpy as np
+
+from predictions import NUM_DIGITS
+from storage import parse_timestamp
+
+# Separates sequences in a packed-bytes upload
+PACKED_SEPARATOR = 0xFF
+
+
+def _flatten(sequences):
+    """Concatenate sequences into (digits, sequence ids, lengths), dropping values outside 0-9."""
+    cleaned = []
+    for seq in sequences:
+        arr = np.asarray(seq, dtype=np.int64)
+        if arr.ndim != 1:
+            raise ValueError("Each sequence must be a flat list of digits")
+        cleaned.append(arr[(arr >= 0) & (arr <= 9)])
+    lengths = np.array([len(arr) for arr in cleaned], dtype=np.int64)
+    digits = np.concatenate(cleaned) if cleaned else np.zeros(0, dtype=np.int64)
+    seq_ids = np.repeat(np.arange(len(cleaned)), lengths)
+    return digits, seq_ids, lengths
+
+
+def _nan_to_none(values):
+    return [None if np.isnan(v) else round(float(v), 4) for v in values]
+
+
+def analyze_sequences(sequences):
+    """Per-sequence stats for a list of digit sequences."""
+    digits, seq_ids, lengths = _flatten(sequences)
+    k = len(lengths)
+    n = len(digits)
+
+    frequency = np.bincount(seq_ids * NUM_DIGITS + digits, minlength=k * NUM_DIGITS).reshape(k, NUM_DIGITS)
+    sums = np.bincount(seq_ids, weights=digits, minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(lengths > 0, sums / np.maximum(lengths, 1), 0)
+
+    # Transitions between neighbours of the same sequence
+    same = seq_ids[1:] == seq_ids[:-1]
+    pair_codes = (seq_ids[1:] * NUM_DIGITS + digits[:-1]) * NUM_DIGITS + digits[1:]
+    transitions = np.bincount(
+        pair_codes[same], minlength=k * NUM_DIGITS * NUM_DIGITS
+    ).reshape(k, NUM_DIGITS, NUM_DIGITS)
+
+    # Runs of the same digit
+    starts = np.flatnonzero(np.concatenate(([True], (digits[1:] != digits[:-1]) | ~same))) if n else np.zeros(0, int)
+    run_lengths = np.diff(np.append(starts, n))
+    run_seq = seq_ids[starts]
+    run_count = np.bincount(run_seq, minlength=k)
+    run_max = np.zeros(k, dtype=np.int64)
+    np.maximum.at(run_max, run_seq, run_lengths)
+
+    # Gaps between successive occurrences of each digit within a sequence
+    positions = np.arange(n) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    order = np.lexsort((positions, digits, seq_ids))
+    group = seq_ids[order] * NUM_DIGITS + digits[order]
+    pos = positions[order]
+    same_group = group[1:] == group[:-1]
+    gaps = (pos[1:] - pos[:-1])[same_group]
+    gap_group = group[1:][same_group]
+    gap_count = np.bincount(gap_group, minlength=k * NUM_DIGITS)
+    gap_sum = np.bincount(gap_group, weights=gaps, minlength=k * NUM_DIGITS)
+    gap_max = np.zeros(k * NUM_DIGITS, dtype=np.int64)
+    np.maximum.at(gap_max, gap_group, gaps)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gap_mean = (gap_sum / gap_count).reshape(k, NUM_DIGITS)
+    gap_max = np.where(gap_count > 0, gap_max, -1).reshape(k, NUM_DIGITS)
+
+    # Draws since each digit was last seen
+    last_pos = np.full(k * NUM_DIGITS, -1, dtype=np.int64)
+    np.maximum.at(last_pos, seq_ids * NUM_DIGITS + digits, positions)
+    last_pos = last_pos.reshape(k, NUM_DIGITS)
+    since_last = np.where(last_pos >= 0, lengths[:, None] - 1 - last_pos, -1)
+
+    # Shannon entropy of the digit distribution
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = frequency / np.maximum(lengths, 1)[:, None]
+        entropy = -np.where(p > 0, p * np.log2(p), 0).sum(axis=1)
+
+    ends = np.cumsum(lengths) - 1
+    results = []
+    for i in range(k):
+        results.append({
+            'count': int(lengths[i]),
+            'mean': round(float(mean[i]), 2),
+            'frequency': frequency[i].tolist(),
+            'last_digit': int(digits[ends[i]]) if lengths[i] else None,
+            'transitions': transitions[i].tolist(),
+            'runs': {
+                'count': int(run_count[i]),
+                'max': int(run_max[i]),
+                'mean': round(float(lengths[i] / run_count[i]), 4) if run_count[i] else None
+            },
+            'gaps': {
+                'mean': _nan_to_none(gap_mean[i]),
+                'max': [int(g) if g >= 0 else None for g in gap_max[i]],
+                'since_last': [int(g) if g >= 0 else None for g in since_last[i]]
+            },
+            'entropy': round(float(entropy[i]), 4),
+            'normalized_entropy': round(float(entropy[i] / np.log2(NUM_DIGITS)), 4)
+        })
+    return results
+
+
+def parse_packed(payload):
+    """Packed upload: one uint8 digit per byte, sequences separated by 0xFF."""
+    raw = np.frombuffer(payload, dtype=np.uint8)
+    if len(raw) and raw[-1] == PACKED_SEPARATOR:
+        raw = raw[:-1]
+    parts = np.split(raw, np.flatnonzero(raw == PACKED_SEPARATOR))
+    return [part[part != PACKED_SEPARATOR] for part in parts]
+
+
+def parse_csv(text, group_by=None):
+    """
+    CSV upload.
+
+    A scraped-data CSV (Number,Date,Time columns) becomes one sequence per
+    day or hour when `group_by` is 'day' or 'hour' (one sequence overall
+    otherwise), oldest draw first and "NOT OPEN" rows skipped. Any other CSV
+    is read as one sequence of digits per line.
+    """
+    reader = csv.reader(io.StringIO(text))
+    rows = [row for row in reader if row]
+    if not rows:
+        return [], None
+
+    header = [h.strip() for h in rows[0]]
+    if {'Number', 'Date', 'Time'} <= set(header):
+        ni, di, ti = header.index('Number'), header.index('Date'), header.index('Time')
+        width = max(ni, di, ti) + 1
+        draws = []
+        for row in rows[1:]:
+            if len(row) < width:
+                continue
+            number = row[ni].strip()
+            ts = parse_timestamp(row[di], row[ti])
+            # isdigit() would also take superscripts such as '²'
+            if ts is not None and len(number) == 1 and number in '0123456789':
+                draws.append((ts, int(number)))
+        draws.sort()
+
+        groups = {}
+        for ts, digit in draws:
+            if group_by == 'hour':
+                label = ts.strftime('%Y-%m-%d %H:00')
+            elif group_by == 'day':
+                label = ts.strftime('%Y-%m-%d')
+            else:
+                label = 'all'
+            groups.setdefault(label, []).append(digit)
+        return list(groups.values()), list(groups.keys())
+
+    sequences = []
+    for row in rows:
+        cells = (cell.strip() for cell in row)
+        sequences.append([int(c) for c in cells if len(c) == 1 and c in '0123456789'])
+    return sequences, None
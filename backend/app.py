@@ -1,15 +1,23 @@
 from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import os
-import pytesseract
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-import cv2
-import time
-import pandas as pd
 import datetime
 import json
+import hashlib
+from predictions import to_series, ensemble_prediction
+from analysis import analyze_sequences, parse_csv, parse_packed
+from data_codec import compress, dumps, encode_arrays
+from model_state import DatasetEvicted, get_model, drop_model
+from dependency_probe import probe as dependency_probe
+from driver_pool import pool as driver_pool, PoolTimeout
+from jobs import QueueFull, SlotBusy, manager as scrape_jobs, sse_events
+from metrics import registry as metrics
+from series_cache import get_series_cache, since as series_since
+from storage import get_store, to_epoch
+
+# The scrape stack (scraper, captcha: Selenium, OpenCV, pytesseract) is
+# imported where it's used, so starting the app and serving analysis
+# requests doesn't wait for it
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -22,22 +30,91 @@ CORS(app, resources={r"/api/*": {"origins": "*"}})
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
 os.makedirs(DATA_DIR, exist_ok=True)
 
+def _queue_gauges():
+    pool_stats = driver_pool.stats()
+    for state in ('idle', 'leased'):
+        yield 'driver_pool_sessions', {'state': state}, pool_stats[state]
+    yield 'driver_pool_size', {}, pool_stats['size']
+    yield 'driver_pool_waiting', {}, pool_stats['waiting']
+    for event in ('created', 'recycled', 'unhealthy', 'timeouts', 'leases'):
+        yield 'driver_pool_events', {'event': event}, pool_stats[event]
+    for status, count in scrape_jobs.stats().items():
+        yield 'scrape_jobs', {'status': status}, count
+
+
+metrics.register_gauge(_queue_gauges)
+
+
+@app.errorhandler(DatasetEvicted)
+def dataset_evicted(e):
+    return jsonify({
+        'error': f"Dataset {e} was evicted to stay under MAX_DATASETS; DELETE it to start over"
+    }), 404
+
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
+    """Liveness: the process is up and serving requests."""
     return jsonify({
         'status': 'healthy',
         'message': 'Backend is running'
     })
 
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness: 503 until the background dependency check has finished, then
+    200 with whether this instance can scrape (analysis works either way).
+    """
+    deps = dependency_probe.status()
+    if deps['checked_at'] is None:
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({
+        'status': 'ready',
+        'scrape': bool(deps.get('modules') and deps.get('tesseract') and deps.get('chrome_driver')),
+        'dependencies': deps
+    })
+
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_data():
     """
     Endpoint to analyze number patterns.
+
+    If "dataset" is given, the numbers are appended to that dataset's
+    persistent model state and the stats cover its whole history.
+
+    Batch mode analyzes many sequences in one call. Send one of:
+    - JSON {"sequences": [[3, 7, 1, ...], ...]}
+    - a CSV body (text/csv) or multipart "file" upload; scraped-data CSVs
+      are split per day or hour with ?group_by=day|hour
+    - packed bytes (application/octet-stream): one digit per byte, 0xFF
+      between sequences
+    and get {"results": [...]} with frequencies, transition matrices, run
+    lengths, gap statistics and entropy per sequence.
     """
+    if not request.is_json:
+        return _analyze_upload()
+
     data = request.get_json()
     numbers = data.get('numbers', [])
+    dataset = data.get('dataset')
+
+    if 'sequences' in data:
+        try:
+            return _batch_response(data['sequences'])
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'error': 'Sequences must be lists of integers'}), 400
+
+    if dataset:
+        model = get_model(dataset)
+        try:
+            with model.lock:
+                model.extend(to_series(numbers))
+                return jsonify(model.summary())
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'error': 'Numbers must be integers'}), 400
 
     if not numbers:
         return jsonify({'error': 'No numbers provided'}), 400
@@ -57,385 +134,217 @@ def analyze_data():
     })
 
 
-@app.route('/api/scrape', methods=['POST'])
-def scrape_data():
+def _batch_response(sequences, labels=None):
+    if not sequences:
+        return jsonify({'error': 'No sequences provided'}), 400
+    results = analyze_sequences(sequences)
+    if labels:
+        for label, result in zip(labels, results):
+            result['label'] = label
+    return jsonify({'sequences': len(results), 'results': results})
+
+
+def _analyze_upload():
+    """Batch analysis of a CSV or packed-bytes upload."""
+    group_by = request.args.get('group_by')
+    if group_by not in (None, 'day', 'hour'):
+        return jsonify({'error': 'group_by must be day or hour'}), 400
+
+    upload = request.files.get('file')
+    if upload is not None:
+        payload = upload.read()
+        is_packed = upload.mimetype == 'application/octet-stream' and not upload.filename.endswith('.csv')
+    else:
+        payload = request.get_data()
+        is_packed = request.mimetype == 'application/octet-stream'
+
+    if is_packed:
+        return _batch_response(parse_packed(payload))
+
+    try:
+        text = payload.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return jsonify({'error': 'CSV upload must be UTF-8 text'}), 400
+    sequences, labels = parse_csv(text, group_by)
+    return _batch_response(sequences, labels)
+
+
+@app.route('/api/datasets/<name>/draws', methods=['POST'])
+def append_draws(name):
     """
-    Endpoint to scrape data from playrep.pro using Selenium and OCR for captcha.
+    Append draws to a dataset's model state.
 
     Request body:
     {
-        "username": "your_user_id",
-        "password": "your_password",
-        "pages": 15  (optional, default 15)
+        "numbers": [3, 7, 1, ...]  (oldest first, newest last)
     }
     """
-    req_data = request.get_json()
-    username = req_data.get('username')
-    password = req_data.get('password')
-    max_pages = req_data.get('pages', 15)
-
-    if not username or not password:
-        return jsonify({'error': 'Username and password are required'}), 400
-
-    logs = []
-    driver = None
+    data = request.get_json()
+    numbers = data.get('numbers', [])
 
+    model = get_model(name)
     try:
-        logs.append("Starting Application: Ok")
+        with model.lock:
+            model.extend(to_series(numbers))
+            return jsonify(model.summary())
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'error': 'Numbers must be integers'}), 400
 
-        # Configure Chrome options for headless mode
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--window-size=1920,1080')
 
-        driver = webdriver.Chrome(options=chrome_options)
+@app.route('/api/datasets/<name>', methods=['DELETE'])
+def delete_dataset(name):
+    """Drop a dataset's model state."""
+    if not drop_model(name):
+        return jsonify({'error': 'Dataset not found'}), 404
+    return jsonify({'success': True})
 
-        # Open login page
-        driver.get("https://playrep.pro/Login.mvc")
-        time.sleep(2)
-
-        # Enter credentials
-        username_field = driver.find_element(By.ID, 'username')
-        username_field.send_keys(username)
-
-        password_field = driver.find_element(By.ID, "password")
-        password_field.send_keys(password)
-
-        # Take screenshot for captcha
-        screenshot_path = os.path.join(DATA_DIR, "ss.png")
-        driver.save_screenshot(screenshot_path)
-
-        # Process captcha using OCR
-        # Find CAPTCHA image elements to get correct coordinates
-        captcha_images = driver.find_elements(By.XPATH, "//img[contains(@src, 'CaptchaImage')]")
-        if captcha_images:
-            # Get the location and size of CAPTCHA images
-            first_img = captcha_images[0]
-            img_loc = first_img.location
-            img_size = first_img.size
-            # Calculate crop area (with some padding)
-            x1 = max(0, img_loc['x'] - 5)
-            y1 = max(0, img_loc['y'] - 5)
-            # If there are 2 captcha images, extend to include both
-            if len(captcha_images) > 1:
-                last_img = captcha_images[-1]
-                x2 = last_img.location['x'] + last_img.size['width'] + 5
-            else:
-                x2 = img_loc['x'] + img_size['width'] + 5
-            y2 = img_loc['y'] + img_size['height'] + 5
-        else:
-            # Fallback coordinates based on debug analysis
-            x1, y1, x2, y2 = 790, 355, 915, 395
-
-        img = cv2.cvtColor(cv2.imread(screenshot_path), cv2.COLOR_BGR2RGB)
-        img = img[int(y1):int(y2), int(x1):int(x2)]  # Crop captcha area
-        captcha_text = pytesseract.image_to_string(img, config='--psm 7')
-        captcha = ''.join(captcha_text.split())
-
-        # Enter captcha
-        captcha_field = driver.find_element(By.ID, "txtCaptcha")
-        captcha_field.send_keys(captcha)
-
-        # Click login button
-        driver.find_element(By.ID, "btnCheckLogin").click()
-        time.sleep(2)
-
-        # Navigate to data page
-        try:
-            ul = driver.find_element(By.XPATH, "//ul[@id='menu4']")
-            ul.find_element(By.XPATH, "//*[@id='menu4']/li[2]/a").click()
-            ul.find_element(By.XPATH, "//*[@id='menu4']/li[2]/ul/li[1]/a").click()
-            logs.append("Login Status: Ok")
-        except Exception:
-            logs.append("Login Status: Failed - Incorrect credentials or captcha")
-            return jsonify({'error': 'Login failed', 'logs': logs}), 401
 
-        time.sleep(3)
+@app.route('/api/predict', methods=['POST'])
+def predict():
+    """
+    Endpoint to run the ensemble prediction server-side.
 
-        # Click to show 100 records
-        try:
-            driver.find_element(
-                By.XPATH,
-                "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[2]/tbody/tr/td[14]/select/option[10]"
-            ).click()
-            logs.append("Data Loading: Ok")
-        except Exception:
-            logs.append("Data Loading: Failed - Not enough data present")
-            return jsonify({'error': 'Data loading failed', 'logs': logs}), 500
-
-        time.sleep(2)
-
-        # Get pagination info
-        nav_bar = driver.find_elements(
-            By.XPATH,
-            "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[2]/tbody/tr"
-        )[0].text.split(' ')
-        pages = len(nav_bar[-13::-1])
-        logs.append(f"{pages} pages found")
-
-        # Scrape data from pages
-        data = {"Number": [], "Date": [], "Time": []}
-
-        for num in range(1, min(max_pages + 1, pages + 1)):
-            try:
-                page_input = driver.find_element(
-                    By.XPATH,
-                    "//*[@id='dvFunTargettxtJqGridGoToPage']"
-                )
-                page_input.clear()
-                page_input.send_keys(num)
-
-                driver.find_element(
-                    By.XPATH,
-                    f"//*[@id='dvFunTarget']/table[2]/tbody/tr/td[{len(nav_bar) - 10 + 1}]/input[2]"
-                ).click()
-
-                row_count = 1 + len(driver.find_elements(
-                    By.XPATH,
-                    "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody/tr"
-                ))
-                col_count = len(driver.find_elements(
-                    By.XPATH,
-                    "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody/tr[1]/td"
-                ))
-
-                logs.append(f"Page {num}: {row_count}x{col_count}")
-
-                for r in range(1, row_count):
-                    number = driver.find_elements(
-                        By.XPATH,
-                        f"/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody/tr[{r}]/td[2]"
-                    )[0].text
-                    data['Number'].append(number)
-
-                    date_time = driver.find_elements(
-                        By.XPATH,
-                        f"/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody/tr[{r}]/td[3]"
-                    )[0].text
-                    data['Date'].append(date_time[:11])
-                    data['Time'].append(date_time[12:])
+    Request body:
+    {
+        "numbers": [3, 7, 1, ...]  (oldest first, newest last)
+    }
 
-            except Exception as e:
-                logs.append(f"Page {num} loaded with issues: {str(e)}")
+    "numbers" may be replaced by "dataset" to predict from a stored model state.
 
-        # Save to CSV
-        df = pd.DataFrame(data)
-        csv_filename = f"{str(datetime.datetime.now())[:10]}-Data.csv"
-        csv_path = os.path.join(DATA_DIR, csv_filename)
-        df.to_csv(csv_path, index=False)
-        logs.append(f"Dataset saved: {csv_filename}")
+    Returns the same object as calculateEnsemblePrediction in the frontend,
+    or null when fewer than 20 draws are provided.
+    """
+    data = request.get_json()
+    numbers = data.get('numbers', [])
+    dataset = data.get('dataset')
 
-        return jsonify({
-            'success': True,
-            'data': data,
-            'records': len(data['Number']),
-            'csv_file': csv_filename,
-            'logs': logs
-        })
+    if dataset:
+        model = get_model(dataset, create=False)
+        if model is None:
+            return jsonify({'error': 'Dataset not found'}), 404
+        with model.lock:
+            return jsonify(model.predict())
 
-    except Exception as e:
-        logs.append(f"Error: {str(e)}")
-        return jsonify({'error': str(e), 'logs': logs}), 500
+    if not numbers:
+        return jsonify({'error': 'No numbers provided'}), 400
 
-    finally:
-        if driver:
-            driver.quit()
+    try:
+        series = to_series(numbers)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'error': 'Numbers must be integers'}), 400
 
+    return jsonify(ensemble_prediction(series))
 
-@app.route('/api/scrape/stream', methods=['GET'])
-def scrape_stream():
+
+@app.route('/api/patterns', methods=['GET'])
+def patterns():
     """
-    SSE endpoint to scrape data with real-time log streaming.
-    Query params: username, password, pages (optional)
+    What followed a context in the stored draw history (see context_index).
+    Query params: context (optional, digits oldest first, e.g. "3,1,4"),
+    fuzzy (optional, also count contexts within +-1 at each position),
+    min_count (optional, default 1)
+
+    Without a context, answers for the newest draws at the highest order
+    seen at least min_count times (the variable-order Markov lookup).
     """
-    username = request.args.get('username')
-    password = request.args.get('password')
-    max_pages = int(request.args.get('pages', 15))
+    from context_index import get_series_index
 
-    def generate():
-        def send_log(message, log_type="info"):
-            data = json.dumps({"type": "log", "log_type": log_type, "message": message})
-            yield f"data: {data}\n\n"
+    try:
+        context = [int(d) for d in request.args['context'].split(',')] if request.args.get('context') else None
+        min_count = int(request.args.get('min_count', 1))
+    except ValueError:
+        return jsonify({'error': 'Invalid context or min_count parameter'}), 400
+    if context is not None and not all(0 <= d <= 9 for d in context):
+        return jsonify({'error': 'Context digits must be between 0 and 9'}), 400
+    fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+
+    index = get_series_index(DATA_DIR)
+    if context is None:
+        context, counts = index.longest_context(min_count)
+        if fuzzy and context:
+            counts = index.following(context, fuzzy=True)
+    else:
+        try:
+            counts = index.following(context, fuzzy)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        def send_error(message):
-            data = json.dumps({"type": "error", "message": message})
-            yield f"data: {data}\n\n"
+    total = int(counts.sum()) if counts is not None else 0
+    return jsonify({
+        'draws': index.length,
+        'context': context,
+        'order': len(context),
+        'fuzzy': fuzzy,
+        'counts': counts.tolist() if counts is not None else None,
+        'total': total,
+        'probabilities': (counts / total).tolist() if total else None
+    })
 
-        def send_complete(result_data):
-            data = json.dumps({"type": "complete", "data": result_data})
-            yield f"data: {data}\n\n"
 
-        if not username or not password:
-            yield from send_error("Username and password are required")
-            return
+def _parse_time_param(value):
+    """Epoch seconds from an ISO date/time or a plain epoch value."""
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return to_epoch(datetime.datetime.fromisoformat(value))
 
-        driver = None
-        try:
-            yield from send_log("Starting Application...", "info")
-            yield from send_log("Initializing Chrome browser", "info")
-
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--window-size=1920,1080')
-
-            driver = webdriver.Chrome(options=chrome_options)
-            yield from send_log("Chrome browser started", "success")
-
-            yield from send_log("Opening login page...", "info")
-            driver.get("https://playrep.pro/Login.mvc")
-            time.sleep(2)
-            yield from send_log("Login page loaded", "success")
-
-            yield from send_log("Entering credentials...", "info")
-            username_field = driver.find_element(By.ID, 'username')
-            username_field.send_keys(username)
-            password_field = driver.find_element(By.ID, "password")
-            password_field.send_keys(password)
-            yield from send_log("Credentials entered", "success")
-
-            yield from send_log("Processing CAPTCHA...", "info")
-            screenshot_path = os.path.join(DATA_DIR, "ss.png")
-            driver.save_screenshot(screenshot_path)
-
-            # Find CAPTCHA image elements to get correct coordinates
-            captcha_images = driver.find_elements(By.XPATH, "//img[contains(@src, 'CaptchaImage')]")
-            if captcha_images:
-                first_img = captcha_images[0]
-                img_loc = first_img.location
-                img_size = first_img.size
-                x1 = max(0, img_loc['x'] - 5)
-                y1 = max(0, img_loc['y'] - 5)
-                if len(captcha_images) > 1:
-                    last_img = captcha_images[-1]
-                    x2 = last_img.location['x'] + last_img.size['width'] + 5
-                else:
-                    x2 = img_loc['x'] + img_size['width'] + 5
-                y2 = img_loc['y'] + img_size['height'] + 5
-                yield from send_log(f"CAPTCHA found at ({x1},{y1}) to ({x2},{y2})", "info")
-            else:
-                x1, y1, x2, y2 = 790, 355, 915, 395
-                yield from send_log("Using fallback CAPTCHA coordinates", "warning")
-
-            img = cv2.cvtColor(cv2.imread(screenshot_path), cv2.COLOR_BGR2RGB)
-            img = img[int(y1):int(y2), int(x1):int(x2)]
-            captcha_text = pytesseract.image_to_string(img, config='--psm 7')
-            captcha = ''.join(captcha_text.split())
-            yield from send_log(f"CAPTCHA detected: {captcha}", "success")
-
-            captcha_field = driver.find_element(By.ID, "txtCaptcha")
-            captcha_field.send_keys(captcha)
-
-            yield from send_log("Submitting login...", "info")
-            driver.find_element(By.ID, "btnCheckLogin").click()
-            time.sleep(2)
 
-            try:
-                ul = driver.find_element(By.XPATH, "//ul[@id='menu4']")
-                ul.find_element(By.XPATH, "//*[@id='menu4']/li[2]/a").click()
-                ul.find_element(By.XPATH, "//*[@id='menu4']/li[2]/ul/li[1]/a").click()
-                yield from send_log("Login successful!", "success")
-            except Exception:
-                yield from send_error("Login failed - Incorrect credentials or CAPTCHA")
-                return
+@app.route('/api/history', methods=['GET'])
+def history():
+    """
+    Stored draws in a time range, newest first.
+    Query params: from, to (ISO date/time or epoch seconds, optional), limit (optional)
+    """
+    try:
+        start = _parse_time_param(request.args['from']) if request.args.get('from') else None
+        end = _parse_time_param(request.args['to']) if request.args.get('to') else None
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid from, to or limit parameter'}), 400
+
+    rows = get_store(DATA_DIR).range(start, end, limit)
+    return jsonify({'data': _columns(rows), 'records': len(rows)})
+
+
+def _columns(rows):
+    """Stored (ts, number, date, time) rows as the grid's parallel columns."""
+    return {
+        'Number': [r[1] for r in rows],
+        'Date': [r[2] for r in rows],
+        'Time': [r[3] for r in rows]
+    }
 
-            time.sleep(3)
 
-            yield from send_log("Loading data table...", "info")
-            try:
-                driver.find_element(
-                    By.XPATH,
-                    "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[2]/tbody/tr/td[14]/select/option[10]"
-                ).click()
-                yield from send_log("Data table loaded (100 records per page)", "success")
-            except Exception:
-                yield from send_error("Data loading failed - Not enough data present")
-                return
-
-            time.sleep(2)
-
-            yield from send_log("Analyzing pagination...", "info")
-            nav_bar = driver.find_elements(
-                By.XPATH,
-                "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[2]/tbody/tr"
-            )[0].text.split(' ')
-            pages = len(nav_bar[-13::-1])
-            yield from send_log(f"Found {pages} pages of data", "success")
-
-            scraped_data = {"Number": [], "Date": [], "Time": []}
-            total_records = 0
-
-            for num in range(1, min(max_pages + 1, pages + 1)):
-                try:
-                    yield from send_log(f"Scraping page {num}/{min(max_pages, pages)}...", "info")
-
-                    page_input = driver.find_element(
-                        By.XPATH,
-                        "//*[@id='dvFunTargettxtJqGridGoToPage']"
-                    )
-                    page_input.clear()
-                    page_input.send_keys(num)
-
-                    driver.find_element(
-                        By.XPATH,
-                        f"//*[@id='dvFunTarget']/table[2]/tbody/tr/td[{len(nav_bar) - 10 + 1}]/input[2]"
-                    ).click()
-
-                    time.sleep(1)
-
-                    row_count = 1 + len(driver.find_elements(
-                        By.XPATH,
-                        "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody/tr"
-                    ))
-
-                    for r in range(1, row_count):
-                        number = driver.find_elements(
-                            By.XPATH,
-                            f"/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody/tr[{r}]/td[2]"
-                        )[0].text
-                        scraped_data['Number'].append(number)
-
-                        date_time = driver.find_elements(
-                            By.XPATH,
-                            f"/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody/tr[{r}]/td[3]"
-                        )[0].text
-                        scraped_data['Date'].append(date_time[:11])
-                        scraped_data['Time'].append(date_time[12:])
-
-                    total_records += row_count - 1
-                    yield from send_log(f"Page {num}: {row_count - 1} records (Total: {total_records})", "success")
-
-                except Exception as e:
-                    yield from send_log(f"Page {num}: Error - {str(e)}", "warning")
-
-            yield from send_log("Saving data to CSV...", "info")
-            df = pd.DataFrame(scraped_data)
-            csv_filename = f"{str(datetime.datetime.now())[:10]}-Data.csv"
-            csv_path = os.path.join(DATA_DIR, csv_filename)
-            df.to_csv(csv_path, index=False)
-            yield from send_log(f"Data saved: {csv_filename}", "success")
-
-            yield from send_log(f"Scraping complete! {total_records} records collected", "success")
-
-            yield from send_complete({
-                'success': True,
-                'data': scraped_data,
-                'records': total_records,
-                'csv_file': csv_filename
-            })
+@app.route('/api/data', methods=['GET'])
+def data_series():
+    """
+    The stored draw series in a compact encoding, oldest first (see data_codec).
+    Query params: since (optional, the cursor of an earlier response: only newer draws)
 
-        except Exception as e:
-            yield from send_error(str(e))
+    Responses carry an ETag and are compressed per Accept-Encoding; a
+    matching If-None-Match gets 304 Not Modified.
+    """
+    since = request.args.get('since')
+    if since is not None and not since.lstrip('-').isdigit():
+        return jsonify({'error': 'Invalid since parameter'}), 400
+    since = int(since) if since is not None else None
+
+    stamp, ts, digits = get_series_cache(DATA_DIR).snapshot()
+    etag = hashlib.sha1(f"{stamp}:{since}".encode()).hexdigest()
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+
+    body, encoding = compress(
+        dumps(encode_arrays(*series_since(ts, digits, since), since)), request.headers.get('Accept-Encoding')
+    )
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype='application/json', headers=headers)
 
-        finally:
-            if driver:
-                driver.quit()
 
+def _sse_response(stream):
     return Response(
-        generate(),
+        stream,
         mimetype='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
@@ -445,88 +354,272 @@ def scrape_stream():
     )
 
 
+def _page_rows(event):
+    """The stored rows of a scrape's records event (see scraper.page_event), newest first."""
+    if event['from'] is None:
+        return []
+    return get_store(DATA_DIR).range(event['from'], event['to'])
+
+
+def _with_rows(event):
+    """A scrape event as sent to clients: records events get their rows back from the store."""
+    if event['type'] != 'records':
+        return event
+    return {**event, 'data': _columns(_page_rows(event))}
+
+
+def _positive_int_param(value):
+    """A request parameter as an int of at least 1, or None if absent; raises ValueError otherwise."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(value)
+    number = int(value)
+    if number < 1:
+        raise ValueError(value)
+    return number
+
+
+def _scrape_params(params):
+    """
+    The _start_scrape_job arguments from a JSON body or query args (see
+    /api/scrape). Raises ValueError with the message to send back.
+    """
+    username = params.get('username')
+    password = params.get('password')
+    if not username or not password:
+        raise ValueError('Username and password are required')
+    try:
+        max_pages = _positive_int_param(params.get('pages')) or 15
+    except ValueError:
+        raise ValueError('Pages must be a positive integer')
+    try:
+        concurrency = _positive_int_param(params.get('concurrency'))
+    except ValueError:
+        raise ValueError('Concurrency must be a positive integer')
+    since_last_sync = params.get('since_last_sync', False)
+    if isinstance(since_last_sync, str):
+        since_last_sync = since_last_sync.lower() in ('1', 'true', 'yes')
+    fetch_mode = params.get('fetch') or None
+    if fetch_mode not in (None, 'dom', 'http'):
+        raise ValueError('Fetch must be "dom" or "http"')
+    return username, password, max_pages, bool(since_last_sync), concurrency, fetch_mode
+
+
+def _start_scrape_job(username, password, max_pages, since_last_sync, concurrency, fetch_mode):
+    """
+    Start the scrape job for these parameters, or join the one already running.
+    `concurrency` and `fetch_mode` default to the scraper's settings when None.
+    """
+    from scraper import FETCH_MODE, PAGE_CONCURRENCY, run_scrape
+
+    concurrency = PAGE_CONCURRENCY if concurrency is None else concurrency
+    fetch_mode = fetch_mode or FETCH_MODE
+    key = hashlib.sha256(
+        json.dumps([username, password, max_pages, since_last_sync, concurrency, fetch_mode]).encode()
+    ).hexdigest()
+    return scrape_jobs.submit(
+        key, run_scrape, username, password, max_pages, since_last_sync, DATA_DIR, concurrency, fetch_mode,
+        account=username
+    )
+
+
+@app.route('/api/scrape', methods=['POST'])
+def scrape_data():
+    """
+    Endpoint to scrape data from playrep.pro using Selenium and OCR for captcha.
+    Blocks until the scrape finishes; use /api/jobs to run it in the background.
+
+    Request body:
+    {
+        "username": "your_user_id",
+        "password": "your_password",
+        "pages": 15,  (optional, default 15)
+        "since_last_sync": true,  (optional, stop at the newest stored draw)
+        "concurrency": 3,  (optional, browser sessions fetching pages at once)
+        "fetch": "http"  (optional, "dom" or "http": call the grid's data endpoint directly)
+    }
+    """
+    try:
+        params = _scrape_params(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        job, _ = _start_scrape_job(*params)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    job.wait()
+
+    logs = [event['message'] for event in job.events if event['type'] == 'log']
+    final = job.events[-1]
+    if final['type'] == 'error':
+        return jsonify({'error': final['message'], 'logs': logs}), final.get('status', 500)
+
+    # The job only kept which draws each page stored; read them back
+    rows = [row for event in job.events if event['type'] == 'records' for row in _page_rows(event)]
+    return jsonify({**final['data'], 'data': _columns(rows), 'logs': logs})
+
+
+@app.route('/api/scrape/stream', methods=['GET'])
+def scrape_stream():
+    """
+    SSE endpoint to scrape data with real-time log streaming.
+    Query params: username, password, pages (optional), since_last_sync (optional),
+    concurrency (optional), fetch (optional)
+
+    The scrape runs as a background job: disconnecting doesn't stop it, and
+    a second client with the same parameters attaches to the same job.
+    Reconnects resume after the Last-Event-ID header (or last_event_id
+    query param) while that job is still running.
+    """
+    try:
+        params = _scrape_params(request.args)
+    except ValueError as e:
+        data = json.dumps({"type": "error", "message": str(e), "status": 400})
+        return _sse_response([f"data: {data}\n\n"])
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', request.args.get('last_event_id', -1)))
+    except ValueError:
+        data = json.dumps({"type": "error", "message": "Invalid last event id", "status": 400})
+        return _sse_response([f"data: {data}\n\n"])
+
+    try:
+        job, created = _start_scrape_job(*params)
+    except QueueFull as e:
+        data = json.dumps({"type": "error", "message": str(e), "status": 429})
+        return _sse_response([f"data: {data}\n\n"])
+    # A reconnect resumes the job it was following; a new job is sent from the start
+    return _sse_response(sse_events(job, -1 if created else last_event_id, _with_rows))
+
+
+@app.route('/api/tail/stream', methods=['GET'])
+def tail_stream():
+    """
+    SSE stream of new draws as they land (see live_tail).
+    Query params: username, password, fetch (optional, "dom" or "http")
+
+    Subscribers for the same account share one logged-in session that only
+    re-reads the first grid page. New draws are stored and sent as records
+    events; the session closes a while after the last subscriber leaves.
+    """
+    from live_tail import manager as tail_manager, tail_events
+
+    username = request.args.get('username')
+    password = request.args.get('password')
+
+    if not username or not password:
+        data = json.dumps({"type": "error", "message": "Username and password are required"})
+        return _sse_response([f"data: {data}\n\n"])
+
+    last_event_id = request.headers.get('Last-Event-ID')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    watcher = tail_manager.watch(username, password, DATA_DIR, request.args.get('fetch'))
+    return _sse_response(tail_events(watcher, last_event_id))
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """
+    Start a scrape in the background and return its job id right away.
+    Takes the same body as /api/scrape. An identical job that is still
+    running is reused. Jobs wait in a per-account fair queue (see jobs); the
+    response carries queue_position and estimated_wait, and 429 means the
+    account already has too many scrapes waiting.
+    """
+    try:
+        params = _scrape_params(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        job, created = _start_scrape_job(*params)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify({
+        **job.summary(),
+        'reused': not created,
+        'events_url': f"/api/jobs/{job.id}/events"
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.summary())
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    SSE stream of a job's events, starting with a replay of earlier ones.
+    Resumes after the Last-Event-ID header (or last_event_id query param).
+    """
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', request.args.get('last_event_id', -1)))
+    except ValueError:
+        return jsonify({'error': 'Invalid last event id'}), 400
+
+    return _sse_response(sse_events(job, last_event_id, _with_rows))
+
+
 @app.route('/api/scrape/debug-captcha', methods=['GET'])
 def debug_captcha():
     """
     Debug endpoint to test CAPTCHA reading without login.
-    Returns the screenshot and OCR result.
+    Returns the captured CAPTCHA images (as data URLs) and OCR results.
     """
+    from selenium.webdriver.common.by import By
+
+    from captcha import CAPTCHA_IMAGES_XPATH, capture_captcha, capture_fallback, encode_png, ocr
+    from rate_limit import throttle
+    from scraper import LOGIN_URL, Waiter
+
     driver = None
+    release_slot = None
     try:
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--window-size=1920,1080')
-
-        driver = webdriver.Chrome(options=chrome_options)
+        # Counts against the scrape slots like a running job
+        release_slot = scrape_jobs.reserve()
+        driver = driver_pool.acquire()
 
         # Open login page
-        driver.get("https://playrep.pro/Login.mvc")
-        time.sleep(3)
+        throttle()
+        driver.get(LOGIN_URL)
+        Waiter(driver).login_page()
 
         # Get page info
         page_title = driver.title
         page_url = driver.current_url
 
-        # Take full screenshot
-        full_screenshot_path = os.path.join(DATA_DIR, "debug_full.png")
-        driver.save_screenshot(full_screenshot_path)
-
-        # Load and analyze the image
-        img_full = cv2.imread(full_screenshot_path)
-        img_rgb = cv2.cvtColor(img_full, cv2.COLOR_BGR2RGB)
-
-        # Get image dimensions
-        height, width = img_full.shape[:2]
-
-        # Try to find CAPTCHA images dynamically
-        captcha_images = driver.find_elements(By.XPATH, "//img[contains(@src, 'CaptchaImage')]")
-        dynamic_coords = None
-        if captcha_images:
-            first_img = captcha_images[0]
-            img_loc = first_img.location
-            img_size = first_img.size
-            x1 = max(0, img_loc['x'] - 5)
-            y1 = max(0, img_loc['y'] - 5)
-            if len(captcha_images) > 1:
-                last_img = captcha_images[-1]
-                x2 = last_img.location['x'] + last_img.size['width'] + 5
-            else:
-                x2 = img_loc['x'] + img_size['width'] + 5
-            y2 = img_loc['y'] + img_size['height'] + 5
-            dynamic_coords = [int(y1), int(y2), int(x1), int(x2)]
-
-        # Try different crop regions to find CAPTCHA
-        crop_regions = [
-            {"name": "dynamic", "coords": dynamic_coords} if dynamic_coords else None,
-            {"name": "fallback", "coords": [355, 395, 790, 915]},
-        ]
-        crop_regions = [r for r in crop_regions if r is not None]
+        # Capture the CAPTCHA elements and the fallback crop, both in memory
+        captures = []
+        if driver.find_elements(By.XPATH, CAPTCHA_IMAGES_XPATH):
+            captures.append(("element", capture_captcha(driver)[0]))
+        captures.append(("fallback", capture_fallback(driver)))
 
         results = []
-        for region in crop_regions:
-            y1, y2, x1, x2 = region["coords"]
-            if y2 <= height and x2 <= width:
-                cropped = img_rgb[y1:y2, x1:x2]
-                crop_path = os.path.join(DATA_DIR, f"debug_crop_{region['name']}.png")
-                cv2.imwrite(crop_path, cv2.cvtColor(cropped, cv2.COLOR_RGB2BGR))
-
-                # Try OCR with different configs
-                try:
-                    ocr_text = pytesseract.image_to_string(cropped, config='--psm 7')
-                    ocr_clean = ''.join(ocr_text.split())
-                except Exception as e:
-                    ocr_text = f"OCR Error: {str(e)}"
-                    ocr_clean = ""
-
-                results.append({
-                    "region": region["name"],
-                    "coords": region["coords"],
-                    "ocr_raw": ocr_text,
-                    "ocr_clean": ocr_clean,
-                    "crop_saved": crop_path
-                })
+        for name, img in captures:
+            try:
+                ocr_clean = ocr(img)
+                ocr_error = None
+            except Exception as e:
+                ocr_clean = ""
+                ocr_error = f"OCR Error: {str(e)}"
+
+            results.append({
+                "region": name,
+                "size": {"width": img.shape[1], "height": img.shape[0]},
+                "ocr_clean": ocr_clean,
+                "ocr_error": ocr_error,
+                "image": encode_png(img)
+            })
 
         # Try to find CAPTCHA element
         captcha_info = {}
@@ -564,12 +657,16 @@ def debug_captcha():
             "success": True,
             "page_title": page_title,
             "page_url": page_url,
-            "screenshot_size": {"width": width, "height": height},
-            "full_screenshot": full_screenshot_path,
             "crop_results": results,
             "captcha_info": captcha_info
         })
 
+    except (PoolTimeout, SlotBusy) as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 503
+
     except Exception as e:
         return jsonify({
             "success": False,
@@ -578,36 +675,46 @@ def debug_captcha():
 
     finally:
         if driver:
-            driver.quit()
+            driver_pool.release(driver)
+        if release_slot:
+            release_slot()
 
 
 @app.route('/api/scrape/status', methods=['GET'])
 def scrape_status():
-    """Check if scraping dependencies are available."""
+    """
+    Check if scraping dependencies are available.
+
+    Answers from the cached background check (see dependency_probe) instead
+    of checking on every call; fields are False until the first check is done.
+    """
+    deps = dependency_probe.status()
+    pool_stats = driver_pool.stats()
     status = {
-        'tesseract': False,
-        'chrome_driver': False
+        **deps,
+        'tesseract': bool(deps.get('tesseract')),
+        # A pool that has started a browser before is proof enough
+        'chrome_driver': pool_stats['created'] > 0 or bool(deps.get('chrome_driver')),
+        'pool': pool_stats
     }
+    if deps.get('modules'):
+        # Already imported by the check
+        from captcha import ocr_stats
+        status['ocr_variants'] = ocr_stats()
 
-    try:
-        pytesseract.get_tesseract_version()
-        status['tesseract'] = True
-    except Exception:
-        pass
+    return jsonify(status)
 
-    try:
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.quit()
-        status['chrome_driver'] = True
-    except Exception:
-        pass
 
-    return jsonify(status)
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Scrape phase timings, failure counters and pool/queue gauges in Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 3001))
+    # With the debug reloader only the child process serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        dependency_probe.start()
+        driver_pool.warm()
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,265 @@
+"""
+Walk-forward backtesting for the prediction methods.
+
+Replays a draw history one draw at a time: each method predicts the next
+draw from everything before it, and is scored with hit@k and log-loss.
+The history is split into contiguous ranges and every (method, range) pair
+runs in its own worker process; each worker rebuilds the count tables for
+its prefix once and then updates them incrementally.
+
+Usage: python backtest.py [--from 2025-12-01] [--to 2025-12-09] [--methods markov1,ensemble]
+                          [--weights markov1=0.2,momentum=0]
+
+--weights changes the ensemble's base weights (by method slug, see
+METHOD_SLUGS) to check whether the fixed ones are any good.
+"""
+import argparse
+import functools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model_state import ModelState
+from predictions import (
+    ENSEMBLE_WEIGHTS, NUM_DIGITS, ensemble_prediction, kneser_ney_smoothing, markov_probabilities,
+    pattern_completion_counts, positional_patterns, recency_weighted_markov, sequence_momentum, uniform,
+    variable_order_markov
+)
+
+HIT_K = (1, 3, 5)
+EPSILON = 1e-12
+DEFAULT_MIN_HISTORY = 100
+DEFAULT_SEGMENTS = os.cpu_count() or 1
+
+
+def _markov(order):
+    def predict(series, counts, temperature):
+        probs = markov_probabilities(counts, order, series)
+        return probs if probs is not None else uniform()
+    return predict
+
+
+def _variable_order(series, counts, temperature):
+    result = variable_order_markov(series, counts)
+    return result['probabilities'] if result else uniform()
+
+
+def _ensemble(series, counts, temperature, weights=None):
+    result = ensemble_prediction(series, counts, temperature, weights)
+    return np.array(result['allProbabilities']) / 100 if result else uniform()
+
+
+# Same methods (and names) as the ensemble, plus the ensemble itself
+METHODS = {
+    'Markov 1st Order': _markov(1),
+    'Markov 2nd Order': _markov(2),
+    'Markov 3rd Order': _markov(3),
+    'Variable Order Markov': _variable_order,
+    'Kneser-Ney Smoothing': lambda s, c, t: kneser_ney_smoothing(s, c),
+    'Recency-Weighted': lambda s, c, t: recency_weighted_markov(s),
+    'Pattern Completion': lambda s, c, t: pattern_completion_counts(s, c),
+    'Positional Cycles': lambda s, c, t: positional_patterns(s),
+    'Sequence Momentum': lambda s, c, t: sequence_momentum(s),
+    'Ensemble': _ensemble,
+}
+
+# Short names for the command line
+METHOD_SLUGS = {
+    'markov1': 'Markov 1st Order',
+    'markov2': 'Markov 2nd Order',
+    'markov3': 'Markov 3rd Order',
+    'vom': 'Variable Order Markov',
+    'kneser-ney': 'Kneser-Ney Smoothing',
+    'recency': 'Recency-Weighted',
+    'pattern': 'Pattern Completion',
+    'positional': 'Positional Cycles',
+    'momentum': 'Sequence Momentum',
+    'ensemble': 'Ensemble',
+}
+
+
+def method_name(name):
+    """The METHODS name for a slug or a METHODS name; raises ValueError for anything else."""
+    name = METHOD_SLUGS.get(name.strip().lower(), name.strip())
+    if name not in METHODS:
+        raise ValueError(f"Unknown method: {name} (use one of {', '.join(METHOD_SLUGS)})")
+    return name
+
+
+def parse_weights(text):
+    """Ensemble weight overrides from "slug=weight,..." as {method name: weight}."""
+    weights = {}
+    for part in text.split(','):
+        slug, sep, value = part.partition('=')
+        if not sep:
+            raise ValueError(f"Expected slug=weight, got {part!r}")
+        name = method_name(slug)
+        if name not in ENSEMBLE_WEIGHTS:
+            raise ValueError(f"{name} is not part of the ensemble")
+        weights[name] = float(value)
+    return weights
+
+
+def _run_segment(method, series, start, end, temperature, weights=None):
+    """Score one method on draws start..end-1. Runs in a worker process."""
+    predict = METHODS[method]
+    if predict is _ensemble:
+        predict = functools.partial(_ensemble, weights=weights)
+    state = ModelState()
+    state.extend(series[:start])
+
+    hits = {k: 0.0 for k in HIT_K}
+    log_loss = 0.0
+    began = time.perf_counter()
+    for t in range(start, end):
+        probs = np.asarray(predict(state.series, state.counts, temperature), dtype=float)
+        actual = int(series[t])
+
+        # Ties are broken at random, so count the expected hit among tied digits
+        higher = int((probs > probs[actual]).sum())
+        tied = int((probs == probs[actual]).sum())
+        for k in HIT_K:
+            hits[k] += min(max(k - higher, 0), tied) / tied
+        log_loss -= math.log(max(probs[actual] / probs.sum(), EPSILON))
+
+        state.append(actual)
+
+    return {
+        'method': method,
+        'steps': end - start,
+        'hits': hits,
+        'log_loss': log_loss,
+        'runtime': time.perf_counter() - began
+    }
+
+
+def run_backtest(series, methods=None, min_history=DEFAULT_MIN_HISTORY,
+                 segments=DEFAULT_SEGMENTS, workers=None, temperature=1.2, weights=None):
+    """
+    Walk-forward evaluation of `methods` (names or slugs) over a digit
+    series (oldest first). `weights` overrides the ensemble's base weights
+    by method name.
+
+    Returns a report with hit@k, mean log-loss and CPU time per method,
+    sorted by log-loss, next to the uniform-guess baseline.
+    """
+    series = np.asarray(series, dtype=np.uint8)
+    methods = [method_name(m) for m in methods] if methods else list(METHODS)
+    if weights:
+        # Fail here rather than in every worker
+        ensemble_prediction(np.zeros(0, dtype=np.uint8), weights=weights)
+    if len(series) <= min_history:
+        raise ValueError(f"Need more than {min_history} draws, got {len(series)}")
+
+    bounds = np.linspace(min_history, len(series), max(1, segments) + 1).astype(int)
+    ranges = [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    began = time.perf_counter()
+    totals = {m: {'steps': 0, 'hits': {k: 0.0 for k in HIT_K}, 'log_loss': 0.0, 'runtime': 0.0} for m in methods}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_run_segment, method, series, start, end, temperature, weights)
+            for method in methods for start, end in ranges
+        ]
+        for future in futures:
+            part = future.result()
+            total = totals[part['method']]
+            total['steps'] += part['steps']
+            total['log_loss'] += part['log_loss']
+            total['runtime'] += part['runtime']
+            for k in HIT_K:
+                total['hits'][k] += part['hits'][k]
+
+    results = []
+    for method, total in totals.items():
+        steps = total['steps']
+        results.append({
+            'method': method,
+            'steps': steps,
+            **{f'hit@{k}': round(total['hits'][k] / steps, 4) for k in HIT_K},
+            'log_loss': round(total['log_loss'] / steps, 4),
+            'runtime': round(total['runtime'], 3),
+            'ms_per_prediction': round(1000 * total['runtime'] / steps, 3)
+        })
+    results.sort(key=lambda r: r['log_loss'])
+
+    return {
+        'draws': len(series),
+        'evaluated': len(series) - min_history,
+        'min_history': min_history,
+        'segments': len(ranges),
+        'temperature': temperature,
+        'weights': {**ENSEMBLE_WEIGHTS, **(weights or {})},
+        'wall_time': round(time.perf_counter() - began, 3),
+        'baseline': {
+            **{f'hit@{k}': k / NUM_DIGITS for k in HIT_K},
+            'log_loss': round(math.log(NUM_DIGITS), 4)
+        },
+        'methods': results
+    }
+
+
+def format_report(report):
+    hit_cols = [f'hit@{k}' for k in HIT_K]
+    lines = [
+        f"{report['evaluated']} of {report['draws']} draws evaluated in "
+        f"{report['segments']} segments, {report['wall_time']}s wall time",
+    ]
+    changed = {name: w for name, w in report['weights'].items() if w != ENSEMBLE_WEIGHTS[name]}
+    if changed:
+        lines.append('ensemble weights changed: ' + ', '.join(f"{name}={w}" for name, w in changed.items()))
+    lines += [
+        '',
+        f"{'method':<24}" + ''.join(f"{c:>8}" for c in hit_cols) + f"{'logloss':>9}{'cpu s':>9}{'ms/pred':>9}",
+    ]
+    for r in report['methods']:
+        lines.append(
+            f"{r['method']:<24}" + ''.join(f"{r[c]:>8.3f}" for c in hit_cols)
+            + f"{r['log_loss']:>9.4f}{r['runtime']:>9.2f}{r['ms_per_prediction']:>9.3f}"
+        )
+    base = report['baseline']
+    lines.append(
+        f"{'(uniform baseline)':<24}" + ''.join(f"{base[c]:>8.3f}" for c in hit_cols) + f"{base['log_loss']:>9.4f}"
+    )
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import datetime
+
+    from series_cache import get_series_cache, open_digits
+    from storage import to_epoch
+
+    parser = argparse.ArgumentParser(description='Walk-forward backtest over the stored draw history.')
+    parser.add_argument('--from', dest='start', help='first draw time (ISO format)')
+    parser.add_argument('--to', dest='end', help='last draw time (ISO format)')
+    parser.add_argument('--methods', help=f"comma-separated methods: {','.join(METHOD_SLUGS)} (default: all)")
+    parser.add_argument('--min-history', type=int, default=DEFAULT_MIN_HISTORY)
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--temperature', type=float, default=1.2)
+    parser.add_argument('--weights', help='ensemble base weight overrides, e.g. markov1=0.2,momentum=0')
+    args = parser.parse_args()
+
+    data_dir = os.path.join(os.path.dirname(__file__), '..', 'Data')
+    start = to_epoch(datetime.datetime.fromisoformat(args.start)) if args.start else None
+    end = to_epoch(datetime.datetime.fromisoformat(args.end)) if args.end else None
+    _, digits = get_series_cache(data_dir).between(start, end)
+    history = open_digits(digits)
+
+    try:
+        report = run_backtest(
+            history,
+            methods=args.methods.split(',') if args.methods else None,
+            min_history=args.min_history,
+            segments=args.segments,
+            workers=args.workers,
+            temperature=args.temperature,
+            weights=parse_weights(args.weights) if args.weights else None
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(format_report(report))
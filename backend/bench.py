@@ -0,0 +1,215 @@
+"""
+Offline benchmark of the scrape path against fixture_site.py.
+
+Starts the fixture site in-process and times each phase of a scrape over
+several runs: browser startup, login (with the CAPTCHA capture and OCR of
+its attempts broken out), reaching the data table, extracting each grid
+page, and saving the draws (store insert and CSV write). Save a run with
+--save and compare later runs against it with --compare to see what a
+change did.
+
+Usage: python bench.py [--runs 3] [--pages 5] [--draws 5000] [--save base.json] [--compare base.json]
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+from fixture_site import FixtureSite, generate_draws
+
+FIXTURE_PORT = int(os.environ.get('BENCH_FIXTURE_PORT', 5055))
+# The scraper reads its site URL at import, so this has to come first
+os.environ.setdefault('SCRAPE_SITE_URL', f'http://127.0.0.1:{FIXTURE_PORT}')
+
+from selenium.webdriver.common.by import By  # noqa: E402
+
+import scraper  # noqa: E402
+from captcha import solve  # noqa: E402
+from driver_pool import create_driver  # noqa: E402
+from grid_client import GridClient  # noqa: E402
+from metrics import PhaseTimer  # noqa: E402
+from scraper import Waiter, drain, extract_page_rows, go_to_page, grid_signature, login  # noqa: E402
+from storage import DrawStore  # noqa: E402
+
+PHASES = ('startup', 'captcha_capture', 'ocr', 'login', 'data_table', 'page', 'store_write', 'csv_write')
+
+
+class Timer:
+    def __init__(self):
+        self.samples = {phase: [] for phase in PHASES}
+
+    def time(self, phase, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.samples[phase].append(time.perf_counter() - start)
+        return result
+
+
+def run_once(site, timer, max_pages, work_dir, fetch_mode='dom'):
+    """
+    One scrape against the fixture site, timing every phase. Returns whether
+    the first login attempt read its CAPTCHA correctly.
+
+    With fetch_mode 'http' the pages come straight from the grid's data
+    endpoint (one request for all of them) instead of the rendered table.
+    """
+    driver = timer.time('startup', create_driver)
+    try:
+        waiter = Waiter(driver)
+        # CAPTCHA capture and OCR are timed inside the real login (its phase
+        # spans), and each answer is scored against the CAPTCHA it was
+        # submitted for
+        phases = PhaseTimer()
+        answers = []
+
+        def scored_solve(img):
+            answer, readings = solve(img)
+            answers.append(answer == site.expected_captcha(driver.get_cookie('ASP.NET_SessionId')['value']))
+            return answer, readings
+
+        with mock.patch.object(scraper, 'solve', scored_solve):
+            menu = timer.time('login', lambda: drain(login(driver, waiter, 'bench', 'bench', phases=phases)))
+        for span in phases.spans:
+            if span['phase'] in ('captcha_capture', 'ocr'):
+                timer.samples[span['phase']].append(span['seconds'])
+        ocr_correct = bool(answers) and answers[0]
+
+        if fetch_mode == 'http':
+            def fetch_all():
+                menu.find_element(By.XPATH, "//*[@id='menu4']/li[2]/a").click()
+                menu.find_element(By.XPATH, "//*[@id='menu4']/li[2]/ul/li[1]/a").click()
+                waiter.data_page()
+                client = GridClient.from_driver(driver)
+                try:
+                    return client.fetch(1, max_pages * 100)[0]
+                finally:
+                    client.close()
+            rows = timer.time('page', fetch_all)
+        else:
+            rows = _scrape_pages(driver, waiter, menu, timer, max_pages)
+    finally:
+        driver.quit()
+
+    store = DrawStore(os.path.join(work_dir, f'bench-{time.time_ns()}.db'))
+    timer.time('store_write', store.insert, rows)
+
+    def write_csv():
+        with open(os.path.join(work_dir, 'bench-Data.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Number', 'Date', 'Time'])
+            writer.writerows(rows)
+    timer.time('csv_write', write_csv)
+    return ocr_correct
+
+
+def _scrape_pages(driver, waiter, menu, timer, max_pages):
+    """Open the data table and read pages from the rendered grid, timing each one."""
+    def open_data_table():
+        menu.find_element(By.XPATH, "//*[@id='menu4']/li[2]/a").click()
+        menu.find_element(By.XPATH, "//*[@id='menu4']/li[2]/ul/li[1]/a").click()
+        page_size = waiter.data_page()
+        previous = grid_signature(driver)
+        page_size.click()
+        waiter.grid_changed('page size', previous)
+        return waiter.pager().text.split(' ')
+    nav_bar = timer.time('data_table', open_data_table)
+
+    pages = len(nav_bar[-13::-1])
+    go_button = f"//*[@id='dvFunTarget']/table[2]/tbody/tr/td[{len(nav_bar) - 10 + 1}]/input[2]"
+    rows = []
+    for num in range(1, min(max_pages, pages) + 1):
+        def scrape_page():
+            if num > 1:
+                go_to_page(driver, waiter, num, go_button)
+            return extract_page_rows(driver)
+        rows.extend(timer.time('page', scrape_page))
+    return rows
+
+
+def summarize(samples):
+    """Milliseconds per phase: count, min, median, mean and max."""
+    summary = {}
+    for phase, values in samples.items():
+        if not values:
+            continue
+        ms = [v * 1000 for v in values]
+        summary[phase] = {
+            'n': len(ms),
+            'min': round(min(ms), 2),
+            'median': round(statistics.median(ms), 2),
+            'mean': round(statistics.fmean(ms), 2),
+            'max': round(max(ms), 2)
+        }
+    return summary
+
+
+def format_summary(report, baseline=None):
+    header = f"{'phase':<16}{'n':>5}{'min ms':>11}{'median ms':>11}{'mean ms':>11}{'max ms':>11}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    lines = [header]
+    for phase, stats in report['phases'].items():
+        line = (f"{phase:<16}{stats['n']:>5}{stats['min']:>11.2f}{stats['median']:>11.2f}"
+                f"{stats['mean']:>11.2f}{stats['max']:>11.2f}")
+        base = (baseline or {}).get('phases', {}).get(phase)
+        if base and base['median']:
+            line += f"{100 * (stats['median'] - base['median']) / base['median']:>+9.1f}%"
+        lines.append(line)
+    lines.append('')
+    lines.append(f"OCR correct in {report['ocr_correct']} of {report['runs']} runs; "
+                 f"{report['fixture']['rejected_logins']} logins rejected")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the scrape path against the local fixture site.')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=5, help='grid pages to scrape per run')
+    parser.add_argument('--draws', type=int, default=5000, help='draws served by the fixture site')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the fixture adds to every response')
+    parser.add_argument('--fetch', choices=('dom', 'http'), default='dom',
+                        help='read the rendered table or call the grid data endpoint')
+    parser.add_argument('--strict-captcha', action='store_true',
+                        help='only accept correct CAPTCHA answers (needs Tesseract)')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='show the change against a saved JSON result')
+    args = parser.parse_args()
+
+    site = FixtureSite(generate_draws(args.draws), args.latency, not args.strict_captcha)
+    server = make_server('127.0.0.1', FIXTURE_PORT, site.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    timer = Timer()
+    ocr_correct = 0
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for _ in range(args.runs):
+                ocr_correct += run_once(site, timer, args.pages, work_dir, args.fetch)
+    finally:
+        server.shutdown()
+
+    report = {
+        'runs': args.runs,
+        'pages': args.pages,
+        'draws': args.draws,
+        'latency': args.latency,
+        'fetch': args.fetch,
+        'ocr_correct': ocr_correct,
+        'fixture': site.stats,
+        'phases': summarize(timer.samples)
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(format_summary(report, baseline))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,168 @@
+"""
+CAPTCHA capture and OCR for the playrep.pro login page.
+
+The CAPTCHA is captured as element-level PNGs straight from the browser and
+decoded in memory, so nothing is written to disk and concurrent logins
+don't share a screenshot file. OCR runs several preprocessing/config
+variants in parallel and votes on the answer, weighting each variant by how
+often it has produced an accepted answer before.
+"""
+import base64
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytesseract
+from selenium.webdriver.common.by import By
+
+CAPTCHA_IMAGES_XPATH = "//img[contains(@src, 'CaptchaImage')]"
+# Crop box (x1, y1, x2, y2) used when no CAPTCHA image is found, from debug analysis
+FALLBACK_BOX = (790, 355, 915, 395)
+# White border around and between the CAPTCHA images, like the old padded crop
+PADDING = 5
+OCR_CONFIG = '--psm 7'
+# Characters the CAPTCHA is made of (digits on playrep.pro)
+CAPTCHA_CHARSET = os.environ.get('CAPTCHA_CHARSET', '0123456789')
+
+
+def decode_png(png):
+    """Decode PNG bytes to an RGB array."""
+    img = cv2.imdecode(np.frombuffer(png, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode PNG data")
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def encode_png(img):
+    """RGB array to a base64 PNG data URL (for debug responses)."""
+    ok, buf = cv2.imencode('.png', cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+    if not ok:
+        raise ValueError("Could not encode PNG data")
+    return 'data:image/png;base64,' + base64.b64encode(buf.tobytes()).decode('ascii')
+
+
+def _join(parts):
+    """Place images left to right on a white canvas with PADDING around and between them."""
+    height = max(p.shape[0] for p in parts) + 2 * PADDING
+    width = sum(p.shape[1] for p in parts) + PADDING * (len(parts) + 1)
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+    x = PADDING
+    for part in parts:
+        canvas[PADDING:PADDING + part.shape[0], x:x + part.shape[1]] = part
+        x += part.shape[1] + PADDING
+    return canvas
+
+
+def capture_fallback(driver):
+    """Crop the fallback box out of an in-memory page screenshot."""
+    page = decode_png(driver.get_screenshot_as_png())
+    x1, y1, x2, y2 = FALLBACK_BOX
+    return page[y1:y2, x1:x2]
+
+
+def capture_captcha(driver):
+    """
+    Capture the CAPTCHA as an RGB array.
+
+    Returns (image, source) where source is 'element' when the CAPTCHA
+    images were found and 'fallback' when the fixed crop box was used.
+    """
+    images = driver.find_elements(By.XPATH, CAPTCHA_IMAGES_XPATH)
+    if images:
+        return _join([decode_png(img.screenshot_as_png) for img in images]), 'element'
+    return capture_fallback(driver), 'fallback'
+
+
+def ocr(img, config=OCR_CONFIG):
+    """Run Tesseract on a CAPTCHA image and strip whitespace from the result."""
+    return ''.join(pytesseract.image_to_string(img, config=config).split())
+
+
+def _gray(img):
+    return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+
+def _otsu(img):
+    return cv2.threshold(_gray(img), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def _upscale(img):
+    return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+
+
+def _adaptive(img):
+    gray = cv2.medianBlur(_gray(_upscale(img)), 3)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+
+# (name, preprocessing, tesseract page segmentation mode)
+VARIANTS = [
+    ('raw-psm7', lambda img: img, 7),
+    ('otsu-psm7', _otsu, 7),
+    ('upscale-otsu-psm7', lambda img: _otsu(_upscale(img)), 7),
+    ('upscale-otsu-psm8', lambda img: _otsu(_upscale(img)), 8),
+    ('adaptive-psm13', _adaptive, 13),
+]
+
+_executor = ThreadPoolExecutor(max_workers=len(VARIANTS), thread_name_prefix='captcha-ocr')
+_stats_lock = threading.Lock()
+_stats = {name: {'attempts': 0, 'successes': 0} for name, _, _ in VARIANTS}
+
+
+def _run_variant(img, preprocess, psm):
+    config = f'--psm {psm} -c tessedit_char_whitelist={CAPTCHA_CHARSET}'
+    text = ocr(preprocess(img), config)
+    return ''.join(c for c in text if c in CAPTCHA_CHARSET)
+
+
+def solve(img):
+    """
+    OCR a CAPTCHA image with every variant in parallel and vote.
+
+    Returns (answer, readings) where readings maps variant name to its
+    output. Votes are weighted by each variant's past success rate.
+    """
+    futures = {name: _executor.submit(_run_variant, img, preprocess, psm)
+               for name, preprocess, psm in VARIANTS}
+    readings = {}
+    for name, future in futures.items():
+        try:
+            readings[name] = future.result()
+        except Exception:
+            readings[name] = ''
+
+    votes = Counter()
+    with _stats_lock:
+        for name, text in readings.items():
+            if text:
+                stats = _stats[name]
+                rate = stats['successes'] / stats['attempts'] if stats['attempts'] else 0
+                votes[text] += 1 + rate
+
+    answer = votes.most_common(1)[0][0] if votes else ''
+    return answer, readings
+
+
+def record_outcome(readings, answer, success):
+    """Update per-variant stats once the site has accepted or rejected `answer`."""
+    with _stats_lock:
+        for name, text in readings.items():
+            _stats[name]['attempts'] += 1
+            if success and text == answer:
+                _stats[name]['successes'] += 1
+
+
+def ocr_stats():
+    """Attempts, successes and success rate of each OCR variant."""
+    with _stats_lock:
+        return {
+            name: {
+                **stats,
+                'success_rate': round(stats['successes'] / stats['attempts'], 3) if stats['attempts'] else None
+            }
+            for name, stats in _stats.items()
+        }
+
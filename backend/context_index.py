@@ -0,0 +1,208 @@
+"""
+Incremental context index over a digit series, at any order.
+
+The dense count tables in predictions/model_state stop at MAX_ORDER: a
+table for order k has 10 ** k rows. ContextIndex keeps the same "what
+followed this context" counts for every order up to CONTEXT_MAX_ORDER, but
+only for the (context, next digit) pairs that occurred, as sorted int64
+keys with an int32 count each. Appends cost O(order) and are folded in
+lazily (see _OrderCounts); a lookup is a pair of binary searches, however
+long the history is.
+
+Fuzzy lookups sum the counts of every context within +-1 of the query at
+each position (the "near" match of pattern completion); the 3 ** order
+candidates are looked up in one vectorized search.
+"""
+import itertools
+import os
+import threading
+
+import numpy as np
+
+from predictions import NUM_DIGITS, context_code, transition_keys
+from series_cache import NOT_OPEN, get_series_cache
+
+CONTEXT_MAX_ORDER = int(os.environ.get('CONTEXT_MAX_ORDER', 10))
+# Fuzzy lookups check 3 ** order contexts, so they stop at this order
+FUZZY_MAX_ORDER = 8
+# Keys a delta level may hold before it is merged into the main arrays
+DELTA_MIN_SIZE = 4096
+
+
+def _merge(keys_a, counts_a, keys_b, counts_b):
+    """Union of two sorted (key, count) sets, adding the counts of shared keys."""
+    if not len(keys_a):
+        return keys_b, counts_b
+    keys, index = np.unique(np.concatenate((keys_a, keys_b)), return_inverse=True)
+    counts = np.bincount(index, weights=np.concatenate((counts_a, counts_b)), minlength=len(keys))
+    return keys, counts.astype(np.int32)
+
+
+class _OrderCounts:
+    """
+    Next-digit counts for the contexts of one order, as sorted keys
+    (context code * 10 + next digit) with a count each.
+
+    Appends collect in `pending`, which a lookup first folds into a small
+    delta level; the delta is merged into the main arrays once it has
+    grown past a fraction of them, so a lookup after a few appends doesn't
+    rewrite the whole table.
+    """
+
+    def __init__(self):
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int32)
+        self.delta_keys = self.keys
+        self.delta_counts = self.counts
+        self.pending = {}
+
+    def add(self, key):
+        self.pending[key] = self.pending.get(key, 0) + 1
+
+    def add_many(self, keys):
+        keys, counts = np.unique(keys, return_counts=True)
+        self.keys, self.counts = _merge(self.keys, self.counts, keys, counts.astype(np.int32))
+
+    def flush(self):
+        if self.pending:
+            keys = np.fromiter(self.pending, dtype=np.int64, count=len(self.pending))
+            counts = np.fromiter(self.pending.values(), dtype=np.int32, count=len(self.pending))
+            self.pending = {}
+            order = np.argsort(keys)
+            self.delta_keys, self.delta_counts = _merge(
+                self.delta_keys, self.delta_counts, keys[order], counts[order]
+            )
+        if len(self.delta_keys) > max(DELTA_MIN_SIZE, len(self.keys) // 16):
+            self.keys, self.counts = _merge(self.keys, self.counts, self.delta_keys, self.delta_counts)
+            self.delta_keys = np.zeros(0, dtype=np.int64)
+            self.delta_counts = np.zeros(0, dtype=np.int32)
+
+    def lookup(self, codes):
+        """Next-digit counts summed over context `codes`; unknown codes add nothing."""
+        result = np.zeros(NUM_DIGITS, dtype=np.int64)
+        first = codes * NUM_DIGITS
+        for keys, counts in ((self.keys, self.counts), (self.delta_keys, self.delta_counts)):
+            lo = np.searchsorted(keys, first)
+            hi = np.searchsorted(keys, first + NUM_DIGITS)
+            lengths = hi - lo
+            total = int(lengths.sum())
+            if not total:
+                continue
+            # Indices of every key in the [lo, hi) ranges, without a Python loop
+            starts = np.repeat(lo - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+            idx = starts + np.arange(total)
+            result += np.bincount(keys[idx] % NUM_DIGITS, weights=counts[idx], minlength=NUM_DIGITS).astype(np.int64)
+        return result
+
+
+class ContextIndex:
+    def __init__(self, max_order=CONTEXT_MAX_ORDER):
+        self.max_order = max_order
+        self.orders = {order: _OrderCounts() for order in range(1, max_order + 1)}
+        self.length = 0
+        # The last max_order digits, oldest first
+        self.tail = []
+        # Lookups merge pending appends, so they take the lock too
+        self._lock = threading.RLock()
+
+    def append(self, digit):
+        """Add one draw; it is folded into the tables on the next lookup."""
+        with self._lock:
+            self._append(int(digit))
+
+    def _append(self, digit):
+        code = 0
+        scale = 1
+        for order in range(1, len(self.tail) + 1):
+            code += self.tail[-order] * scale
+            scale *= NUM_DIGITS
+            self.orders[order].add(code * NUM_DIGITS + digit)
+        self.tail = (self.tail + [digit])[-self.max_order:]
+        self.length += 1
+
+    def extend(self, digits):
+        """Add many draws at once (vectorized per order)."""
+        new = np.asarray(digits, dtype=np.int64)
+        with self._lock:
+            if len(new) < 32:
+                for d in new:
+                    self._append(int(d))
+            else:
+                self._extend(new)
+
+    def _extend(self, new):
+        overlap = len(self.tail)
+        combined = np.concatenate((np.array(self.tail, dtype=np.int64), new))
+        for order in range(1, self.max_order + 1):
+            keys = transition_keys(combined, order, overlap)
+            if len(keys):
+                self.orders[order].add_many(keys)
+        self.tail = combined[-self.max_order:].tolist()
+        self.length += len(new)
+
+    def following(self, context, fuzzy=False):
+        """
+        Counts of the digit that followed `context` (oldest digit first), as
+        an array of 10. With `fuzzy`, contexts within +-1 at every position count too.
+        """
+        order = len(context)
+        if not 1 <= order <= self.max_order:
+            raise ValueError(f"Context order must be between 1 and {self.max_order}")
+        if fuzzy and order > FUZZY_MAX_ORDER:
+            raise ValueError(f"Fuzzy lookups go up to order {FUZZY_MAX_ORDER}")
+
+        if fuzzy:
+            choices = [[d + step for step in (-1, 0, 1) if 0 <= d + step < NUM_DIGITS] for d in map(int, context)]
+            codes = np.fromiter((context_code(c) for c in itertools.product(*choices)), dtype=np.int64)
+        else:
+            codes = np.array([context_code(context)], dtype=np.int64)
+        with self._lock:
+            table = self.orders[order]
+            table.flush()
+            return table.lookup(codes)
+
+    def longest_context(self, min_count=1):
+        """
+        Variable-order lookup for the newest draws: the longest current
+        context followed at least `min_count` times, as (context, counts),
+        or ([], None) when not even the last digit was.
+        """
+        with self._lock:
+            for order in range(len(self.tail), 0, -1):
+                context = self.tail[-order:]
+                counts = self.following(context)
+                if counts.sum() >= min_count:
+                    return context, counts
+            return [], None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_series_index(data_dir):
+    """
+    Context index over the stored draw series (open draws only), brought up
+    to date with series_cache on every call.
+    """
+    cache = get_series_cache(data_dir)
+    with _indexes_lock:
+        entry = _indexes.get(data_dir)
+        if entry is None:
+            entry = _indexes[data_dir] = {'index': ContextIndex(), 'consumed': 0, 'generation': cache.generation}
+        while True:
+            generation = cache.generation
+            _, digits = cache.arrays()
+            if cache.generation == generation:
+                break
+        if generation != entry['generation'] or len(digits) < entry['consumed']:
+            # Older draws were back-filled, so the cache started over: so does the index
+            entry.update(index=ContextIndex(), consumed=0, generation=generation)
+        # Consumed up to the newest open draw only: NOT OPEN draws after it may
+        # still be filled in without the cache starting a new generation
+        new = digits[entry['consumed']:]
+        opened = np.flatnonzero(new != NOT_OPEN)
+        if len(opened):
+            entry['index'].extend(new[opened])
+            entry['consumed'] += int(opened[-1]) + 1
+        return entry['index']
@@ -0,0 +1,79 @@
+"""
+Compact wire encoding for the stored draw series.
+
+A series of (timestamp, digit) draws, oldest first, becomes:
+- "digits": one character per draw, '0'-'9', or '-' when the draw was NOT OPEN
+- "start": epoch seconds of the first draw
+- "deltas": seconds between consecutive draws, run-length encoded as
+  [[seconds, repeat], ...] (draws are a minute apart, so this is tiny)
+- "cursor": epoch seconds of the newest draw that has a digit, to pass back
+  as since=; NOT OPEN draws after it may still be filled in, so they come
+  again
+
+Bodies are compressed with brotli when the client accepts it and the
+module is installed, otherwise gzip.
+"""
+import gzip
+import json
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CLOSED = '-'
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+# Character for each digit value; anything above 9 is a NOT OPEN draw
+_DIGIT_CHARS = np.full(256, ord(CLOSED), dtype=np.uint8)
+_DIGIT_CHARS[:10] = np.arange(ord('0'), ord('9') + 1)
+
+
+def encode_arrays(ts, digits, after=None):
+    """
+    Encode parallel timestamp and uint8 digit arrays (see series_cache),
+    oldest first. `after` is the since= they were selected with, kept as the
+    cursor when none of them has a digit.
+    """
+    if not len(ts):
+        return {'count': 0, 'start': None, 'cursor': after, 'digits': '', 'deltas': []}
+
+    deltas = np.diff(ts)
+    runs = []
+    if len(deltas):
+        starts = np.flatnonzero(np.concatenate(([True], deltas[1:] != deltas[:-1])))
+        lengths = np.diff(np.append(starts, len(deltas)))
+        runs = [[int(deltas[s]), int(n)] for s, n in zip(starts, lengths)]
+
+    opened = np.flatnonzero(digits < 10)
+    return {
+        'count': len(ts),
+        'start': int(ts[0]),
+        'cursor': int(ts[opened[-1]]) if len(opened) else after,
+        'digits': _DIGIT_CHARS[digits].tobytes().decode('ascii'),
+        'deltas': runs
+    }
+
+
+def compress(body, accept_encoding):
+    """
+    Compress `body` (bytes) for a request's Accept-Encoding header.
+
+    Returns (body, content encoding or None).
+    """
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=5), 'br'
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
+
+
+def dumps(payload):
+    return json.dumps(payload, separators=(',', ':')).encode()
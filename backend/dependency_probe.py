@@ -0,0 +1,87 @@
+"""
+Background check of the scrape dependencies.
+
+Answering "can this instance scrape?" is slow: the scrape modules pull in
+Selenium, OpenCV and pytesseract (which imports pandas), and asking
+Tesseract for its version starts a process. So the check runs once on a
+background thread, its result is cached for PROBE_TTL seconds, and readers
+never wait for it: they get the last result, and a stale one starts a
+refresh. The first run also leaves the scrape modules imported, so the
+first scrape doesn't pay for that either.
+"""
+import os
+import shutil
+import threading
+import time
+
+# Seconds a probe result is reused before checking again
+PROBE_TTL = float(os.environ.get('DEPENDENCY_PROBE_TTL', 300))
+BROWSER_BINARIES = ('chromedriver', 'google-chrome', 'chromium')
+
+
+def check_dependencies():
+    """Import the scrape modules and look for Tesseract and a browser."""
+    status = {
+        'modules': False,
+        'tesseract': False,
+        'chrome_driver': any(shutil.which(name) for name in BROWSER_BINARIES)
+    }
+    try:
+        import scraper  # noqa: F401  (selenium, cv2, pytesseract)
+        status['modules'] = True
+    except ImportError as e:
+        status['import_error'] = str(e)
+        return status
+
+    try:
+        import pytesseract
+        status['tesseract_version'] = str(pytesseract.get_tesseract_version())
+        status['tesseract'] = True
+    except Exception:
+        pass
+    return status
+
+
+class DependencyProbe:
+    def __init__(self, check=check_dependencies, ttl=PROBE_TTL):
+        self.check = check
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = None
+        self._running = False
+
+    def start(self):
+        """Run the check in the background unless a fresh result or a run is already there."""
+        with self._lock:
+            if self._running or (self._checked_at is not None and time.time() - self._checked_at < self.ttl):
+                return
+            self._running = True
+        threading.Thread(target=self._run, name='dependency-probe', daemon=True).start()
+
+    def _run(self):
+        try:
+            result = self.check()
+        except Exception as e:
+            result = {'error': str(e)}
+        with self._lock:
+            self._result = result
+            self._checked_at = time.time()
+            self._running = False
+
+    def status(self):
+        """
+        The last result, refreshing it in the background when stale.
+
+        `checked_at` is None until the first check finishes.
+        """
+        self.start()
+        with self._lock:
+            return {
+                **(self._result or {}),
+                'checked_at': self._checked_at,
+                'checking': self._running
+            }
+
+
+probe = DependencyProbe()
@@ -0,0 +1,238 @@
+"""
+Bounded pool of warm headless Chrome sessions.
+
+Starting Chrome costs several seconds, so scrape endpoints lease an
+existing WebDriver from the pool and hand it back when done. Instances are
+health-checked on checkout and recycled after a number of uses or when the
+browser's memory grows past a limit. When every instance is leased, callers
+wait up to a timeout and then get PoolTimeout.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+
+POOL_SIZE = int(os.environ.get('DRIVER_POOL_SIZE', 2))
+POOL_WARM = int(os.environ.get('DRIVER_POOL_WARM', 1))
+MAX_USES = int(os.environ.get('DRIVER_MAX_USES', 20))
+MAX_RSS_MB = int(os.environ.get('DRIVER_MAX_RSS_MB', 600))
+ACQUIRE_TIMEOUT = float(os.environ.get('DRIVER_ACQUIRE_TIMEOUT', 60))
+
+
+class PoolTimeout(Exception):
+    """No browser session became free within the timeout."""
+
+
+def chrome_options():
+    # Selenium is imported on first use so importing the pool stays cheap
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')
+    return options
+
+
+def create_driver():
+    from selenium import webdriver
+
+    return webdriver.Chrome(options=chrome_options())
+
+
+def _process_tree_rss_mb(root_pid):
+    """Resident memory of a process and all its descendants, in MB (Linux only)."""
+    children = {}
+    rss = {}
+    try:
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                pid, ppid = int(entry), int(fields[1])
+                # Field 24 of /proc/<pid>/stat is RSS in pages
+                rss[pid] = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+                children.setdefault(ppid, []).append(pid)
+            except (OSError, IndexError, ValueError):
+                continue
+    except OSError:
+        return 0
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total / (1024 * 1024)
+
+
+class _Entry:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    def __init__(self, size=POOL_SIZE, warm=POOL_WARM, max_uses=MAX_USES,
+                 max_rss_mb=MAX_RSS_MB, factory=create_driver):
+        self.size = size
+        self.warm_count = min(warm, size)
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.factory = factory
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._leased = {}
+        self._waiting = 0
+        self._stats = {'created': 0, 'recycled': 0, 'unhealthy': 0, 'timeouts': 0, 'leases': 0}
+
+    def _create(self):
+        entry = _Entry(self.factory())
+        with self._lock:
+            self._stats['created'] += 1
+        return entry
+
+    def _quit(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass
+
+    def _healthy(self, entry):
+        try:
+            return entry.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def _rss_mb(self, entry):
+        try:
+            return _process_tree_rss_mb(entry.driver.service.process.pid)
+        except Exception:
+            return 0
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        """Lease a driver, starting one if no warm instance is idle."""
+        with self._lock:
+            self._waiting += 1
+        try:
+            got_slot = self._slots.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        if not got_slot:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeout(f"No browser session available after {timeout}s")
+
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.popleft() if self._idle else None
+                if entry is None:
+                    entry = self._create()
+                    break
+                if self._healthy(entry):
+                    break
+                with self._lock:
+                    self._stats['unhealthy'] += 1
+                self._quit(entry)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._leased[id(entry.driver)] = entry
+            self._stats['leases'] += 1
+        return entry.driver
+
+    def release(self, driver, discard=False):
+        """Return a leased driver. It is reset for reuse or recycled."""
+        with self._lock:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            return
+
+        try:
+            entry.uses += 1
+            recycle = (
+                discard
+                or entry.uses >= self.max_uses
+                or (self.max_rss_mb and self._rss_mb(entry) > self.max_rss_mb)
+                or not self._reset(entry)
+            )
+            if recycle:
+                with self._lock:
+                    self._stats['recycled'] += 1
+                self._quit(entry)
+            else:
+                with self._lock:
+                    self._idle.append(entry)
+        finally:
+            self._slots.release()
+
+    def _reset(self, entry):
+        """Clear session state so the next lease starts logged out."""
+        driver = entry.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.get('about:blank')
+            return True
+        except Exception:
+            return False
+
+    def warm(self):
+        """Start instances in the background until `warm_count` are idle."""
+        def fill():
+            while True:
+                with self._lock:
+                    if len(self._idle) + len(self._leased) >= self.warm_count:
+                        return
+                if not self._slots.acquire(blocking=False):
+                    return
+                try:
+                    entry = self._create()
+                    with self._lock:
+                        self._idle.append(entry)
+                except Exception:
+                    return
+                finally:
+                    self._slots.release()
+
+        threading.Thread(target=fill, name='driver-pool-warm', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'leased': len(self._leased),
+                'waiting': self._waiting,
+                **self._stats
+            }
+
+    def shutdown(self):
+        with self._lock:
+            entries = list(self._idle) + list(self._leased.values())
+            self._idle.clear()
+            self._leased.clear()
+        for entry in entries:
+            self._quit(entry)
+
+
+pool = DriverPool()
+atexit.register(pool.shutdown)
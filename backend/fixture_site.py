@@ -0,0 +1,359 @@
+"""
+Local stand-in for the playrep.pro login and results pages.
+
+Serves Login.mvc with per-digit CaptchaImage elements, the menu4 navigation
+and a paged results grid laid out so the element IDs and XPaths in
+scraper.py resolve exactly as they do on the live site. Used by bench.py to
+exercise the scrape path with no network; point the backend at it with
+SCRAPE_SITE_URL=http://127.0.0.1:5055.
+
+Usage: python fixture_site.py [--port 5055] [--draws 5000] [--latency 0.05] [--accept-any-captcha]
+"""
+import argparse
+import csv
+import datetime
+import json
+import random
+import threading
+import time
+import uuid
+
+import cv2
+import numpy as np
+from flask import Flask, Response, jsonify, redirect, request
+
+from storage import TIMESTAMP_FORMAT
+
+SESSION_COOKIE = 'ASP.NET_SessionId'
+CAPTCHA_LENGTH = 4
+DEFAULT_PAGE_SIZE = 10
+PAGE_SIZES = (5, 10, 15, 20, 25, 30, 40, 50, 75, 100)
+# Page links the pager shows at most; the scraper derives the page count from them
+PAGER_LINKS = 10
+
+
+def generate_draws(count, seed=0, end=None, closed_rate=0.02):
+    """
+    Synthetic draw history, newest first, one draw a minute up to `end`.
+
+    Rows are (number, date, time) like the scraped CSVs; a few are
+    "NOT OPEN", as is the newest one.
+    """
+    rng = random.Random(seed)
+    end = (end or datetime.datetime.now()).replace(second=33, microsecond=0)
+    draws = []
+    for i in range(count):
+        ts = end - datetime.timedelta(minutes=i)
+        closed = i == 0 or rng.random() < closed_rate
+        number = 'NOT OPEN' if closed else str(rng.randrange(10))
+        date, time_of_day = ts.strftime(TIMESTAMP_FORMAT).upper().split(' ', 1)
+        draws.append((number, date, time_of_day))
+    return draws
+
+
+def load_draws(path):
+    """Draws from a scraped-data CSV (Number,Date,Time columns, newest first)."""
+    with open(path, newline='') as f:
+        return [(row['Number'], row['Date'], row['Time']) for row in csv.DictReader(f)]
+
+
+def render_digit(digit, rng):
+    """One CAPTCHA character as PNG bytes: a dark digit on a lightly noised background."""
+    img = np.full((40, 30, 3), 255, dtype=np.uint8)
+    for _ in range(3):
+        p1 = (rng.randrange(30), rng.randrange(40))
+        p2 = (rng.randrange(30), rng.randrange(40))
+        cv2.line(img, p1, p2, (200, 200, 200), 1)
+    cv2.putText(img, digit, (6, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (40, 40, 40), 2, cv2.LINE_AA)
+    ok, buf = cv2.imencode('.png', img)
+    if not ok:
+        raise ValueError("Could not encode CAPTCHA image")
+    return buf.tobytes()
+
+
+_LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Login</title></head>
+<body>
+<div id="header"><h1>PlayRep</h1></div>
+<form method="post" action="/Login.mvc">
+  <p class="error">{error}</p>
+  <input type="text" id="username" name="username">
+  <input type="password" id="password" name="password">
+  <div id="captcha">{images}</div>
+  <input type="text" id="txtCaptcha" name="txtCaptcha">
+  <button type="submit" id="btnCheckLogin">Login</button>
+</form>
+</body></html>
+"""
+
+_MENU = """<ul id="menu4">
+  <li><a href="/Home.mvc">Home</a></li>
+  <li><a href="#">Reports</a>
+    <ul>
+      <li><a href="/Reports.mvc">Results</a></li>
+    </ul>
+  </li>
+</ul>"""
+
+_HOME_PAGE = """<!DOCTYPE html>
+<html><head><title>Home</title></head>
+<body>
+<div id="header"><h1>PlayRep</h1></div>
+<div id="nav">""" + _MENU + """</div>
+<div id="content"><p>Welcome</p></div>
+</body></html>
+"""
+
+# The grid body and pager row sit at the same depth as on the live site
+# (see GRID_BODY_XPATH and PAGER_ROW_XPATH), and the pager text splits into
+# page links + 12 words so the scraper's page-count and Go-button arithmetic
+# holds. The page-size select is td[14] whenever there are 10+ pages.
+_DATA_PAGE = """<!DOCTYPE html>
+<html><head><title>Results</title></head>
+<body>
+<div id="header"><h1>PlayRep</h1></div>
+<div id="nav">""" + _MENU + """</div>
+<div id="content">
+  <div class="container">
+    <div class="sidebar"></div>
+    <div class="main">
+      <div class="panel">
+        <div class="panel-body">
+          <form onsubmit="return false;">
+            <div id="dvFunTarget">
+              <table class="grid ui-jqgrid-btable"><tbody></tbody></table>
+              <table class="pager"><tbody><tr></tr></tbody></table>
+            </div>
+          </form>
+        </div>
+      </div>
+    </div>
+  </div>
+</div>
+<script>
+const PAGE_SIZES = __PAGE_SIZES__;
+const PAGER_LINKS = __PAGER_LINKS__;
+let state = __STATE__;
+const target = document.getElementById('dvFunTarget');
+const body = target.querySelector('table.grid > tbody');
+const pager = target.querySelector('table.pager > tbody > tr');
+const COL_MODEL = [{name: 'rn'}, {name: 'Number'}, {name: 'DrawTime'}];
+
+// Just enough of jQuery/jqGrid for getGridParam (the scraper's direct fetch mode)
+window.jQuery = () => ({
+  jqGrid: () => ({
+    url: '/Reports.mvc/Grid', mtype: 'GET', datatype: 'json', colModel: COL_MODEL,
+    postData: {sidx: 'DrawTime', sord: 'desc'}, rowNum: state.rows_per_page
+  })
+});
+window.jQuery.fn = {jqGrid: true};
+
+function cell(text) {
+  const td = document.createElement('td');
+  td.textContent = text;
+  return td;
+}
+
+function render() {
+  body.replaceChildren(...state.rows.map(r => {
+    const tr = document.createElement('tr');
+    tr.append(cell(r.id), cell(r.cell[0]), cell(r.cell[1]));
+    return tr;
+  }));
+
+  const tds = [cell('First'), cell('Prev')];
+  const links = Math.min(PAGER_LINKS, state.total);
+  const first = Math.max(1, Math.min(state.page - Math.floor(links / 2), state.total - links + 1));
+  for (let p = first; p < first + links; p++) {
+    const td = cell(String(p));
+    td.onclick = () => load(p, state.rows_per_page);
+    tds.push(td);
+  }
+  const go = cell(`Showing page ${state.page} of ${state.total} (${state.records} records) - go to`);
+  const input = document.createElement('input');
+  input.type = 'text';
+  input.id = 'dvFunTargettxtJqGridGoToPage';
+  const button = document.createElement('input');
+  button.type = 'button';
+  button.value = 'Go';
+  button.onclick = () => load(parseInt(input.value, 10) || 1, state.rows_per_page);
+  go.append(input, button);
+  tds.push(go);
+
+  const size = document.createElement('td');
+  const select = document.createElement('select');
+  for (const n of PAGE_SIZES) {
+    // Options carry a label but no text, so they add nothing to the row's text
+    const option = document.createElement('option');
+    option.value = n;
+    option.label = n;
+    option.selected = n === state.rows_per_page;
+    select.append(option);
+  }
+  select.onchange = () => load(1, parseInt(select.value, 10));
+  size.append(select);
+  tds.push(size);
+  pager.replaceChildren(...tds);
+}
+
+async function load(page, rows) {
+  const response = await fetch(`/Reports.mvc/Grid?page=${page}&rows=${rows}`);
+  if (response.ok) {
+    state = await response.json();
+    render();
+  }
+}
+
+render();
+</script>
+</body></html>
+"""
+
+
+class FixtureSite:
+    """
+    Holds the draws and sessions behind the fixture pages.
+
+    `latency` (seconds) is added to every response to mimic the network.
+    With `accept_any_captcha` any answer logs in, for machines without
+    Tesseract; the expected answers stay available for scoring OCR.
+    """
+
+    def __init__(self, draws, latency=0.0, accept_any_captcha=False, seed=0):
+        self.draws = draws
+        self.latency = latency
+        self.accept_any_captcha = accept_any_captcha
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self.stats = {'logins': 0, 'rejected_logins': 0, 'grid_requests': 0}
+
+    def _session(self):
+        sid = request.cookies.get(SESSION_COOKIE)
+        with self._lock:
+            if sid not in self._sessions:
+                sid = uuid.uuid4().hex
+                self._sessions[sid] = {'captcha': '', 'logged_in': False}
+            return sid, self._sessions[sid]
+
+    def expected_captcha(self, sid=None):
+        """The CAPTCHA answer of session `sid` (or of the most recent session)."""
+        with self._lock:
+            if sid is None:
+                sid = next(reversed(self._sessions), None)
+            session = self._sessions.get(sid)
+            return session['captcha'] if session else None
+
+    def grid_page(self, page, rows_per_page):
+        total = max(1, -(-len(self.draws) // rows_per_page))
+        page = min(max(page, 1), total)
+        start = (page - 1) * rows_per_page
+        # jqGrid's default JSON reader format
+        rows = [
+            {'id': start + i + 1, 'cell': [number, f'{date} {time_of_day}']}
+            for i, (number, date, time_of_day) in enumerate(self.draws[start:start + rows_per_page])
+        ]
+        return {
+            'page': page,
+            'total': total,
+            'records': len(self.draws),
+            'rows_per_page': rows_per_page,
+            'rows': rows
+        }
+
+    def _login_page(self, error=''):
+        sid, session = self._session()
+        with self._lock:
+            session['captcha'] = ''.join(self._rng.choice('0123456789') for _ in range(CAPTCHA_LENGTH))
+        nonce = uuid.uuid4().hex[:8]
+        images = ''.join(
+            f'<img src="/CaptchaImage.mvc?i={i}&amp;v={nonce}" alt="">' for i in range(CAPTCHA_LENGTH)
+        )
+        response = Response(_LOGIN_PAGE.format(error=error, images=images), mimetype='text/html')
+        response.set_cookie(SESSION_COOKIE, sid)
+        return response
+
+    def create_app(self):
+        app = Flask(__name__)
+
+        @app.before_request
+        def delay():
+            if self.latency:
+                time.sleep(self.latency)
+
+        @app.route('/Login.mvc', methods=['GET'])
+        def login_page():
+            return self._login_page()
+
+        @app.route('/Login.mvc', methods=['POST'])
+        def login():
+            sid, session = self._session()
+            answer = request.form.get('txtCaptcha', '').strip()
+            credentials = request.form.get('username') and request.form.get('password')
+            if credentials and (self.accept_any_captcha or answer == session['captcha']):
+                with self._lock:
+                    session['logged_in'] = True
+                    self.stats['logins'] += 1
+                response = redirect('/Home.mvc')
+                response.set_cookie(SESSION_COOKIE, sid)
+                return response
+            with self._lock:
+                self.stats['rejected_logins'] += 1
+            return self._login_page('Invalid username, password or captcha')
+
+        @app.route('/CaptchaImage.mvc')
+        def captcha_image():
+            _, session = self._session()
+            index = request.args.get('i', 0, type=int)
+            digit = session['captcha'][index] if index < len(session['captcha']) else ' '
+            with self._lock:
+                png = render_digit(digit, self._rng)
+            return Response(png, mimetype='image/png', headers={'Cache-Control': 'no-store'})
+
+        @app.route('/Home.mvc')
+        def home():
+            _, session = self._session()
+            if not session['logged_in']:
+                return redirect('/Login.mvc')
+            return Response(_HOME_PAGE, mimetype='text/html')
+
+        @app.route('/Reports.mvc')
+        def reports():
+            _, session = self._session()
+            if not session['logged_in']:
+                return redirect('/Login.mvc')
+            page = (_DATA_PAGE
+                    .replace('__PAGE_SIZES__', json.dumps(PAGE_SIZES))
+                    .replace('__PAGER_LINKS__', str(PAGER_LINKS))
+                    .replace('__STATE__', json.dumps(self.grid_page(1, DEFAULT_PAGE_SIZE))))
+            return Response(page, mimetype='text/html')
+
+        @app.route('/Reports.mvc/Grid')
+        def grid():
+            _, session = self._session()
+            if not session['logged_in']:
+                return jsonify({'error': 'Not logged in'}), 401
+            with self._lock:
+                self.stats['grid_requests'] += 1
+            return jsonify(self.grid_page(
+                request.args.get('page', 1, type=int),
+                request.args.get('rows', DEFAULT_PAGE_SIZE, type=int)
+            ))
+
+        return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the playrep.pro pages.')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--draws', type=int, default=5000, help='number of synthetic draws')
+    parser.add_argument('--csv', help='serve the draws from a scraped-data CSV instead')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--accept-any-captcha', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    draws = load_draws(args.csv) if args.csv else generate_draws(args.draws, args.seed)
+    site = FixtureSite(draws, args.latency, args.accept_any_captcha, args.seed)
+    print(f"Serving {len(draws)} draws on http://127.0.0.1:{args.port}/Login.mvc")
+    site.create_app().run(host='127.0.0.1', port=args.port, threaded=True)
@@ -0,0 +1,251 @@
+"""
+Direct access to the results grid's data endpoint.
+
+The results table is a jqGrid that loads its rows over XHR. Once a browser
+session has logged in, GridClient reads the grid's own request settings
+from the page, copies the session cookies into a requests session, and
+calls the data endpoint itself with large page sizes, so no rows have to
+be rendered or walked with XPath.
+"""
+import datetime
+import json
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+import zoneinfo
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import throttle
+from storage import TIMESTAMP_FORMAT
+
+# Overrides the data URL read from the page
+GRID_URL = os.environ.get('SCRAPE_GRID_URL')
+# Rows asked for per request
+GRID_FETCH_ROWS = int(os.environ.get('SCRAPE_GRID_FETCH_ROWS', 1000))
+HTTP_TIMEOUT = float(os.environ.get('SCRAPE_HTTP_TIMEOUT', 30))
+# The site's time zone (e.g. "Asia/Kolkata"). The grid shows site-local
+# times, and the store keeps them as-is, so epoch values from the data
+# endpoint are converted to this zone. Defaults to UTC.
+SITE_TIMEZONE = (
+    zoneinfo.ZoneInfo(os.environ['SCRAPE_SITE_TZ']) if os.environ.get('SCRAPE_SITE_TZ') else datetime.timezone.utc
+)
+# Columns jqGrid adds on the client (row numbers, checkboxes, subgrid toggles)
+CLIENT_COLUMNS = ('rn', 'cb', 'subgrid')
+
+# Connection pool shared by every GridClient; cookies stay per session
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(os.environ.get('SCRAPE_HTTP_POOL_SIZE', 8)))
+
+# The grid's settings, or null when the page has no jqGrid
+_GRID_PARAMS_JS = """
+const table = document.querySelector('table.ui-jqgrid-btable');
+if (!table || !window.jQuery || !jQuery.fn || !jQuery.fn.jqGrid) return null;
+const p = jQuery(table).jqGrid('getGridParam');
+const postData = Object.fromEntries(Object.entries(p.postData || {}).filter(
+    ([, v]) => ['string', 'number', 'boolean'].includes(typeof v)
+));
+return {
+    url: p.url ? new URL(p.url, location.href).href : null,
+    mtype: p.mtype || 'GET',
+    datatype: p.datatype,
+    postData: postData,
+    prmNames: p.prmNames || {},
+    jsonReader: p.jsonReader || {},
+    columns: (p.colModel || []).map(c => [c.name, c.jsonmap || null]),
+    userAgent: navigator.userAgent,
+    referer: location.href
+};
+"""
+
+_ASPNET_DATE = re.compile(r'/Date\((-?\d+)[^)]*\)/')
+
+
+def split_timestamp(value):
+    """
+    A grid date-time value as (date, time) in the scraped CSV format.
+
+    Accepts the rendered form ('09-DEC-2025 10:38:33 AM'), ASP.NET JSON
+    dates ('/Date(1765276713000)/') and ISO strings. Epoch dates and ISO
+    strings with an offset are converted to SITE_TIMEZONE.
+    """
+    text = str(value).strip()
+    match = _ASPNET_DATE.fullmatch(text)
+    if match:
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        ts = epoch + datetime.timedelta(milliseconds=int(match.group(1)))
+    else:
+        try:
+            ts = datetime.datetime.fromisoformat(text)
+        except ValueError:
+            return text[:11], text[12:]
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(SITE_TIMEZONE)
+    date, time_of_day = ts.strftime(TIMESTAMP_FORMAT).upper().split(' ', 1)
+    return date, time_of_day
+
+
+class GridClient:
+    """
+    Calls the grid's data endpoint with a logged-in session's cookies.
+
+    `params` is what _GRID_PARAMS_JS returns. Rows come back as
+    (number, date, time) tuples, the same columns the DOM scrape reads:
+    the grid's second and third columns.
+    """
+
+    def __init__(self, params, cookies):
+        self.url = GRID_URL or params['url']
+        if not self.url:
+            raise ValueError("The grid has no data URL")
+        self.method = (params.get('mtype') or 'GET').upper()
+        self.post_data = params.get('postData') or {}
+        self.names = {
+            'page': 'page', 'rows': 'rows', 'sort': 'sidx', 'order': 'sord', 'search': '_search', 'nd': 'nd',
+            **{k: v for k, v in (params.get('prmNames') or {}).items() if v}
+        }
+        self.reader = {
+            'root': 'rows', 'page': 'page', 'total': 'total', 'records': 'records', 'cell': 'cell',
+            'repeatitems': True, **(params.get('jsonReader') or {})
+        }
+
+        # Without the page's settings, assume the rendered layout: row numbers, number, date
+        columns = params.get('columns') or [('rn', None), ('Number', None), ('Date', None)]
+        if len(columns) < 3:
+            raise ValueError("Unexpected grid columns")
+        data_columns = [name for name, _ in columns if name not in CLIENT_COLUMNS]
+        # (position in a cell array, name in an object row) for number and date
+        self.fields = []
+        for name, jsonmap in columns[1:3]:
+            if name in CLIENT_COLUMNS:
+                raise ValueError(f"Grid column {name} is not served by the data endpoint")
+            self.fields.append((data_columns.index(name), jsonmap or name))
+
+        self.session = requests.Session()
+        self.session.mount('http://', _adapter)
+        self.session.mount('https://', _adapter)
+        self.session.headers.update({
+            'User-Agent': params.get('userAgent') or 'Mozilla/5.0',
+            'Referer': params.get('referer') or self.url,
+            'X-Requested-With': 'XMLHttpRequest',
+            'Accept': 'application/json, text/javascript, */*; q=0.01'
+        })
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'], domain=cookie.get('domain') or '', path=cookie.get('path', '/')
+            )
+
+    @classmethod
+    def from_driver(cls, driver):
+        """Build a client from a browser that has the grid page open."""
+        params = driver.execute_script(_GRID_PARAMS_JS)
+        if not params and not GRID_URL:
+            raise ValueError("No jqGrid found on the page")
+        return cls(params or {}, driver.get_cookies())
+
+    def fetch(self, page, rows):
+        """
+        One page of `rows` draws, newest first.
+
+        Returns (draws, total pages, total records).
+        """
+        query = {
+            **self.post_data,
+            self.names['page']: page,
+            self.names['rows']: rows,
+            self.names['search']: 'false',
+            self.names['nd']: int(time.time() * 1000),
+        }
+        throttle()
+        if self.method == 'POST':
+            response = self.session.post(self.url, data=query, timeout=HTTP_TIMEOUT)
+        else:
+            response = self.session.get(self.url, params=query, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        if response.content.lstrip().startswith(b'<'):
+            return self._parse_xml(response.content)
+        return self._parse_json(response.json())
+
+    def _cells(self, cells):
+        values = []
+        for index, name in self.fields:
+            values.append(cells[index] if isinstance(cells, list) else cells.get(name))
+        number, date_time = values
+        if number is None or date_time is None:
+            raise ValueError("Grid row is missing the number or date column")
+        return (str(number).strip(), *split_timestamp(date_time))
+
+    def _parse_json(self, data):
+        # ASP.NET page methods wrap the payload as {"d": ...}
+        if isinstance(data, dict) and 'd' in data:
+            data = data['d']
+            if isinstance(data, str):
+                data = json.loads(data)
+        reader = self.reader
+        draws = []
+        for row in data.get(reader['root']) or []:
+            if isinstance(row, dict) and reader['repeatitems'] and reader['cell'] in row:
+                row = row[reader['cell']]
+            draws.append(self._cells(row))
+        return draws, int(data.get(reader['total']) or 1), int(data.get(reader['records']) or len(draws))
+
+    def _parse_xml(self, content):
+        root = ET.fromstring(content)
+        draws = [self._cells([cell.text or '' for cell in row.findall('cell')]) for row in root.iter('row')]
+        total = root.findtext('total')
+        records = root.findtext('records')
+        return draws, int(total or 1), int(records or len(draws))
+
+    def close(self):
+        """
+        Drop this client's cookies and detach it from the shared adapter.
+        Session.close() would close the adapter, and with it the pooled
+        connections of every other client.
+        """
+        self.session.cookies.clear()
+        self.session.adapters.clear()
+
+
+class GridPages:
+    """
+    Pages of draws straight from the data endpoint, up to `max_records`.
+
+    Same interface as scraper.PageFetcher, so the scrape loop treats both
+    alike: in_order() yields (page, rows, seconds, error).
+    """
+
+    def __init__(self, client, max_records, phases, page_size=GRID_FETCH_ROWS):
+        self.client = client
+        self.max_records = max_records
+        self.page_size = max(1, min(page_size, max_records))
+        self.phases = phases
+        self._stop = -(-max_records // self.page_size)
+        self.last_page = self._stop
+
+    def in_order(self):
+        num = 1
+        fetched = 0
+        while num <= self._stop and fetched < self.max_records:
+            start = time.perf_counter()
+            try:
+                with self.phases.span('grid_fetch'):
+                    rows, total, _ = self.client.fetch(num, self.page_size)
+            except Exception as e:
+                yield num, None, 0.0, e
+                num += 1
+                continue
+            rows = rows[:self.max_records - fetched]
+            fetched += len(rows)
+            self._stop = min(self._stop, total)
+            self.last_page = min(self.last_page, total)
+            yield num, rows, time.perf_counter() - start, None
+            if not rows:
+                return
+            num += 1
+
+    def stop_after(self, num):
+        self._stop = min(self._stop, num)
+
+    def close(self):
+        self.client.close()
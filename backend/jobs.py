@@ -0,0 +1,327 @@
+"""
+Background jobs with replayable event logs, scheduled fairly per account.
+
+A job runs a generator of event dicts on a bounded set of workers. Every
+event is kept on the job, so any number of SSE clients can attach at any
+time and replay what they missed; a client disconnecting doesn't stop the
+work. Events should stay small (a scrape's draws go to the store, and its
+events only say which ones); sse_events can fill them in as they are sent.
+Jobs submitted with the same key while one is still active share it.
+
+Queued jobs wait in one queue per account and workers take from the
+accounts in turn, so one account queueing many scrapes can't starve the
+others; each account also has at most ACCOUNT_MAX_ACTIVE jobs running and
+ACCOUNT_MAX_QUEUED waiting. Waiting jobs get "queued" events with their
+place in line and a wait estimate from recent job durations.
+
+Work that drives the site outside a job (the live tail, the CAPTCHA debug
+endpoint) holds a slot with reserve() instead, and counts against the same
+limits.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', os.environ.get('DRIVER_POOL_SIZE', 2)))
+# Seconds finished jobs stay available for status checks and replay
+JOB_TTL = int(os.environ.get('JOB_TTL', 600))
+# Jobs one account may have running, and waiting, at once
+ACCOUNT_MAX_ACTIVE = int(os.environ.get('ACCOUNT_MAX_ACTIVE', 1))
+ACCOUNT_MAX_QUEUED = int(os.environ.get('ACCOUNT_MAX_QUEUED', 3))
+# Assumed job duration (seconds) until some jobs have finished
+DEFAULT_JOB_SECONDS = 60
+# Seconds between SSE keep-alive comments while a job is quiet
+HEARTBEAT_INTERVAL = 15
+
+
+class QueueFull(Exception):
+    """The account already has as many jobs waiting as it may."""
+
+
+class SlotBusy(Exception):
+    """No slot is free for the account right now."""
+
+
+class Job:
+    def __init__(self, key, account=None, fn=None, args=()):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.account = account
+        self.fn = fn
+        self.args = args
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # 1-based place in line and estimated seconds until start, while queued
+        self.queue_position = None
+        self.estimated_wait = None
+        self.events = []
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def publish(self, event):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def finish(self, status):
+        with self._cond:
+            self.status = status
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def wait_events(self, start, timeout=None):
+        """Events from index `start` on, blocking until there are some or the job ends."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.events) > start or self.finished, timeout)
+            return self.events[start:], self.finished
+
+    def wait(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def summary(self):
+        last = self.events[-1] if self.finished and self.events else {}
+        queued = self.status == 'queued'
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queue_position': self.queue_position if queued else None,
+            'estimated_wait': self.estimated_wait if queued else None,
+            'events': len(self.events),
+            'result': last.get('data') if last.get('type') == 'complete' else None,
+            'error': last.get('message') if last.get('type') == 'error' else None
+        }
+
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS, ttl=JOB_TTL, max_active=ACCOUNT_MAX_ACTIVE,
+                 max_queued=ACCOUNT_MAX_QUEUED):
+        self.workers = workers
+        self.ttl = ttl
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._jobs = {}
+        self._active = {}
+        # Waiting jobs per account; the first account is next in turn
+        self._queues = OrderedDict()
+        self._running = Counter()
+        # Slots held through reserve(), per account
+        self._held = Counter()
+        self._avg_duration = DEFAULT_JOB_SECONDS
+        for n in range(workers):
+            threading.Thread(target=self._worker, name=f'job-{n}', daemon=True).start()
+
+    def submit(self, key, fn, *args, account=None):
+        """
+        Queue `fn(*args)` (a generator of events) as a job for `account`.
+
+        Returns (job, created); if an unfinished job with the same key
+        exists it is returned instead of starting a new one. Raises
+        QueueFull when the account already has max_queued jobs waiting.
+        """
+        with self._lock:
+            self._prune()
+            job = self._active.get(key)
+            if job is not None and not job.finished:
+                return job, False
+            queue = self._queues.get(account)
+            if queue is not None and len(queue) >= self.max_queued:
+                raise QueueFull(f"{len(queue)} scrapes are already waiting for this account")
+            job = Job(key, account, fn, args)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._queues.setdefault(account, deque()).append(job)
+            moved = self._update_positions()
+            self._ready.notify()
+        self._announce(moved)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """Number of retained jobs in each status."""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ('queued', 'running', 'completed', 'failed')}
+
+    def reserve(self, account=None):
+        """
+        Hold a slot for `account` outside the queue, as if one of its jobs
+        were running. Returns a function that gives the slot back (calling
+        it again does nothing). Raises SlotBusy when every slot is taken or
+        the account is at max_active.
+        """
+        with self._lock:
+            if self._busy() >= self.workers or self._active_for(account) >= self.max_active:
+                raise SlotBusy("All scrape slots are busy")
+            self._held[account] += 1
+            moved = self._update_positions()
+        self._announce(moved)
+
+        released = threading.Event()
+
+        def release():
+            with self._lock:
+                if released.is_set():
+                    return
+                released.set()
+                self._held[account] -= 1
+                if not self._held[account]:
+                    del self._held[account]
+                moved = self._update_positions()
+                self._ready.notify_all()
+            self._announce(moved)
+
+        return release
+
+    def _busy(self):
+        """Slots in use: running jobs plus reserved slots."""
+        return sum(self._running.values()) + sum(self._held.values())
+
+    def _active_for(self, account):
+        return self._running[account] + self._held[account]
+
+    def _next_job(self):
+        """Take the first waiting job of the first account in turn that may run another one."""
+        if self._busy() >= self.workers:
+            return None
+        for account, queue in self._queues.items():
+            if self._active_for(account) < self.max_active:
+                job = queue.popleft()
+                if queue:
+                    self._queues.move_to_end(account)
+                else:
+                    del self._queues[account]
+                return job
+        return None
+
+    def _queue_order(self):
+        """Waiting jobs in the order they would start: one per account in turn."""
+        order = []
+        pending = [list(queue) for queue in self._queues.values()]
+        for depth in range(max(map(len, pending), default=0)):
+            order.extend(queue[depth] for queue in pending if depth < len(queue))
+        return order
+
+    def _update_positions(self):
+        """Refresh every waiting job's position and estimate; returns the jobs whose position changed."""
+        free = max(0, self.workers - self._busy())
+        # Reserved slots are held for longer than a job, so only the rest turn over
+        turnover = max(1, self.workers - sum(self._held.values()))
+        moved = []
+        for index, job in enumerate(self._queue_order()):
+            # Jobs beyond the free workers wait for whole rounds of running jobs
+            rounds = 0 if index < free else (index - free) // turnover + 1
+            wait = round(rounds * self._avg_duration)
+            if job.queue_position != index + 1:
+                moved.append(job)
+            job.queue_position, job.estimated_wait = index + 1, wait
+        return moved
+
+    def _announce(self, jobs):
+        for job in jobs:
+            job.publish({
+                "type": "queued",
+                "position": job.queue_position,
+                "estimated_wait": job.estimated_wait,
+                "message": f"Waiting for a free slot: position {job.queue_position} in queue, "
+                           f"about {job.estimated_wait}s"
+            })
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                job = self._ready.wait_for(self._next_job)
+                self._running[job.account] += 1
+                job.status = 'running'
+                job.started_at = time.time()
+                moved = self._update_positions()
+            self._announce(moved)
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._running[job.account] -= 1
+                    if not self._running[job.account]:
+                        del self._running[job.account]
+                    duration = job.finished_at - job.started_at
+                    self._avg_duration = 0.7 * self._avg_duration + 0.3 * duration
+                    moved = self._update_positions()
+                    # Another account's job, or this account's next one, may run now
+                    self._ready.notify_all()
+                self._announce(moved)
+
+    def _run(self, job):
+        status = 'failed'
+        try:
+            for event in job.fn(*job.args):
+                job.publish(event)
+                if event.get('type') == 'complete':
+                    status = 'completed'
+        except Exception as e:
+            job.publish({"type": "error", "message": str(e), "status": 500})
+        finally:
+            job.fn = job.args = None
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            job.finish(status)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+manager = JobManager()
+
+
+def sse_stream(wait_events, last_event_id, expand=None):
+    """
+    Stream events as SSE. `wait_events(after, timeout)` returns the
+    (id, event) pairs after id `after`, blocking up to `timeout` seconds
+    for some, and whether the source has ended. `expand`, if given, maps
+    each event to what is sent for it.
+
+    Quiet spells get a keep-alive comment every HEARTBEAT_INTERVAL seconds.
+    Ends once the source has ended and every event has been sent.
+    """
+    position = last_event_id
+    while True:
+        events, ended = wait_events(position, HEARTBEAT_INTERVAL)
+        for event_id, event in events:
+            yield f"id: {event_id}\ndata: {json.dumps(expand(event) if expand else event)}\n\n"
+            position = event_id
+        if ended and not events:
+            return
+        if not events:
+            yield ": keep-alive\n\n"
+
+
+def sse_events(job, last_event_id=-1, expand=None):
+    """
+    Stream a job's events as SSE, replaying everything after `last_event_id`.
+
+    Each event carries its index as the SSE id so EventSource reconnects
+    resume where they left off. Ends once the job has finished.
+    """
+    def wait_events(after, timeout):
+        events, finished = job.wait_events(after + 1, timeout)
+        return list(enumerate(events, after + 1)), finished
+
+    return sse_stream(wait_events, last_event_id, expand)
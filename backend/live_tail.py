@@ -0,0 +1,290 @@
+"""
+Live tail of the results grid.
+
+A TailWatcher keeps one logged-in session per account and re-reads only
+the first grid page, timed to the draw cadence: draws land about once a
+minute, so after each new draw the next poll is scheduled for when the
+following one should appear, with short retries while it is late. Draws
+newer than the last one seen are stored and published as records events
+to every SSE subscriber; the NOT OPEN placeholder the grid shows for the
+draw that hasn't landed yet is skipped until it has its digit. A watcher
+starts with its first subscriber and stops once nobody has been listening
+for TAIL_IDLE_TIMEOUT seconds.
+
+While it has a browser a watcher holds one of the account's scrape slots
+(see jobs), so tails and scrapes share the per-account limits. In 'http'
+fetch mode the browser is only used to log in and goes back to the pool
+with the slot; the grid is then polled over HTTP with the session's
+cookies.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from driver_pool import pool as driver_pool, PoolTimeout
+from grid_client import GridClient
+from jobs import SlotBusy, manager as scrape_jobs, sse_stream
+from metrics import PhaseTimer, registry as metrics
+from rate_limit import throttle
+from scraper import (
+    FETCH_MODE, LoginFailed, Waiter, drain, error_event, extract_page_rows, log_event, open_data_page,
+    records_event
+)
+from storage import get_store, parse_timestamp, to_epoch
+
+# Seconds between draws on the site
+TAIL_INTERVAL = float(os.environ.get('TAIL_INTERVAL', 60))
+# Seconds between polls while a draw is due but hasn't shown up
+TAIL_RETRY = float(os.environ.get('TAIL_RETRY', 5))
+# Seconds a watcher keeps running with no subscribers
+TAIL_IDLE_TIMEOUT = float(os.environ.get('TAIL_IDLE_TIMEOUT', 120))
+# Seconds to wait before reopening a session that failed
+TAIL_ERROR_BACKOFF = float(os.environ.get('TAIL_ERROR_BACKOFF', 30))
+# Rows read from page 1 over HTTP; plenty to bridge a missed poll
+TAIL_ROWS = 50
+# Events kept for subscribers reconnecting with Last-Event-ID
+TAIL_BACKLOG = 200
+
+
+def _epoch(row):
+    ts = parse_timestamp(row[1], row[2])
+    return to_epoch(ts) if ts is not None else None
+
+
+class TailWatcher:
+    def __init__(self, key, username, password, data_dir, fetch_mode=FETCH_MODE, on_stop=None):
+        self.key = key
+        self.username = username
+        self.password = password
+        self.data_dir = data_dir
+        self.fetch_mode = fetch_mode
+        self.on_stop = on_stop
+        self.subscribers = 0
+        self.stopped = False
+        # Newest draw seen with a digit (epoch seconds, site clock)
+        self.last_seen = None
+        # Timestamps last seen as NOT OPEN, still waiting for their digit
+        self._pending = set()
+        # Server time minus site time at which draws show up, learned from polls
+        self._offset = None
+        self._empty_poll_at = None
+        self._idle_since = time.time()
+        self._events = deque(maxlen=TAIL_BACKLOG)
+        self._next_id = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='tail', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def publish(self, event):
+        with self._cond:
+            self._events.append((self._next_id, event))
+            self._next_id += 1
+            self._cond.notify_all()
+
+    def wait_events(self, after, timeout=None):
+        """(id, event) pairs after id `after`, blocking until there are some or the watcher stops."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._next_id - 1 > after or self.stopped, timeout)
+            return [(i, e) for i, e in self._events if i > after], self.stopped
+
+    @property
+    def position(self):
+        """Id of the latest event, so a new subscriber only gets what comes next."""
+        with self._cond:
+            return self._next_id - 1
+
+    def subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+            if not self.subscribers:
+                self._idle_since = time.time()
+
+    def _idle(self):
+        with self._cond:
+            return not self.subscribers and time.time() - self._idle_since > TAIL_IDLE_TIMEOUT
+
+    def _should_stop(self):
+        return self._stop.is_set() or self._idle()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        store = get_store(self.data_dir)
+        latest = store.latest()
+        self.last_seen = to_epoch(latest) if latest else None
+        try:
+            while not self._should_stop():
+                try:
+                    self._watch(store)
+                except LoginFailed:
+                    self.publish(error_event("Login failed - Incorrect credentials or CAPTCHA", 401))
+                    return
+                except (PoolTimeout, SlotBusy):
+                    self.publish(log_event("All browser sessions are busy, retrying", "warning"))
+                    self._stop.wait(TAIL_RETRY)
+                except Exception as e:
+                    self.publish(log_event(f"Tail session lost ({str(e)}), reconnecting", "warning"))
+                    self._stop.wait(TAIL_ERROR_BACKOFF)
+        finally:
+            with self._cond:
+                self.stopped = True
+                self._cond.notify_all()
+            if self.on_stop:
+                self.on_stop(self)
+
+    def _watch(self, store):
+        """Log in once, then poll page 1 until stopped or the session breaks."""
+        phases = PhaseTimer()
+        release_slot = scrape_jobs.reserve(self.username)
+        driver = client = None
+        try:
+            driver = driver_pool.acquire(timeout=TAIL_RETRY)
+            waiter = Waiter(driver)
+            signing_in = open_data_page(driver, waiter, self.username, self.password, self.data_dir, phases)
+            drain(signing_in, self.publish)
+
+            if self.fetch_mode == 'http':
+                try:
+                    client = GridClient.from_driver(driver)
+                    driver_pool.release(driver)
+                    driver = None
+                    release_slot()
+                except Exception as e:
+                    self.publish(log_event(
+                        f"Direct grid fetch unavailable ({str(e)}), reading the table instead", "warning"
+                    ))
+
+            if client is not None:
+                def read_first_page():
+                    return client.fetch(1, TAIL_ROWS)[0]
+            else:
+                def read_first_page():
+                    throttle()
+                    driver.refresh()
+                    waiter.data_page()
+                    return extract_page_rows(driver)
+
+            self.publish(log_event("Watching for new draws", "success"))
+            while not self._should_stop():
+                self._stop.wait(self._poll(read_first_page, store))
+        finally:
+            if client is not None:
+                client.close()
+            if driver is not None:
+                driver_pool.release(driver)
+            release_slot()
+
+    def _poll(self, read_first_page, store):
+        """Read page 1, store and publish new draws; returns seconds until the next poll."""
+        rows = read_first_page()
+        now = time.time()
+        # The newest row is NOT OPEN until its draw lands: only rows with a
+        # digit count as seen, and a pending row is published once it has one
+        drawn = []
+        for row in rows:
+            epoch = _epoch(row)
+            if epoch is None:
+                continue
+            if not row[0].strip().isdigit():
+                self._pending.add(epoch)
+            elif epoch > (self.last_seen or 0) or epoch in self._pending:
+                self._pending.discard(epoch)
+                drawn.append((epoch, row))
+        if rows:
+            oldest = min((_epoch(row) or 0) for row in rows)
+            self._pending = {epoch for epoch in self._pending if epoch >= oldest}
+        fresh = [row for _, row in drawn]
+
+        newest = max((epoch for epoch, _ in drawn), default=None)
+        if newest is not None and newest > (self.last_seen or 0):
+            if self._empty_poll_at is not None and now - self._empty_poll_at <= 2 * TAIL_RETRY:
+                # The draw landed between the last two polls: a close fix on when draws show up
+                self._offset = (self._empty_poll_at + now) / 2 - newest
+            elif self._offset is not None:
+                # It was already there when we looked; look a second earlier next time
+                self._offset -= 1
+            self._empty_poll_at = None
+            self.last_seen = newest
+        else:
+            self._empty_poll_at = now
+
+        if fresh:
+            added = store.insert(fresh)
+            self.publish(records_event(1, fresh, added))
+
+        if self.last_seen is None or self._offset is None:
+            return TAIL_RETRY
+        due = self.last_seen + TAIL_INTERVAL + self._offset
+        if due > now:
+            return due - now
+        # Overdue: retry quickly for a while, then slow down (the site may be paused)
+        return TAIL_RETRY if now - due < TAIL_INTERVAL else TAIL_INTERVAL / 4
+
+
+class TailManager:
+    """One TailWatcher per account, started on demand."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watchers = {}
+
+    def watch(self, username, password, data_dir, fetch_mode=None):
+        """The running watcher for this account, or a new one."""
+        fetch_mode = fetch_mode or FETCH_MODE
+        key = hashlib.sha256(json.dumps([username, password, fetch_mode]).encode()).hexdigest()
+        with self._lock:
+            watcher = self._watchers.get(key)
+            if watcher is None or watcher.stopped:
+                watcher = TailWatcher(key, username, password, data_dir, fetch_mode, on_stop=self._remove)
+                self._watchers[key] = watcher
+                watcher.start()
+            return watcher
+
+    def _remove(self, watcher):
+        with self._lock:
+            if self._watchers.get(watcher.key) is watcher:
+                del self._watchers[watcher.key]
+
+    def stats(self):
+        with self._lock:
+            watchers = list(self._watchers.values())
+        return {'watchers': len(watchers), 'subscribers': sum(w.subscribers for w in watchers)}
+
+
+manager = TailManager()
+
+
+def _tail_gauges():
+    stats = manager.stats()
+    yield 'tail_watchers', {}, stats['watchers']
+    yield 'tail_subscribers', {}, stats['subscribers']
+
+
+metrics.register_gauge(_tail_gauges)
+
+
+def tail_events(watcher, last_event_id=None):
+    """
+    Stream a watcher's events as SSE while the client stays connected.
+
+    Without `last_event_id` the stream starts with the next event; with it,
+    whatever is still in the backlog after that id is replayed first.
+    """
+    position = watcher.position if last_event_id is None else last_event_id
+    watcher.subscribe()
+    try:
+        yield f"data: {json.dumps(log_event('Connected to live tail', 'info'))}\n\n"
+        yield from sse_stream(watcher.wait_events, position)
+    finally:
+        watcher.unsubscribe()
@@ -0,0 +1,151 @@
+"""
+In-process metrics exposed in Prometheus text format.
+
+Counters and duration histograms are recorded as they happen. Gauges are
+read from callbacks at scrape time, so they always show current pool and
+queue state. PhaseTimer wraps the steps of one scrape: each span is
+observed in the phase histogram and also kept on the timer, so it can go
+out with the next SSE log event.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the duration histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+PHASE_HISTOGRAM = 'scrape_phase_seconds'
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = []
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist['buckets'][i] += 1
+            hist['sum'] += seconds
+            hist['count'] += 1
+
+    def register_gauge(self, fn):
+        """`fn()` returns (name, labels dict, value) tuples, read on every render."""
+        self._gauges.append(fn)
+
+    def render(self):
+        """All metrics in Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, {**hist, 'buckets': list(hist['buckets'])}) for key, hist in self._histograms.items()
+            )
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, key), value in counters:
+            header(name, 'counter')
+            lines.append(f'{name}{_format_labels(key)} {value}')
+
+        for (name, key), hist in histograms:
+            header(name, 'histogram')
+            for bound, count in zip(BUCKETS, hist['buckets']):
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {hist["count"]}')
+            lines.append(f'{name}_sum{_format_labels(key)} {round(hist["sum"], 6)}')
+            lines.append(f'{name}_count{_format_labels(key)} {hist["count"]}')
+
+        for fn in self._gauges:
+            try:
+                samples = list(fn())
+            except Exception:
+                continue
+            for name, labels, value in samples:
+                header(name, 'gauge')
+                lines.append(f'{name}{_format_labels(_label_key(labels))} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+registry.describe(PHASE_HISTOGRAM, 'Duration of each scrape phase in seconds.')
+registry.describe('scrape_login_failures_total', 'Login attempts the site rejected.')
+registry.describe('scrape_page_errors_total', 'Grid pages that failed to load or parse.')
+registry.describe('scrapes_total', 'Finished scrapes by outcome.')
+registry.describe('scrape_session_reuse_total', 'Saved sessions tried instead of a login, by result.')
+registry.describe('scrape_throttled_seconds_total', 'Seconds spent waiting on the site navigation rate limit.')
+
+
+class PhaseTimer:
+    """
+    Times the phases of one scrape (spans may come from several threads).
+
+    Every span is observed in the phase histogram and appended to `spans`;
+    take() hands out the spans not yet attached to a log event.
+    """
+
+    def __init__(self, metrics=registry):
+        self.metrics = metrics
+        self.spans = []
+        self._taken = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.spans.append({'phase': phase, 'seconds': round(seconds, 3)})
+            self.metrics.observe(PHASE_HISTOGRAM, seconds, phase=phase)
+
+    def take(self):
+        """Spans finished since the last call."""
+        with self._lock:
+            spans = self.spans[self._taken:]
+            self._taken = len(self.spans)
+        return spans
+
+    def totals(self):
+        """Seconds spent per phase, summed over its spans."""
+        totals = {}
+        for span in self.spans:
+            totals[span['phase']] = round(totals.get(span['phase'], 0) + span['seconds'], 3)
+        return totals
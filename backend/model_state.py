@@ -0,0 +1,161 @@
+"""
+Persistent per-dataset model state.
+
+Holds the n-gram transition counts, Kneser-Ney continuation counts and
+unigram frequencies for a digit series and updates them as deltas when new
+draws are appended, so nothing is rebuilt over the full history.
+
+A dataset's tables take about 4.5 MB (int32 counts, mostly the order-5
+table), so at most MAX_DATASETS are kept in memory; creating one more
+evicts the least recently used. An evicted dataset raises DatasetEvicted
+until it is dropped, rather than silently starting over empty.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from predictions import NUM_DIGITS, MAX_ORDER, ensemble_prediction, transition_keys
+
+MAX_DATASETS = int(os.environ.get('MAX_DATASETS', 16))
+# Evicted dataset names remembered, so a client hears about the loss
+MAX_EVICTED = 1024
+
+
+class DatasetEvicted(Exception):
+    pass
+
+
+class ModelState:
+    """Incrementally maintained count tables for one dataset."""
+
+    def __init__(self, max_order=MAX_ORDER, capacity=1024):
+        self.max_order = max_order
+        self.counts = {
+            order: np.zeros((NUM_DIGITS ** order, NUM_DIGITS), dtype=np.int32)
+            for order in range(1, max_order + 1)
+        }
+        self.unigram = np.zeros(NUM_DIGITS, dtype=np.int64)
+        # Number of distinct predecessors of each digit
+        self.continuation = np.zeros(NUM_DIGITS, dtype=np.int64)
+        self.total = 0
+        self.length = 0
+        self._buf = np.zeros(capacity, dtype=np.uint8)
+        # Code of the last `order` digits, for each order
+        self._tail = [0] * (max_order + 1)
+        self.lock = threading.Lock()
+
+    @property
+    def series(self):
+        """The full series as a view (no copy)."""
+        return self._buf[:self.length]
+
+    def _reserve(self, extra):
+        needed = self.length + extra
+        if needed > len(self._buf):
+            buf = np.zeros(max(needed, 2 * len(self._buf)), dtype=np.uint8)
+            buf[:self.length] = self._buf[:self.length]
+            self._buf = buf
+
+    def append(self, digit):
+        """Add one draw, bumping one count per order."""
+        digit = int(digit)
+        if not 0 <= digit < NUM_DIGITS:
+            raise ValueError(f"Digit out of range: {digit}")
+
+        for order in range(1, min(self.length, self.max_order) + 1):
+            table = self.counts[order]
+            ctx = self._tail[order]
+            if order == 1 and table[ctx, digit] == 0:
+                self.continuation[digit] += 1
+            table[ctx, digit] += 1
+
+        for order in range(1, self.max_order + 1):
+            self._tail[order] = (self._tail[order] * NUM_DIGITS + digit) % NUM_DIGITS ** order
+
+        self._reserve(1)
+        self._buf[self.length] = digit
+        self.length += 1
+        self.unigram[digit] += 1
+        self.total += digit
+
+    def extend(self, digits):
+        """Add many draws at once, applying the count deltas in vectorized form."""
+        new = np.asarray(digits, dtype=np.int64)
+        if len(new) == 0:
+            return
+        if new.min() < 0 or new.max() >= NUM_DIGITS:
+            raise ValueError("Digits must be between 0 and 9")
+        if len(new) < 32:
+            for d in new:
+                self.append(d)
+            return
+
+        # Overlap with the existing tail so windows crossing the boundary are counted
+        overlap = min(self.length, self.max_order)
+        combined = np.concatenate((self.series[self.length - overlap:].astype(np.int64), new))
+
+        for order in range(1, self.max_order + 1):
+            table = self.counts[order].reshape(-1)
+            table += np.bincount(transition_keys(combined, order, overlap), minlength=table.size)
+
+        self.continuation = (self.counts[1] > 0).sum(axis=0)
+
+        for order in range(1, self.max_order + 1):
+            code = 0
+            for d in combined[-order:]:
+                code = code * NUM_DIGITS + int(d)
+            self._tail[order] = code
+
+        self._reserve(len(new))
+        self._buf[self.length:self.length + len(new)] = new
+        self.length += len(new)
+        self.unigram += np.bincount(new, minlength=NUM_DIGITS)
+        self.total += int(new.sum())
+
+    def summary(self):
+        return {
+            'count': self.length,
+            'mean': round(self.total / self.length, 2) if self.length else 0,
+            'frequency': self.unigram.tolist(),
+            'last_digit': int(self._buf[self.length - 1]) if self.length else None
+        }
+
+    def predict(self):
+        return ensemble_prediction(self.series, self.counts, continuation=self.continuation)
+
+
+# Least recently used first
+_models = OrderedDict()
+_evicted = OrderedDict()
+_models_lock = threading.Lock()
+
+
+def get_model(dataset, create=True):
+    """
+    Return the model state for a dataset, creating it on first use (and
+    evicting the least recently used one when MAX_DATASETS are held).
+
+    Raises DatasetEvicted if the dataset was evicted since it was last used.
+    """
+    with _models_lock:
+        if dataset in _evicted:
+            raise DatasetEvicted(dataset)
+        model = _models.get(dataset)
+        if model is not None:
+            _models.move_to_end(dataset)
+        elif create:
+            while len(_models) >= MAX_DATASETS:
+                name, _ = _models.popitem(last=False)
+                _evicted[name] = True
+                if len(_evicted) > MAX_EVICTED:
+                    _evicted.popitem(last=False)
+            model = _models[dataset] = ModelState()
+        return model
+
+
+def drop_model(dataset):
+    """Forget a dataset, evicted or not. Returns False if it is unknown."""
+    with _models_lock:
+        return _models.pop(dataset, None) is not None or _evicted.pop(dataset, None) is not None
@@ -0,0 +1,336 @@
+"""
+Server-side prediction engine.
+
+NumPy port of frontend/src/components/predictions. Every method works on a
+uint8 digit series (oldest first, newest last) and returns the same values
+as its JS counterpart, so the browser can render the ensemble without
+recomputing it.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NUM_DIGITS = 10
+MAX_ORDER = 5
+
+
+def uniform():
+    return np.full(NUM_DIGITS, 0.1)
+
+
+def to_series(numbers):
+    """Convert a list of ints to a digit series, dropping anything outside 0-9."""
+    arr = np.asarray(numbers, dtype=np.int64)
+    return arr[(arr >= 0) & (arr <= 9)].astype(np.uint8)
+
+
+def context_code(digits):
+    """Integer code of a context, most recent digit last (e.g. [3, 1] -> 31)."""
+    code = 0
+    for d in digits:
+        code = code * NUM_DIGITS + int(d)
+    return code
+
+
+def transition_keys(digits, order, start=0):
+    """
+    Key (context code * 10 + next digit) of every length-`order` window of
+    int64 `digits` and the digit after it, for next digits from index
+    `start` on (earlier ones were counted already).
+    """
+    start = max(start, order)
+    n = len(digits)
+    if start >= n:
+        return np.zeros(0, dtype=np.int64)
+    codes = np.zeros(n - start, dtype=np.int64)
+    for j in range(order):
+        codes = codes * NUM_DIGITS + digits[start - order + j:n - order + j]
+    return codes * NUM_DIGITS + digits[start:]
+
+
+def ngram_counts(series, max_order=MAX_ORDER):
+    """
+    Transition count tensors for orders 1..max_order.
+
+    counts[order] has shape (10 ** order, 10): row = context code, column =
+    the digit that followed it.
+    """
+    series = series.astype(np.int64)
+    counts = {}
+    for order in range(1, max_order + 1):
+        size = NUM_DIGITS ** order
+        keys = transition_keys(series, order)
+        counts[order] = np.bincount(keys, minlength=size * NUM_DIGITS).reshape(size, NUM_DIGITS)
+    return counts
+
+
+def markov_probabilities(counts, order, series):
+    """Transition probabilities for the current context, or None if it was never seen."""
+    if order not in counts or len(series) < order:
+        return None
+    row = counts[order][context_code(series[-order:])]
+    total = row.sum()
+    if total == 0:
+        return None
+    return row / total
+
+
+def variable_order_markov(series, counts):
+    """Highest order whose current context has been observed."""
+    if len(series) < 10:
+        return None
+
+    for order in range(MAX_ORDER, 0, -1):
+        probs = markov_probabilities(counts, order, series)
+        if probs is not None:
+            confidence = float(probs.max())
+            if confidence > 0.1 or order == 1:
+                return {
+                    'order': order,
+                    'context': ','.join(str(d) for d in series[-order:]),
+                    'probabilities': probs,
+                    'confidence': confidence
+                }
+
+    return None
+
+
+def kneser_ney_smoothing(series, counts, discount=0.75, continuation=None):
+    """`continuation` is the number of distinct predecessors of each digit, if already kept."""
+    if len(series) < 10:
+        return uniform()
+
+    if continuation is None:
+        continuation = (counts[1] > 0).sum(axis=0)
+    total_continuations = continuation.sum()
+
+    row = counts[1][int(series[-1])]
+    total = row.sum()
+    if total == 0:
+        return continuation / total_continuations
+
+    discounted = np.maximum(row - discount, 0) / total
+    backoff = (discount * np.count_nonzero(row) / total) * (continuation / total_continuations)
+    return discounted + backoff
+
+
+def recency_weighted_markov(series, decay=0.95):
+    n = len(series)
+    if n < 10:
+        return uniform()
+
+    idx = np.flatnonzero(series[:-1] == series[-1])
+    if len(idx) == 0:
+        return uniform()
+
+    weights = decay ** (n - 2 - idx)
+    predictions = np.bincount(series[idx + 1], weights=weights, minlength=NUM_DIGITS)
+    return predictions / weights.sum()
+
+
+def pattern_completion(series, length=4):
+    n = len(series)
+    if n < 10:
+        return uniform()
+
+    # Windows starting at 0..n-6, matching the JS loop bound (i < n - 5)
+    windows = sliding_window_view(series[:n - 1].astype(np.int64), length)[:n - length - 1]
+    diff = np.abs(windows - series[-length:].astype(np.int64))
+    similarity = (diff == 0).sum(axis=1) + 0.5 * (diff == 1).sum(axis=1)
+
+    mask = similarity >= 2
+    following = series[length:n - 1][mask]
+    scores = np.bincount(following, weights=similarity[mask], minlength=NUM_DIGITS)
+
+    total = scores.sum()
+    return scores / total if total > 0 else uniform()
+
+
+_context_digits = {}
+
+
+def context_digits(order):
+    """Digits of every context code of an order, shape (10 ** order, order)."""
+    if order not in _context_digits:
+        codes = np.arange(NUM_DIGITS ** order)
+        _context_digits[order] = np.stack(
+            [codes // NUM_DIGITS ** (order - 1 - j) % NUM_DIGITS for j in range(order)], axis=1
+        )
+    return _context_digits[order]
+
+
+def pattern_completion_counts(series, counts, length=4):
+    """
+    pattern_completion from the order-`length` count table instead of a scan
+    of the history: every context is scored against the current one once,
+    so the cost depends on 10 ** length, not on the number of draws.
+    """
+    n = len(series)
+    if n < 10 or length not in counts:
+        return pattern_completion(series, length)
+
+    diff = np.abs(context_digits(length) - series[-length:].astype(np.int64))
+    similarity = (diff == 0).sum(axis=1) + 0.5 * (diff == 1).sum(axis=1)
+    weights = np.where(similarity >= 2, similarity, 0.0)
+    scores = weights @ counts[length]
+    # The scan stops before the window followed by the newest draw
+    scores[series[-1]] -= weights[context_code(series[-length - 1:-1])]
+
+    total = scores.sum()
+    return scores / total if total > 0 else uniform()
+
+
+def positional_patterns(series, cycle_length=60):
+    n = len(series)
+    if n < cycle_length:
+        return uniform()
+
+    idx = np.arange(n % cycle_length, n - 1, cycle_length)
+    predictions = np.bincount(series[idx + 1], minlength=NUM_DIGITS).astype(float)
+
+    total = predictions.sum()
+    return predictions / total if total > 0 else uniform()
+
+
+def sequence_momentum(series):
+    if len(series) < 10:
+        return uniform()
+
+    recent = series[-5:].astype(np.int64)
+    avg_first_deriv = (recent[-1] - recent[0]) / (len(recent) - 1)
+    # Math.round semantics (half rounds up)
+    predicted = np.floor(recent[-1] + avg_first_deriv + 0.5)
+
+    predictions = np.exp(-np.abs(np.arange(NUM_DIGITS) - predicted) * 0.5)
+    return predictions / predictions.sum()
+
+
+def entropy_weighting(series, window_size=20):
+    if len(series) < window_size:
+        return {'entropy': 0.5, 'patternWeight': 0.5, 'frequencyWeight': 0.5}
+
+    freq = np.bincount(series[-window_size:], minlength=NUM_DIGITS)
+    p = freq[freq > 0] / window_size
+    normalized = float(-(p * np.log2(p)).sum() / np.log2(NUM_DIGITS))
+
+    return {
+        'entropy': normalized,
+        'patternWeight': 1 - normalized,
+        'frequencyWeight': normalized
+    }
+
+
+def change_point_detection(series, window_size=20, threshold=1.5):
+    n = len(series)
+    if n < 50:
+        return {'changePoints': [], 'currentRegime': 0}
+
+    cumsum = np.concatenate(([0], np.cumsum(series, dtype=np.int64)))
+    idx = np.arange(window_size, n - window_size)
+    mean_before = (cumsum[idx] - cumsum[idx - window_size]) / window_size
+    mean_after = (cumsum[idx + window_size] - cumsum[idx]) / window_size
+    mean_change = np.abs(mean_after - mean_before)
+
+    hits = mean_change > threshold
+    change_points = [
+        {'index': int(i), 'meanChange': float(c)}
+        for i, c in zip(idx[hits], mean_change[hits])
+    ]
+    current_regime = n - change_points[-1]['index'] if change_points else n
+
+    return {'changePoints': change_points, 'currentRegime': current_regime}
+
+
+# Base weight of each method in the ensemble, before the entropy adjustment
+ENSEMBLE_WEIGHTS = {
+    'Markov 1st Order': 0.15,
+    'Markov 2nd Order': 0.14,
+    'Markov 3rd Order': 0.12,
+    'Variable Order Markov': 0.15,
+    'Kneser-Ney Smoothing': 0.11,
+    'Recency-Weighted': 0.10,
+    'Pattern Completion': 0.10,
+    'Positional Cycles': 0.06,
+    'Sequence Momentum': 0.07
+}
+
+
+def ensemble_prediction(series, counts=None, temperature=1.2, weights=None, continuation=None):
+    """
+    Combine all methods with entropy-adjusted weights.
+
+    `weights` overrides base weights by method name (see ENSEMBLE_WEIGHTS);
+    the defaults match the frontend. `counts` and `continuation` may be
+    passed in when already maintained (see model_state). Returns the same
+    structure as calculateEnsemblePrediction, or None when there are fewer
+    than 20 draws.
+    """
+    unknown = set(weights or ()) - set(ENSEMBLE_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown ensemble methods: {', '.join(sorted(unknown))}")
+    base = {**ENSEMBLE_WEIGHTS, **(weights or {})}
+    if min(base.values()) < 0 or not sum(base.values()) > 0:
+        raise ValueError("Ensemble weights must be non-negative and not all zero")
+
+    if len(series) < 20:
+        return None
+
+    if counts is None:
+        counts = ngram_counts(series)
+
+    def markov(order):
+        probs = markov_probabilities(counts, order, series)
+        return probs if probs is not None else uniform()
+
+    vom = variable_order_markov(series, counts)
+    entropy_info = entropy_weighting(series)
+
+    methods = [
+        {'name': 'Markov 1st Order', 'probs': markov(1)},
+        {'name': 'Markov 2nd Order', 'probs': markov(2)},
+        {'name': 'Markov 3rd Order', 'probs': markov(3)},
+        {'name': 'Variable Order Markov', 'probs': vom['probabilities'] if vom else uniform()},
+        {'name': 'Kneser-Ney Smoothing', 'probs': kneser_ney_smoothing(series, counts, continuation=continuation)},
+        {'name': 'Recency-Weighted', 'probs': recency_weighted_markov(series)},
+        {'name': 'Pattern Completion', 'probs': pattern_completion_counts(series, counts)},
+        {'name': 'Positional Cycles', 'probs': positional_patterns(series)},
+        {'name': 'Sequence Momentum', 'probs': sequence_momentum(series)}
+    ]
+    for method in methods:
+        method['weight'] = base[method['name']]
+
+    # Adjust weights based on entropy
+    for method in methods:
+        if 'Pattern' in method['name'] or 'Markov' in method['name']:
+            method['weight'] *= 1 + entropy_info['patternWeight'] * 0.3
+        else:
+            method['weight'] *= 1 + entropy_info['frequencyWeight'] * 0.3
+
+    weights = np.array([m['weight'] for m in methods])
+    weights /= weights.sum()
+    probs = np.stack([m['probs'] for m in methods])
+    combined = weights @ probs
+
+    # Apply temperature scaling
+    scaled = combined ** (1 / temperature)
+    final_probs = scaled / scaled.sum() * 100
+
+    order = sorted(range(NUM_DIGITS), key=lambda d: -final_probs[d])
+    top_predictions = [{'digit': d, 'probability': float(final_probs[d])} for d in order[:5]]
+
+    p = final_probs[final_probs > 0] / 100
+    entropy = float(-(p * np.log2(p)).sum())
+    confidence = (1 - entropy / np.log2(NUM_DIGITS)) * 100
+
+    for method, weight in zip(methods, weights):
+        method['weight'] = float(weight)
+        method['probs'] = method['probs'].tolist()
+
+    return {
+        'topPredictions': top_predictions,
+        'allProbabilities': final_probs.tolist(),
+        'methods': sorted(methods, key=lambda m: -m['weight']),
+        'confidence': f"{confidence:.1f}",
+        'entropy': f"{entropy:.2f}",
+        'regimeInfo': change_point_detection(series),
+        'entropyInfo': entropy_info
+    }
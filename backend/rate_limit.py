@@ -0,0 +1,59 @@
+"""
+Token-bucket limit on requests to the site.
+
+Every navigation the scraper makes (page loads, grid page changes, direct
+grid fetches) takes a token from one process-wide bucket first. The bucket
+refills at SCRAPE_NAV_RATE tokens per second up to SCRAPE_NAV_BURST, so
+however many scrapes run at once the site sees a steady, bounded request
+rate instead of bursts that could get the account throttled or locked out.
+Callers that find the bucket empty reserve the next token and sleep until
+it is due, which keeps them in arrival order.
+"""
+import os
+import threading
+import time
+
+from metrics import registry as metrics
+
+# Sustained navigations per second across all scrapes; 0 turns the limit off
+SCRAPE_NAV_RATE = float(os.environ.get('SCRAPE_NAV_RATE', 2))
+SCRAPE_NAV_BURST = float(os.environ.get('SCRAPE_NAV_BURST', 5))
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token; returns the seconds to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going below zero reserves a future token for this caller
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        """Block until a token is available; returns the seconds waited."""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+navigations = TokenBucket(SCRAPE_NAV_RATE, SCRAPE_NAV_BURST)
+
+
+def throttle():
+    """Wait for the site's navigation budget. Call right before each request to the site."""
+    waited = navigations.acquire()
+    if waited:
+        metrics.inc('scrape_throttled_seconds_total', waited)
+    return waited
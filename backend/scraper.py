@@ -0,0 +1,680 @@
+"""
+Helpers shared by the playrep.pro scrape endpoints.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from captcha import capture_captcha, record_outcome, solve
+from driver_pool import pool as driver_pool, PoolTimeout
+from grid_client import GridClient, GridPages
+from metrics import PhaseTimer, registry as metrics
+from rate_limit import throttle
+from session_cache import get_session_cache
+from storage import get_store, parse_timestamp, split_new_rows, to_epoch
+
+# Base URL of the site (point it at fixture_site.py for offline runs)
+SITE_URL = os.environ.get('SCRAPE_SITE_URL', 'https://playrep.pro').rstrip('/')
+LOGIN_URL = SITE_URL + "/Login.mvc"
+
+# Results grid on the data page
+GRID_BODY_XPATH = "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[1]/tbody"
+PAGER_ROW_XPATH = "/html/body/div[3]/div/div[2]/div[1]/div/form/div/table[2]/tbody/tr"
+PAGE_SIZE_100_XPATH = PAGER_ROW_XPATH + "/td[14]/select/option[10]"
+MENU_XPATH = "//ul[@id='menu4']"
+PAGE_INPUT_XPATH = "//*[@id='dvFunTargettxtJqGridGoToPage']"
+
+# Seconds to wait for the site before giving up (configurable per deployment)
+WAIT_TIMEOUT = float(os.environ.get('SCRAPE_WAIT_TIMEOUT', 15))
+LOGIN_TIMEOUT = float(os.environ.get('SCRAPE_LOGIN_TIMEOUT', 10))
+PAGE_TIMEOUT = float(os.environ.get('SCRAPE_PAGE_TIMEOUT', 15))
+POLL_INTERVAL = 0.1
+# Login tries per session before giving up (each try gets a fresh CAPTCHA)
+LOGIN_ATTEMPTS = int(os.environ.get('SCRAPE_LOGIN_ATTEMPTS', 3))
+# Browser sessions fetching grid pages at once: the logged-in one plus extra
+# pool drivers sharing its cookies (only drivers free right away are used)
+PAGE_CONCURRENCY = int(os.environ.get('SCRAPE_PAGE_CONCURRENCY', 1))
+# 'dom' reads the rendered table; 'http' calls the grid's data endpoint
+# directly and only uses the browser to log in
+FETCH_MODE = os.environ.get('SCRAPE_FETCH_MODE', 'dom')
+ROWS_PER_PAGE = 100
+
+
+class LoginFailed(Exception):
+    """The site did not accept the credentials and CAPTCHA."""
+
+
+class NoDataTable(Exception):
+    """The data page never showed the results grid."""
+
+# Reads column 2 (number) and column 3 (date + time) of every grid row in a
+# single round trip instead of two find_elements calls per row
+_EXTRACT_ROWS_JS = """
+const body = document.evaluate(
+    arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+if (!body) return [];
+return Array.from(body.querySelectorAll(':scope > tr'), row => {
+    const cells = row.querySelectorAll(':scope > td');
+    return [
+        cells.length > 1 ? cells[1].innerText : null,
+        cells.length > 2 ? cells[2].innerText : null
+    ];
+});
+"""
+
+
+def extract_page_rows(driver):
+    """
+    Read the current grid page.
+
+    Returns a list of (number, date, time) tuples in grid order, matching
+    what the per-cell XPath lookups used to produce.
+    """
+    rows = driver.execute_script(_EXTRACT_ROWS_JS, GRID_BODY_XPATH)
+    records = []
+    for number, date_time in rows:
+        if number is None or date_time is None:
+            raise ValueError("Grid row is missing the number or date column")
+        number = number.strip()
+        date_time = date_time.strip()
+        records.append((number, date_time[:11], date_time[12:]))
+    return records
+
+
+# Identifies what the grid is currently showing: row count and the text of
+# the first non-empty row (jqGrid may keep a hidden, empty first row)
+_GRID_SIGNATURE_JS = """
+const body = document.evaluate(
+    arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+if (!body) return null;
+const rows = body.querySelectorAll(':scope > tr');
+for (const row of rows) {
+    const text = row.innerText.trim();
+    if (text) return [rows.length, text];
+}
+return [rows.length, ''];
+"""
+
+
+def grid_signature(driver):
+    return driver.execute_script(_GRID_SIGNATURE_JS, GRID_BODY_XPATH)
+
+
+class Waiter:
+    """
+    Readiness-driven waits for the scrape flow.
+
+    Each wait polls until its condition holds (or raises TimeoutException)
+    and records how long it took in `timings`; `last` holds the most recent
+    duration so callers can put it in their log lines.
+    """
+
+    def __init__(self, driver, timeout=WAIT_TIMEOUT):
+        self.driver = driver
+        self.timeout = timeout
+        self.timings = []
+        self.last = 0.0
+
+    def until(self, label, condition, timeout=None):
+        start = time.perf_counter()
+        try:
+            return WebDriverWait(
+                self.driver, timeout or self.timeout, poll_frequency=POLL_INTERVAL
+            ).until(condition)
+        finally:
+            self.last = time.perf_counter() - start
+            self.timings.append({'wait': label, 'seconds': round(self.last, 3)})
+
+    def present(self, label, by, value, timeout=None):
+        return self.until(label, EC.presence_of_element_located((by, value)), timeout)
+
+    def clickable(self, label, by, value, timeout=None):
+        return self.until(label, EC.element_to_be_clickable((by, value)), timeout)
+
+    def grid_changed(self, label, previous, timeout=None):
+        """Wait until the grid has re-rendered with different, non-empty content."""
+        def changed(driver):
+            current = grid_signature(driver)
+            return current if current and current[0] > 0 and current != previous else False
+        return self.until(label, changed, timeout or PAGE_TIMEOUT)
+
+    def login_page(self):
+        return self.present('login page', By.ID, 'username')
+
+    def logged_in(self):
+        return self.present('login', By.XPATH, MENU_XPATH, LOGIN_TIMEOUT)
+
+    def data_page(self):
+        return self.clickable('data page', By.XPATH, PAGE_SIZE_100_XPATH)
+
+    def pager(self):
+        return self.present('pager', By.XPATH, PAGER_ROW_XPATH)
+
+
+def go_to_page(driver, waiter, num, go_button_xpath):
+    """Jump the grid to page `num`, wait until it has re-rendered and return the wait time."""
+    previous = grid_signature(driver)
+    page_input = driver.find_element(By.XPATH, PAGE_INPUT_XPATH)
+    page_input.clear()
+    page_input.send_keys(num)
+    throttle()
+    driver.find_element(By.XPATH, go_button_xpath).click()
+    waiter.grid_changed(f'page {num}', previous)
+    return waiter.last
+
+
+def _open_with_cookies(driver, cookies, url):
+    # Cookies can only be set for the site that is currently loaded
+    throttle()
+    driver.get(LOGIN_URL)
+    driver.delete_all_cookies()
+    for cookie in cookies:
+        driver.add_cookie(cookie)
+    throttle()
+    driver.get(url)
+
+
+def restore_session(driver, waiter, saved):
+    """
+    Load a saved session (see session_cache) into `driver` and open its data page.
+
+    Returns True once the data grid is up, False when the site bounces the
+    browser back to the login page because the session has expired.
+    """
+    _open_with_cookies(driver, saved['cookies'], saved['url'])
+
+    def settled(driver):
+        if driver.find_elements(By.ID, 'username'):
+            return 'login'
+        if driver.find_elements(By.XPATH, PAGE_SIZE_100_XPATH):
+            return 'data'
+        return False
+    return waiter.until('session restore', settled) == 'data'
+
+
+def clone_session(driver, cookies, url):
+    """
+    Open `url` in `driver` as part of an existing logged-in session.
+
+    Copies the session cookies over, then picks 100 rows per page so the
+    grid pages line up with the original session's.
+    """
+    _open_with_cookies(driver, cookies, url)
+
+    waiter = Waiter(driver)
+    page_size = waiter.data_page()
+    previous = grid_signature(driver)
+    throttle()
+    page_size.click()
+    try:
+        waiter.grid_changed('page size', previous)
+    except TimeoutException:
+        pass
+    return waiter
+
+
+def open_sessions(source, count, phases):
+    """
+    Lease up to `count` more drivers and join them to `source`'s session.
+
+    Only drivers the pool can hand out without waiting are used. Sessions
+    are opened in parallel. Returns ([(driver, waiter)], [error message]).
+    """
+    drivers, errors = [], []
+    for _ in range(count):
+        try:
+            drivers.append(driver_pool.acquire(timeout=0))
+        except PoolTimeout:
+            break
+        except Exception as e:
+            # The drivers leased so far are still joined below
+            errors.append(str(e))
+            break
+    if not drivers:
+        return [], errors
+
+    try:
+        cookies = source.get_cookies()
+        url = source.current_url
+    except Exception as e:
+        for driver in drivers:
+            driver_pool.release(driver)
+        return [], errors + [str(e)]
+
+    def open_one(driver):
+        with phases.span('session_clone'):
+            return clone_session(driver, cookies, url)
+
+    sessions = []
+    with ThreadPoolExecutor(max_workers=len(drivers)) as executor:
+        futures = [(driver, executor.submit(open_one, driver)) for driver in drivers]
+        for driver, future in futures:
+            try:
+                sessions.append((driver, future.result()))
+            except Exception as e:
+                driver_pool.release(driver, discard=True)
+                errors.append(str(e))
+    return sessions, errors
+
+
+class PageFetcher:
+    """
+    Fetches grid pages 1..last_page across one or more logged-in sessions.
+
+    Each session takes the next unclaimed page, so pages finish out of
+    order; in_order() yields them back in page (draw) order as
+    (page, rows, seconds waited, error). stop_after() drops pages that are
+    no longer needed. Every session starts out showing page 1.
+
+    A session that fails on a page puts it back for the others and retires
+    (see `retired`), unless it is the last one left or the page already
+    failed once; then the page is reported with its error.
+    """
+
+    def __init__(self, sessions, go_button, last_page, phases):
+        self.go_button = go_button
+        self.last_page = last_page
+        self.phases = phases
+        self._stop = last_page
+        self._pages = queue.Queue()
+        for num in range(1, last_page + 1):
+            self._pages.put(num)
+        self._results = queue.Queue()
+        # Handing out pages and retiring sessions happen under one lock, so
+        # a page put back is never left without a session to take it
+        self._lock = threading.Lock()
+        self._sessions = len(sessions)
+        self._retried = set()
+        self.retired = []
+        self._executor = ThreadPoolExecutor(max_workers=len(sessions), thread_name_prefix='page-fetch')
+        for driver, waiter in sessions:
+            self._executor.submit(self._work, driver, waiter)
+
+    def _next_page(self):
+        """The next page to fetch, or None once there is none (the session is done)."""
+        with self._lock:
+            try:
+                num = self._pages.get_nowait()
+            except queue.Empty:
+                num = None
+            if num is None or num > self._stop:
+                self._sessions -= 1
+                return None
+            return num
+
+    def _work(self, driver, waiter):
+        current = 1
+        while True:
+            num = self._next_page()
+            if num is None:
+                return
+            try:
+                waited = 0.0
+                if num != current:
+                    with self.phases.span('page_navigation'):
+                        waited = go_to_page(driver, waiter, num, self.go_button)
+                    current = num
+                with self.phases.span('row_extraction'):
+                    rows = extract_page_rows(driver)
+                self._results.put((num, rows, waited, None))
+            except Exception as e:
+                with self._lock:
+                    retire = self._sessions > 1 and num not in self._retried
+                    if retire:
+                        self._retried.add(num)
+                        self._sessions -= 1
+                        self._pages.put(num)
+                        self.retired.append(driver)
+                if retire:
+                    return
+                self._results.put((num, None, 0.0, e))
+
+    def in_order(self):
+        pending = {}
+        num = 1
+        while num <= self._stop:
+            while num not in pending:
+                result = self._results.get()
+                pending[result[0]] = result
+            yield pending.pop(num)
+            num += 1
+
+    def stop_after(self, num):
+        self._stop = min(self._stop, num)
+
+    def close(self):
+        """Stop handing out pages and wait for the sessions to finish the current one."""
+        self.stop_after(0)
+        self._executor.shutdown(wait=True)
+
+
+def log_event(message, log_type="info", spans=None):
+    event = {"type": "log", "log_type": log_type, "message": message}
+    if spans:
+        event["spans"] = spans
+    return event
+
+
+def error_event(message, status=500):
+    return {"type": "error", "message": message, "status": status}
+
+
+def records_event(page, rows, new_records):
+    """One grid page of (number, date, time) rows, newest first, as parallel columns."""
+    return {
+        "type": "records",
+        "page": page,
+        "data": {
+            "Number": [r[0] for r in rows],
+            "Date": [r[1] for r in rows],
+            "Time": [r[2] for r in rows]
+        },
+        "new_records": new_records
+    }
+
+
+def page_event(page, rows, new_records):
+    """
+    Summary of one stored grid page: how many rows it had and the draw times
+    they span (epoch seconds, None for an empty page). Jobs keep their events
+    for replay, so the rows themselves are read back from the store (see
+    DrawStore.range) when the event is sent.
+    """
+    stamps = [to_epoch(ts) for ts in (parse_timestamp(r[1], r[2]) for r in rows) if ts is not None]
+    return {
+        "type": "records",
+        "page": page,
+        "records": len(rows),
+        "from": min(stamps, default=None),
+        "to": max(stamps, default=None),
+        "new_records": new_records
+    }
+
+
+def complete_event(result):
+    return {"type": "complete", "data": result}
+
+
+def drain(generator, publish=None):
+    """Run an event generator to the end, passing each event to `publish`, and return its return value."""
+    while True:
+        try:
+            event = next(generator)
+        except StopIteration as stop:
+            return stop.value
+        if publish:
+            publish(event)
+
+
+def login(driver, waiter, username, password, attempts=LOGIN_ATTEMPTS, phases=None):
+    """
+    Log in, retrying with a fresh CAPTCHA when the site rejects the answer.
+
+    Generator: yields log events and returns the post-login menu element.
+    Raises LoginFailed once `attempts` tries fail.
+    """
+    phases = phases or PhaseTimer()
+    for attempt in range(1, attempts + 1):
+        # Loading the login page again also serves a new CAPTCHA
+        with phases.span('page_load'):
+            throttle()
+            driver.get(LOGIN_URL)
+            waiter.login_page()
+        yield log_event(f"Login page loaded ({waiter.last:.2f}s)", "success", phases.take())
+
+        for field_id, value in (('username', username), ('password', password)):
+            field = driver.find_element(By.ID, field_id)
+            field.clear()
+            field.send_keys(value)
+
+        with phases.span('captcha_capture'):
+            img, source = capture_captcha(driver)
+        if source == 'fallback':
+            yield log_event("Using fallback CAPTCHA coordinates", "warning", phases.take())
+        with phases.span('ocr'):
+            answer, readings = solve(img)
+        yield log_event(f"CAPTCHA detected: {answer} (attempt {attempt}/{attempts})", "success", phases.take())
+
+        captcha_field = driver.find_element(By.ID, "txtCaptcha")
+        captcha_field.clear()
+        captcha_field.send_keys(answer)
+        throttle()
+        driver.find_element(By.ID, "btnCheckLogin").click()
+
+        try:
+            menu = waiter.logged_in()
+        except TimeoutException:
+            record_outcome(readings, answer, False)
+            metrics.inc('scrape_login_failures_total')
+            yield log_event(f"Login attempt {attempt} rejected", "warning", phases.take())
+            continue
+
+        record_outcome(readings, answer, True)
+        return menu
+
+    raise LoginFailed(f"Login failed after {attempts} attempts")
+
+
+def open_data_page(driver, waiter, username, password, data_dir, phases):
+    """
+    Get `driver` onto the data page: reuse the saved session when there is
+    one (see session_cache), otherwise log in and save the new session.
+
+    Generator of log events; returns the grid's page-size option. Raises
+    LoginFailed when the login doesn't go through and NoDataTable when the
+    data page doesn't load.
+    """
+    session_cache = get_session_cache(data_dir)
+    saved = session_cache.load(username, password) if session_cache else None
+    restored = False
+    if saved:
+        yield log_event("Restoring saved session...", "info")
+        try:
+            with phases.span('session_restore'):
+                restored = restore_session(driver, waiter, saved)
+        except Exception:
+            restored = False
+        if restored:
+            metrics.inc('scrape_session_reuse_total', result='hit')
+            yield log_event(
+                f"Saved session still valid, skipping login ({waiter.last:.2f}s)", "success", phases.take()
+            )
+        else:
+            metrics.inc('scrape_session_reuse_total', result='expired')
+            session_cache.drop(username, password)
+            driver.delete_all_cookies()
+            yield log_event("Saved session expired, logging in again", "warning", phases.take())
+
+    if not restored:
+        yield log_event("Logging in...", "info")
+        try:
+            with phases.span('login'):
+                ul = yield from login(driver, waiter, username, password, phases=phases)
+                ul.find_element(By.XPATH, "//*[@id='menu4']/li[2]/a").click()
+                throttle()
+                ul.find_element(By.XPATH, "//*[@id='menu4']/li[2]/ul/li[1]/a").click()
+        except LoginFailed:
+            raise
+        except Exception as e:
+            raise LoginFailed(str(e)) from e
+        yield log_event(f"Login successful! ({waiter.last:.2f}s)", "success", phases.take())
+
+    yield log_event("Loading data table...", "info")
+    try:
+        with phases.span('data_table'):
+            page_size = waiter.data_page()
+    except Exception as e:
+        raise NoDataTable(str(e)) from e
+    if session_cache and not restored:
+        session_cache.save(username, password, driver.get_cookies(), driver.current_url)
+    return page_size
+
+
+def run_scrape(username, password, max_pages, since_last_sync, data_dir, concurrency=PAGE_CONCURRENCY,
+               fetch_mode=FETCH_MODE):
+    """
+    The full scrape flow: log in, page through the grid and store the draws.
+    Pages are fetched by up to `concurrency` browser sessions at once, or
+    straight from the grid's data endpoint when `fetch_mode` is 'http'
+    (falling back to the table if the endpoint can't be found).
+
+    Generator of events (see log_event, page_event, error_event,
+    complete_event) that ends with exactly one error or complete event. Each
+    page is stored as soon as it is read and announced with a page_event;
+    the complete event only carries a summary.
+    """
+    driver = None
+    helpers = []
+    fetcher = None
+    phases = PhaseTimer()
+    try:
+        yield log_event("Starting Application...", "info")
+        yield log_event("Initializing Chrome browser", "info")
+
+        with phases.span('driver_startup'):
+            driver = driver_pool.acquire()
+        waiter = Waiter(driver)
+        yield log_event("Chrome browser ready", "success", phases.take())
+
+        try:
+            page_size = yield from open_data_page(driver, waiter, username, password, data_dir, phases)
+        except LoginFailed:
+            metrics.inc('scrapes_total', outcome='login_failed')
+            yield error_event("Login failed - Incorrect credentials or CAPTCHA", 401)
+            return
+        except NoDataTable:
+            metrics.inc('scrapes_total', outcome='no_data')
+            yield error_event("Data loading failed - Not enough data present", 500)
+            return
+
+        store = get_store(data_dir)
+        total_records = 0
+        new_records = 0
+        pages_read = 0
+        last_synced = store.latest() if since_last_sync else None
+        if last_synced:
+            yield log_event(f"Syncing draws after {last_synced}", "info")
+
+        fetcher = None
+        if fetch_mode == 'http':
+            try:
+                with phases.span('grid_discovery'):
+                    client = GridClient.from_driver(driver)
+                fetcher = GridPages(client, max_pages * ROWS_PER_PAGE, phases)
+                yield log_event(f"Fetching grid data directly from {client.url}", "success", phases.take())
+            except Exception as e:
+                yield log_event(
+                    f"Direct grid fetch unavailable ({str(e)}), reading the table instead", "warning", phases.take()
+                )
+
+        if fetcher is not None:
+            # The browser was only needed to log in
+            driver_pool.release(driver)
+            driver = None
+        else:
+            try:
+                with phases.span('data_table'):
+                    previous = grid_signature(driver)
+                    throttle()
+                    page_size.click()
+            except Exception:
+                metrics.inc('scrapes_total', outcome='no_data')
+                yield error_event("Data loading failed - Not enough data present", 500)
+                return
+
+            try:
+                with phases.span('data_table'):
+                    waiter.grid_changed('page size', previous)
+                yield log_event(
+                    f"Data table loaded (100 records per page, {waiter.last:.2f}s)", "success", phases.take()
+                )
+            except TimeoutException:
+                # Nothing to re-render when everything already fit on one page
+                yield log_event("Data table unchanged after selecting 100 rows", "warning", phases.take())
+
+            yield log_event("Analyzing pagination...", "info")
+            nav_bar = waiter.pager().text.split(' ')
+            pages = len(nav_bar[-13::-1])
+            yield log_event(f"Found {pages} pages of data", "success")
+
+            go_button = f"//*[@id='dvFunTarget']/table[2]/tbody/tr/td[{len(nav_bar) - 10 + 1}]/input[2]"
+
+            last_page = min(max_pages, pages)
+            extra = min(concurrency, driver_pool.size, last_page) - 1
+            if extra > 0:
+                yield log_event(f"Opening up to {extra} more browser sessions...", "info")
+                helpers, errors = open_sessions(driver, extra, phases)
+                for error in errors:
+                    yield log_event(f"Could not open extra session: {error}", "warning")
+                yield log_event(f"Fetching pages with {len(helpers) + 1} sessions", "success", phases.take())
+
+            # The grid already shows page 1 after the page size change
+            fetcher = PageFetcher([(driver, waiter)] + helpers, go_button, last_page, phases)
+
+        try:
+            for num, rows, waited, error in fetcher.in_order():
+                if error is not None:
+                    metrics.inc('scrape_page_errors_total')
+                    yield log_event(f"Page {num}: Error - {str(error)}", "warning", phases.take())
+                    continue
+
+                reached_known = False
+                if last_synced:
+                    rows, reached_known = split_new_rows(rows, last_synced)
+
+                with phases.span('persistence'):
+                    added = store.insert(rows)
+                new_records += added
+                total_records += len(rows)
+                pages_read += 1
+                yield log_event(
+                    f"Page {num}/{fetcher.last_page}: {len(rows)} records (Total: {total_records}, {waited:.2f}s)",
+                    "success",
+                    phases.take()
+                )
+                yield page_event(num, rows, added)
+
+                if reached_known:
+                    fetcher.stop_after(num)
+                    yield log_event(f"Reached stored history on page {num}", "info")
+                    break
+        finally:
+            fetcher.close()
+
+        yield log_event(f"Data saved: {new_records} new draws", "success", phases.take())
+
+        yield log_event(f"Scraping complete! {total_records} records collected", "success")
+
+        yield complete_event({
+            'success': True,
+            'records': total_records,
+            'pages': pages_read,
+            'new_records': new_records,
+            'waits': waiter.timings,
+            'phases': phases.totals()
+        })
+        metrics.inc('scrapes_total', outcome='completed')
+
+    except PoolTimeout:
+        metrics.inc('scrapes_total', outcome='busy')
+        yield error_event("All browser sessions are busy, try again shortly", 503)
+
+    except Exception as e:
+        metrics.inc('scrapes_total', outcome='error')
+        yield error_event(str(e), 500)
+
+    finally:
+        for helper, _ in helpers:
+            # A helper that failed mid-scrape is recycled rather than reused
+            driver_pool.release(helper, discard=fetcher is not None and helper in fetcher.retired)
+        if driver:
+            driver_pool.release(driver)
@@ -0,0 +1,156 @@
+"""
+Compact in-memory copy of the stored draw series.
+
+Whole-history analysis shouldn't re-read the store and rebuild Python rows
+on every request. SeriesCache keeps the draws as two parallel arrays,
+int64 epoch seconds and uint8 digits (NOT_OPEN for "NOT OPEN" markers),
+oldest first, loaded once per process. Before each read it compares the
+database files' mtime and size (and the store's own write counter) with
+the last load; when they changed, only the draws newer than the cached ones
+are read and appended, with a full reload if older draws were back-filled.
+Cached NOT OPEN draws that the store has since filled in with their digit
+are updated too.
+
+Callers get read-only views into the cached arrays, never copies. Appends
+only write past the end of the views already handed out, while a reload or
+a fill builds new arrays, so a view keeps its contents for as long as it is
+held.
+"""
+import os
+import threading
+
+import numpy as np
+
+from storage import get_store
+
+# Digit value stored for draws that were NOT OPEN
+NOT_OPEN = 255
+MIN_CAPACITY = 1024
+
+
+def _read_only(arr):
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+class SeriesCache:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._ts = np.empty(0, dtype=np.int64)
+        self._digits = np.empty(0, dtype=np.uint8)
+        self._size = 0
+        self._stamp = None
+        # Bumped whenever the open draws change other than by new ones being
+        # added at the end (a reload, or a fill before the newest open draw),
+        # for anything built incrementally on top
+        self.generation = 0
+
+    def _file_stamp(self):
+        stamp = [self.store.changes]
+        for suffix in ('', '-wal'):
+            try:
+                st = os.stat(self.store.path + suffix)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def arrays(self):
+        """(timestamps, digits) for every stored draw, oldest first, as read-only views."""
+        return self.snapshot()[1:]
+
+    def snapshot(self):
+        """
+        (stamp, timestamps, digits): arrays() plus the store change counter and
+        file state they were read at, which changes whenever a draw is added
+        or filled in.
+        """
+        stamp = self._file_stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                self._refresh()
+                self._stamp = stamp
+            return stamp, _read_only(self._ts[:self._size]), _read_only(self._digits[:self._size])
+
+    def between(self, start=None, end=None):
+        """Draws with start <= ts <= end (epoch seconds), as views."""
+        ts, digits = self.arrays()
+        lo = int(np.searchsorted(ts, start, side='left')) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, side='right')) if end is not None else len(ts)
+        return ts[lo:hi], digits[lo:hi]
+
+    def _refresh(self):
+        newest = int(self._ts[self._size - 1]) if self._size else None
+        rows = self.store.series(newest)
+        if self._size + len(rows) != self.store.count():
+            # Draws older than the cached ones were added: start over in new arrays
+            self._ts = np.empty(0, dtype=np.int64)
+            self._digits = np.empty(0, dtype=np.uint8)
+            self._size = 0
+            self.generation += 1
+            rows = self.store.series()
+        else:
+            self._fill()
+        self._append(rows)
+
+    def _fill(self):
+        """Take the digits of cached NOT OPEN draws that the store has since filled in."""
+        digits = self._digits[:self._size]
+        closed = np.flatnonzero(digits == NOT_OPEN)
+        if not len(closed):
+            return
+        filled = dict(self.store.digits_at(self._ts[closed].tolist()))
+        if not filled:
+            return
+        positions = [p for p in closed if int(self._ts[p]) in filled]
+        opened = np.flatnonzero(digits != NOT_OPEN)
+        if len(opened) and positions[0] < opened[-1]:
+            # Not just the trailing placeholders: the open digits changed mid-series
+            self.generation += 1
+        updated = self._digits.copy()
+        updated[positions] = [filled[int(self._ts[p])] for p in positions]
+        self._digits = updated
+
+    def _append(self, rows):
+        n = len(rows)
+        if not n:
+            return
+        end = self._size + n
+        if end > len(self._ts):
+            capacity = max(end, 2 * len(self._ts), MIN_CAPACITY)
+            ts = np.empty(capacity, dtype=np.int64)
+            digits = np.empty(capacity, dtype=np.uint8)
+            ts[:self._size] = self._ts[:self._size]
+            digits[:self._size] = self._digits[:self._size]
+            self._ts, self._digits = ts, digits
+        self._ts[self._size:end] = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        self._digits[self._size:end] = np.fromiter(
+            (NOT_OPEN if r[1] is None else r[1] for r in rows), dtype=np.uint8, count=n
+        )
+        self._size = end
+
+
+def since(ts, digits, after=None):
+    """The part of (ts, digits) after `after` (epoch seconds), as views."""
+    start = int(np.searchsorted(ts, after, side='right')) if after is not None else 0
+    return ts[start:], digits[start:]
+
+
+def open_digits(digits):
+    """The digits of draws that were open (a copy), ready for predictions."""
+    return digits[digits != NOT_OPEN]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_series_cache(data_dir):
+    """Process-wide series cache over get_store(data_dir)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SeriesCache(get_store(data_dir))
+        return _cache
@@ -0,0 +1,104 @@
+"""
+Encrypted cache of logged-in site sessions, one entry per account.
+
+After a successful login the browser's cookies and the data page URL are
+saved, encrypted with Fernet under SESSION_CACHE_KEY. The next scrape for
+the same credentials loads them into the browser and goes straight to the
+data grid; only if the site bounces it back to the login page does it log
+in again. Entries are keyed by an HMAC of username and password, so a
+cached session is only handed to a caller who knows both. Caching is off
+when no key is configured.
+
+Generate a key with: python session_cache.py keygen
+"""
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+from cryptography.fernet import Fernet, InvalidToken
+
+SESSION_CACHE_KEY = os.environ.get('SESSION_CACHE_KEY')
+# Seconds a saved session is trusted before logging in again regardless
+SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', 1800))
+CACHE_DIRNAME = 'sessions'
+
+
+class SessionCache:
+    def __init__(self, directory, key, ttl=SESSION_CACHE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._fernet = Fernet(key)
+        self._mac_key = hashlib.sha256(key.encode() if isinstance(key, str) else key).digest()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, username, password):
+        entry_id = hmac.new(self._mac_key, f'{username}\0{password}'.encode(), hashlib.sha256).hexdigest()
+        return os.path.join(self.directory, entry_id)
+
+    def load(self, username, password):
+        """
+        The saved session as {'cookies': [...], 'url': ...}, or None when
+        there is none or it has expired.
+        """
+        path = self._path(username, password)
+        try:
+            with open(path, 'rb') as f:
+                token = f.read()
+            entry = json.loads(self._fernet.decrypt(token, ttl=self.ttl))
+        except FileNotFoundError:
+            return None
+        except (InvalidToken, ValueError):
+            self._remove(path)
+            return None
+
+        now = time.time()
+        cookies = [c for c in entry['cookies'] if c.get('expiry') is None or c['expiry'] > now]
+        if not cookies:
+            self._remove(path)
+            return None
+        return {'cookies': cookies, 'url': entry['url']}
+
+    def save(self, username, password, cookies, url):
+        token = self._fernet.encrypt(json.dumps({'cookies': cookies, 'url': url}).encode())
+        path = self._path(username, password)
+        with self._lock:
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(token)
+            os.replace(tmp, path)
+
+    def drop(self, username, password):
+        self._remove(self._path(username, password))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_session_cache(data_dir):
+    """The session cache under `data_dir`, or None when SESSION_CACHE_KEY isn't set."""
+    if not SESSION_CACHE_KEY:
+        return None
+    directory = os.path.abspath(os.path.join(data_dir, CACHE_DIRNAME))
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = SessionCache(directory, SESSION_CACHE_KEY)
+        return _caches[directory]
+
+
+if __name__ == '__main__':
+    import sys
+
+    if sys.argv[1:] != ['keygen']:
+        sys.exit('Usage: python session_cache.py keygen')
+    print(Fernet.generate_key().decode())
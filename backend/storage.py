@@ -0,0 +1,202 @@
+"""
+Append-only draw store.
+
+Scraped draws are kept in a SQLite database in Data/, keyed by the draw
+timestamp. Inserts skip draws that are already stored, except that a
+"NOT OPEN" row is provisional: the grid lists the draw that hasn't landed
+yet that way, so when the same timestamp later arrives with a digit the
+stored row is filled in. The primary key doubles as the index for
+time-range queries. Existing Data/*.csv exports
+are imported once when the database is first created.
+"""
+import calendar
+import csv
+import datetime
+import glob
+import os
+import sqlite3
+import threading
+
+# Grid dates look like "09-DEC-2025" and times like "10:39:33 AM"
+TIMESTAMP_FORMAT = '%d-%b-%Y %I:%M:%S %p'
+CSV_PATTERN = '*-Data.csv'
+DB_FILENAME = 'draws.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS draws (
+    ts INTEGER PRIMARY KEY,
+    number TEXT NOT NULL,
+    digit INTEGER,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def parse_timestamp(date, time_of_day):
+    """Combine a grid Date and Time into a datetime, or None if malformed."""
+    try:
+        return datetime.datetime.strptime(f"{date} {time_of_day}", TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_epoch(ts):
+    """Site-local datetime to integer seconds (the site clock is used as-is)."""
+    return calendar.timegm(ts.timetuple())
+
+
+def from_epoch(seconds):
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=seconds)
+
+
+def split_new_rows(rows, last_synced):
+    """
+    Keep only rows newer than `last_synced`.
+
+    Grid pages list the newest draw first, so once a row at or before the
+    last synced draw shows up the rest of the history is already stored.
+    Returns (new_rows, reached_known).
+    """
+    new_rows = []
+    for row in rows:
+        ts = parse_timestamp(row[1], row[2])
+        if ts is not None and ts <= last_synced:
+            return new_rows, True
+        new_rows.append(row)
+    return new_rows, False
+
+
+def _digit(number):
+    """The drawn digit, or None for "NOT OPEN" and other non-digit markers."""
+    number = number.strip()
+    return int(number) if len(number) == 1 and number in '0123456789' else None
+
+
+class DrawStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        # Draws added or filled in through this instance; lets caches notice writes without a query
+        self.changes = 0
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def insert(self, rows):
+        """
+        Store (number, date, time) rows, ignoring draws already present
+        unless they were stored as NOT OPEN and now have a digit.
+
+        Rows whose date/time can't be parsed are skipped. Returns the number
+        of draws newly stored or filled in.
+        """
+        records = []
+        for number, date, time_of_day in rows:
+            ts = parse_timestamp(date, time_of_day)
+            if ts is not None:
+                records.append((to_epoch(ts), number, _digit(number), date, time_of_day))
+
+        conn = self._connect()
+        with self._write_lock:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    'INSERT INTO draws (ts, number, digit, date, time) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT(ts) DO UPDATE SET number = excluded.number, digit = excluded.digit '
+                    'WHERE draws.digit IS NULL AND excluded.digit IS NOT NULL',
+                    records
+                )
+                added = conn.total_changes - before
+            # Counted after the commit, so a reader that sees the count also sees the rows
+            self.changes += added
+        return added
+
+    def latest(self):
+        """
+        Timestamp of the newest stored draw that has a digit, or None if there
+        is none. A NOT OPEN row after it may still be filled in, so this is
+        the point to sync from.
+        """
+        row = self._connect().execute('SELECT MAX(ts) FROM draws WHERE digit IS NOT NULL').fetchone()
+        return from_epoch(row[0]) if row[0] is not None else None
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM draws').fetchone()[0]
+
+    def range(self, start=None, end=None, limit=None, newest_first=True):
+        """(ts, number, date, time) rows with start <= ts <= end (epoch seconds)."""
+        query = 'SELECT ts, number, date, time FROM draws WHERE ts >= ? AND ts <= ?'
+        query += ' ORDER BY ts DESC' if newest_first else ' ORDER BY ts'
+        params = [start if start is not None else -2 ** 63, end if end is not None else 2 ** 63 - 1]
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return self._connect().execute(query, params).fetchall()
+
+    def series(self, after=None):
+        """(ts, digit) for every draw after `after` (epoch seconds), oldest first; digit is None if not open."""
+        return self._connect().execute(
+            'SELECT ts, digit FROM draws WHERE ts > ? ORDER BY ts',
+            [after if after is not None else -2 ** 63]
+        ).fetchall()
+
+    def digits_at(self, timestamps):
+        """(ts, digit) for the draws at `timestamps` (epoch seconds) that have a digit."""
+        conn = self._connect()
+        found = []
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(timestamps), 500):
+            chunk = timestamps[i:i + 500]
+            found += conn.execute(
+                f"SELECT ts, digit FROM draws WHERE digit IS NOT NULL AND ts IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+        return found
+
+    def import_csv_dir(self, data_dir):
+        """Import every Data/*.csv export, including "NOT OPEN" rows. Returns draws added."""
+        added = 0
+        for path in sorted(glob.glob(os.path.join(data_dir, CSV_PATTERN))):
+            with open(path, newline='') as f:
+                reader = csv.DictReader(f)
+                rows = [(r['Number'], r['Date'], r['Time']) for r in reader
+                        if r.get('Number') and r.get('Date') and r.get('Time')]
+            added += self.insert(rows)
+        return added
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(data_dir):
+    """Process-wide store for `data_dir`, importing old CSV exports on first creation."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.path.join(data_dir, DB_FILENAME)
+            is_new = not os.path.exists(path)
+            _store = DrawStore(path)
+            if is_new:
+                _store.import_csv_dir(data_dir)
+        return _store
+
+
+if __name__ == '__main__':
+    import sys
+
+    if sys.argv[1:] != ['import']:
+        sys.exit('Usage: python storage.py import')
+    data_dir = os.path.join(os.path.dirname(__file__), '..', 'Data')
+    store = DrawStore(os.path.join(data_dir, DB_FILENAME))
+    print(f"Imported {store.import_csv_dir(data_dir)} draws ({store.count()} stored)")
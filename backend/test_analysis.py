@@ -0,0 +1,70 @@
+"""
+Batch analysis against plain loops, and the upload parsers.
+
+Run from backend/: python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from analysis import analyze_sequences, parse_csv, parse_packed
+
+
+def random_digits(n, seed):
+    return np.random.default_rng(seed).integers(0, 10, n).tolist()
+
+
+def test_analyze_sequences_matches_loops():
+    sequences = [random_digits(50, 1), [], [4], [2, 2, 2, 5, 2], random_digits(300, 2)]
+    for seq, result in zip(sequences, analyze_sequences(sequences)):
+        assert result['count'] == len(seq)
+        assert result['frequency'] == np.bincount(seq, minlength=10).tolist()
+        assert result['last_digit'] == (seq[-1] if seq else None)
+        transitions = np.zeros((10, 10), dtype=int)
+        for a, b in zip(seq, seq[1:]):
+            transitions[a, b] += 1
+        assert result['transitions'] == transitions.tolist()
+        runs = 1 + sum(a != b for a, b in zip(seq, seq[1:])) if seq else 0
+        assert result['runs']['count'] == runs
+        for digit in range(10):
+            positions = [i for i, d in enumerate(seq) if d == digit]
+            gaps = np.diff(positions)
+            assert result['gaps']['max'][digit] == (int(gaps.max()) if len(gaps) else None)
+            assert result['gaps']['since_last'][digit] == (len(seq) - 1 - positions[-1] if positions else None)
+
+
+def test_analyze_sequences_rejects_nested_lists():
+    with pytest.raises(ValueError):
+        analyze_sequences([[1, 2], [[3, 4], [5, 6]]])
+    with pytest.raises(ValueError):
+        analyze_sequences([7])
+
+
+def test_parse_csv_groups_and_skips_bad_rows():
+    text = (
+        'Number,Date,Time\n'
+        'NOT OPEN,09-DEC-2025,10:39:33 AM\n'
+        '7,09-DEC-2025,10:38:33 AM\n'
+        '5,09-DEC-2025\n'
+        '²,09-DEC-2025,10:00:33 AM\n'
+        '4,09-DEC-2025,09:59:33 AM\n'
+        '9,08-DEC-2025,11:00:33 PM\n'
+    )
+    assert parse_csv(text) == ([[9, 4, 7]], ['all'])
+    assert parse_csv(text, 'day') == ([[9], [4, 7]], ['2025-12-08', '2025-12-09'])
+    assert parse_csv(text, 'hour')[0] == [[9], [4], [7]]
+
+
+def test_parse_csv_digit_lines():
+    assert parse_csv('1, 2,x,³,12\n\n5\n') == ([[1, 2], [5]], None)
+
+
+def test_parse_packed():
+    sequences = parse_packed(bytes([1, 2, 3, 0xFF, 4, 0xFF]))
+    assert [s.tolist() for s in sequences] == [[1, 2, 3], [4]]
+
+
+def test_nested_sequences_are_a_bad_request():
+    from app import app
+
+    response = app.test_client().post('/api/analyze', json={'sequences': [[[1, 2], [3, 4]]]})
+    assert response.status_code == 400
@@ -0,0 +1,50 @@
+"""
+Ensemble weight overrides and the backtest's method and weight parsing.
+
+Run from backend/: python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from backtest import METHOD_SLUGS, method_name, parse_weights, run_backtest
+from predictions import ENSEMBLE_WEIGHTS, ensemble_prediction, ngram_counts
+
+
+def random_digits(n, seed):
+    return np.random.default_rng(seed).integers(0, 10, n).astype(np.uint8)
+
+
+def test_ensemble_weight_overrides():
+    series = random_digits(200, 5)
+    assert ensemble_prediction(series, weights={}) == ensemble_prediction(series)
+    only_first = ensemble_prediction(
+        series, weights={name: 0.0 for name in ENSEMBLE_WEIGHTS if name != 'Markov 1st Order'}, temperature=1.0
+    )
+    counts = ngram_counts(series)[1][series[-1]]
+    np.testing.assert_allclose(np.array(only_first['allProbabilities']) / 100, counts / counts.sum())
+    with pytest.raises(ValueError):
+        ensemble_prediction(series, weights={'Nope': 1.0})
+    with pytest.raises(ValueError):
+        ensemble_prediction(series, weights={name: 0.0 for name in ENSEMBLE_WEIGHTS})
+
+
+def test_method_names_and_weights():
+    assert set(METHOD_SLUGS.values()) - {'Ensemble'} == set(ENSEMBLE_WEIGHTS)
+    assert method_name(' VOM ') == 'Variable Order Markov'
+    assert method_name('Recency-Weighted') == 'Recency-Weighted'
+    with pytest.raises(ValueError):
+        method_name('nope')
+    assert parse_weights('markov1=0.2,momentum=0') == {'Markov 1st Order': 0.2, 'Sequence Momentum': 0.0}
+    for text in ('markov1', 'ensemble=1', 'nope=1'):
+        with pytest.raises(ValueError):
+            parse_weights(text)
+
+
+def test_run_backtest_scores_every_step():
+    report = run_backtest(random_digits(140, 3), methods=['markov1', 'pattern'], min_history=100,
+                          segments=2, workers=1)
+    assert report['evaluated'] == 40
+    assert {r['method'] for r in report['methods']} == {'Markov 1st Order', 'Pattern Completion'}
+    for result in report['methods']:
+        assert result['steps'] == 40
+        assert 0 <= result['hit@1'] <= result['hit@3'] <= result['hit@5'] <= 1
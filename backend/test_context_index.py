@@ -0,0 +1,68 @@
+"""
+Context index lookups and table-based pattern completion against
+brute-force scans of the history.
+
+Run from backend/: python -m pytest -q
+"""
+import numpy as np
+
+from context_index import ContextIndex
+from predictions import ngram_counts, pattern_completion, pattern_completion_counts
+
+
+def random_digits(n, seed):
+    return np.random.default_rng(seed).integers(0, 10, n).astype(np.uint8)
+
+
+def brute_following(series, context, fuzzy=False):
+    counts = np.zeros(10, dtype=np.int64)
+    k = len(context)
+    for i in range(len(series) - k):
+        window = series[i:i + k].astype(int)
+        if (np.abs(window - context) <= 1).all() if fuzzy else (window == context).all():
+            counts[series[i + k]] += 1
+    return counts
+
+
+def test_pattern_completion_counts_match_scan():
+    for seed in range(5):
+        series = random_digits(500, seed)
+        np.testing.assert_allclose(
+            pattern_completion_counts(series, ngram_counts(series)), pattern_completion(series)
+        )
+
+
+def test_context_index_matches_brute_force():
+    series = random_digits(2000, 11)
+    index = ContextIndex(max_order=6)
+    # Appends in several sizes, with lookups in between so the delta levels get used
+    index.extend(series[:3])
+    index.extend(series[3:700])
+    assert index.following([int(series[0])]).sum() > 0
+    for d in series[700:720]:
+        index.append(d)
+    index.extend(series[720:])
+    assert index.length == len(series)
+
+    rng = np.random.default_rng(0)
+    for order in range(1, 7):
+        for _ in range(5):
+            # A context that occurs, and one that most likely doesn't
+            start = int(rng.integers(0, len(series) - order))
+            for context in (series[start:start + order].astype(int), rng.integers(0, 10, order)):
+                np.testing.assert_array_equal(index.following(list(context)), brute_following(series, context))
+                np.testing.assert_array_equal(
+                    index.following(list(context), fuzzy=True), brute_following(series, context, fuzzy=True)
+                )
+
+
+def test_longest_context():
+    series = random_digits(400, 3)
+    index = ContextIndex(max_order=8)
+    index.extend(series)
+    context, counts = index.longest_context(min_count=2)
+    assert context == series[-len(context):].tolist()
+    np.testing.assert_array_equal(counts, brute_following(series, np.array(context)))
+    assert counts.sum() >= 2
+    if len(context) < 8:
+        assert brute_following(series, series[-len(context) - 1:].astype(int)).sum() < 2
@@ -0,0 +1,37 @@
+"""
+Wire encoding of the draw series and response compression.
+
+Run from backend/: python -m pytest -q
+"""
+import gzip
+
+import numpy as np
+
+from data_codec import MIN_COMPRESS_SIZE, compress, encode_arrays
+from series_cache import NOT_OPEN
+
+
+def test_encode_arrays():
+    ts = np.array([60, 120, 180, 300, 360], dtype=np.int64)
+    digits = np.array([3, NOT_OPEN, 7, 1, NOT_OPEN], dtype=np.uint8)
+    payload = encode_arrays(ts, digits)
+    assert payload['digits'] == '3-71-'
+    assert payload['start'] == 60
+    assert payload['deltas'] == [[60, 2], [120, 1], [60, 1]]
+    # The cursor stops at the newest draw with a digit: the trailing NOT OPEN may still be filled in
+    assert payload['cursor'] == 300
+
+    steps = np.repeat([d for d, _ in payload['deltas']], [n for _, n in payload['deltas']])
+    np.testing.assert_array_equal(payload['start'] + np.concatenate(([0], np.cumsum(steps))), ts)
+
+    assert encode_arrays(ts[4:], digits[4:], after=300)['cursor'] == 300
+    assert encode_arrays(ts[:0], digits[:0], after=300)['cursor'] == 300
+
+
+def test_compress_follows_accept_encoding():
+    body = b'0123456789' * MIN_COMPRESS_SIZE
+    assert compress(body[:MIN_COMPRESS_SIZE - 1], 'gzip') == (body[:MIN_COMPRESS_SIZE - 1], None)
+    assert compress(body, None) == (body, None)
+    compressed, encoding = compress(body, 'deflate, gzip;q=0.8')
+    assert encoding == 'gzip'
+    assert gzip.decompress(compressed) == body
@@ -0,0 +1,69 @@
+"""
+Grid data endpoint parsing and timestamps, without a network.
+
+Run from backend/: python -m pytest -q
+"""
+import datetime
+import json
+import zoneinfo
+
+import grid_client
+from grid_client import GridClient, split_timestamp
+
+PARAMS = {
+    'url': 'http://grid.test/data',
+    'columns': [['rn', None], ['Number', 'num'], ['Date', 'when']],
+}
+
+
+def test_split_timestamp_formats(monkeypatch):
+    assert split_timestamp('09-DEC-2025 10:38:33 AM') == ('09-DEC-2025', '10:38:33 AM')
+    assert split_timestamp('2025-12-09T22:38:33') == ('09-DEC-2025', '10:38:33 PM')
+    # 1765276713000 ms is 2025-12-09 10:38:33 UTC
+    assert split_timestamp('/Date(1765276713000)/') == ('09-DEC-2025', '10:38:33 AM')
+    assert split_timestamp('2025-12-09T10:38:33+00:00') == ('09-DEC-2025', '10:38:33 AM')
+
+    monkeypatch.setattr(grid_client, 'SITE_TIMEZONE', zoneinfo.ZoneInfo('Asia/Kolkata'))
+    assert split_timestamp('/Date(1765276713000)/') == ('09-DEC-2025', '04:08:33 PM')
+    assert split_timestamp('/Date(1765276713000+0530)/') == ('09-DEC-2025', '04:08:33 PM')
+    assert split_timestamp('2025-12-09T10:38:33+00:00') == ('09-DEC-2025', '04:08:33 PM')
+    # Times without an offset are already site-local
+    assert split_timestamp('2025-12-09T10:38:33') == ('09-DEC-2025', '10:38:33 AM')
+
+
+def test_parse_json_cells_and_objects():
+    client = GridClient(PARAMS, [])
+    data = {'total': 3, 'records': 120, 'rows': [
+        {'id': 1, 'cell': ['7', '09-DEC-2025 10:38:33 AM']},
+        {'id': 2, 'cell': ['NOT OPEN', '09-DEC-2025 10:39:33 AM']},
+    ]}
+    assert client._parse_json(data) == ([
+        ('7', '09-DEC-2025', '10:38:33 AM'), ('NOT OPEN', '09-DEC-2025', '10:39:33 AM')
+    ], 3, 120)
+
+    objects = GridClient({**PARAMS, 'jsonReader': {'repeatitems': False}}, [])
+    wrapped = {'d': json.dumps({'rows': [{'num': 4, 'when': '/Date(1765276713000)/'}]})}
+    assert objects._parse_json(wrapped) == ([('4', '09-DEC-2025', '10:38:33 AM')], 1, 1)
+
+
+def test_parse_xml():
+    client = GridClient(PARAMS, [])
+    content = (
+        b'<?xml version="1.0"?><rows><page>1</page><total>2</total><records>3</records>'
+        b'<row id="1"><cell>5</cell><cell>09-DEC-2025 10:38:33 AM</cell></row>'
+        b'<row id="2"><cell>1</cell><cell>09-DEC-2025 10:37:33 AM</cell></row></rows>'
+    )
+    assert client._parse_xml(content) == ([
+        ('5', '09-DEC-2025', '10:38:33 AM'), ('1', '09-DEC-2025', '10:37:33 AM')
+    ], 2, 3)
+
+
+def test_close_keeps_the_shared_adapter():
+    first = GridClient(PARAMS, [{'name': 'session', 'value': 'a'}])
+    second = GridClient(PARAMS, [{'name': 'session', 'value': 'b'}])
+    assert first.session.get_adapter('http://grid.test') is grid_client._adapter
+    first.close()
+    assert not first.session.cookies
+    assert second.session.get_adapter('http://grid.test') is grid_client._adapter
+    assert grid_client._adapter.poolmanager is not None
+    assert second.session.cookies.get('session') == 'b'
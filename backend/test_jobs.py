@@ -0,0 +1,127 @@
+"""
+Job scheduling (fair turns, queue limits, reserved slots) and event
+replay over SSE.
+
+Run from backend/: python -m pytest -q
+"""
+import threading
+
+import pytest
+
+import app as app_module
+from jobs import DEFAULT_JOB_SECONDS, Job, JobManager, QueueFull, SlotBusy, sse_events
+
+
+def recording(started, name, gate=None):
+    started.append(name)
+    if gate is not None:
+        gate.wait(5)
+    yield {'type': 'complete', 'data': name}
+
+
+def test_accounts_take_turns():
+    manager = JobManager(workers=1, max_active=1, max_queued=5)
+    started, gate = [], threading.Event()
+    first, _ = manager.submit('a1', recording, started, 'a1', gate, account='a')
+    while not started:
+        first.wait(0.01)
+    jobs = [manager.submit(name, recording, started, name, account=name[0])[0] for name in ('a2', 'a3', 'b1')]
+    assert [job.queue_position for job in jobs] == [1, 3, 2]
+    gate.set()
+    for job in jobs:
+        assert job.wait(5)
+    assert started == ['a1', 'a2', 'b1', 'a3']
+    assert all(job.status == 'completed' for job in jobs)
+
+
+def test_queue_limit_and_shared_keys():
+    manager = JobManager(workers=1, max_active=1, max_queued=2)
+    started, gate = [], threading.Event()
+    running, _ = manager.submit('a1', recording, started, 'a1', gate, account='a')
+    while not started:
+        running.wait(0.01)
+    manager.submit('a2', recording, started, 'a2', account='a')
+    waiting, created = manager.submit('a3', recording, started, 'a3', account='a')
+    assert created
+    assert manager.submit('a3', recording, started, 'a3', account='a') == (waiting, False)
+    with pytest.raises(QueueFull):
+        manager.submit('a4', recording, started, 'a4', account='a')
+    # Other accounts have their own queue
+    other, _ = manager.submit('b1', recording, started, 'b1', account='b')
+    gate.set()
+    assert waiting.wait(5) and other.wait(5) and running.wait(5)
+
+
+def test_reserved_slots_count_against_the_limits():
+    manager = JobManager(workers=2, max_active=1)
+    release_a = manager.reserve('a')
+    with pytest.raises(SlotBusy):
+        manager.reserve('a')
+    release_b = manager.reserve('b')
+    with pytest.raises(SlotBusy):
+        manager.reserve('c')
+
+    started = []
+    job, _ = manager.submit('c1', recording, started, 'c1', account='c')
+    assert job.queue_position == 1
+    # Both slots are held, and only running jobs turn over
+    assert job.estimated_wait == DEFAULT_JOB_SECONDS
+    assert not job.wait(0.1)
+
+    release_b()
+    release_b()
+    assert job.wait(5)
+    assert started == ['c1']
+    # Account 'a' still holds its slot, so its job waits
+    held, _ = manager.submit('a1', recording, started, 'a1', account='a')
+    assert not held.wait(0.1)
+    release_a()
+    assert held.wait(5)
+    manager.reserve('a')()
+
+
+def finished_job(count):
+    job = Job('key')
+    for n in range(count):
+        job.publish({'type': 'log', 'message': str(n)})
+    job.finish('completed')
+    return job
+
+
+def event_ids(chunks):
+    return [int(line[4:]) for chunk in chunks for line in chunk.splitlines() if line.startswith('id: ')]
+
+
+def test_sse_events_replays_after_last_event_id():
+    job = finished_job(5)
+    assert event_ids(sse_events(job)) == [0, 1, 2, 3, 4]
+    assert event_ids(sse_events(job, 2)) == [3, 4]
+    assert event_ids(sse_events(job, 4)) == []
+
+
+def test_scrape_stream_resumes_a_joined_job(monkeypatch):
+    job = finished_job(4)
+    created = []
+    monkeypatch.setattr(app_module, '_start_scrape_job', lambda *args: (job, bool(created)))
+    client = app_module.app.test_client()
+    url = '/api/scrape/stream?username=u&password=p'
+
+    def stream(url, **kwargs):
+        return event_ids([client.get(url, **kwargs).get_data(as_text=True)])
+
+    assert stream(url, headers={'Last-Event-ID': '1'}) == [2, 3]
+    assert stream(url + '&last_event_id=2') == [3]
+    # A job started by this request is sent from the start
+    created.append(True)
+    assert stream(url, headers={'Last-Event-ID': '1'}) == [0, 1, 2, 3]
+    assert b'Invalid last event id' in client.get(url, headers={'Last-Event-ID': 'x'}).data
+
+
+def test_debug_captcha_needs_a_slot(monkeypatch):
+    def busy(account=None):
+        raise SlotBusy("All scrape slots are busy")
+
+    monkeypatch.setattr(app_module.scrape_jobs, 'reserve', busy)
+    response = app_module.app.test_client().get('/api/scrape/debug-captcha')
+    assert response.status_code == 503
+    assert response.get_json()['error'] == 'All scrape slots are busy'
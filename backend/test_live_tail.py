@@ -0,0 +1,92 @@
+"""
+Live tail polling: NOT OPEN placeholders, new draws and the SSE stream.
+
+Run from backend/: python -m pytest -q
+"""
+import json
+
+import pytest
+
+import live_tail
+from driver_pool import PoolTimeout
+from jobs import JobManager, SlotBusy
+from live_tail import TAIL_RETRY, TailWatcher, tail_events
+from storage import DrawStore
+
+
+def row(minute, number):
+    return (number, '09-DEC-2025', f'10:{minute:02d}:00 AM')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DrawStore(str(tmp_path / 'draws.db'))
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    return TailWatcher('key', 'user', 'pass', str(tmp_path))
+
+
+def published(watcher):
+    return [event for _, event in watcher.wait_events(-1, 0)[0]]
+
+
+def test_poll_publishes_new_draws_and_waits_for_placeholders(watcher, store):
+    store.insert([row(1, '3')])
+    watcher.last_seen = store.series()[0][0]
+
+    # Newest first, as on the grid: draw 3 hasn't landed yet
+    assert watcher._poll(lambda: [row(3, 'NOT OPEN'), row(2, '5'), row(1, '3')], store) == TAIL_RETRY
+    events = published(watcher)
+    assert len(events) == 1
+    assert events[0]['data']['Number'] == ['5']
+    assert events[0]['new_records'] == 1
+
+    # Still NOT OPEN: nothing new
+    watcher._poll(lambda: [row(3, 'NOT OPEN'), row(2, '5'), row(1, '3')], store)
+    assert len(published(watcher)) == 1
+
+    # Draw 3 lands and 4 shows up as the next placeholder
+    watcher._poll(lambda: [row(4, 'NOT OPEN'), row(3, '8'), row(2, '5')], store)
+    events = published(watcher)
+    assert len(events) == 2
+    assert events[1]['data']['Number'] == ['8']
+    assert [digit for _, digit in store.series()] == [3, 5, 8]
+    assert watcher.last_seen == store.series()[-1][0]
+
+
+def test_late_placeholder_is_published_once_filled(watcher, store):
+    watcher._poll(lambda: [row(3, '8'), row(2, 'NOT OPEN'), row(1, '3')], store)
+    assert published(watcher)[0]['data']['Number'] == ['8', '3']
+    # Draw 2 is older than the newest seen, but was pending
+    watcher._poll(lambda: [row(3, '8'), row(2, '6'), row(1, '3')], store)
+    assert published(watcher)[1]['data']['Number'] == ['6']
+    watcher._poll(lambda: [row(3, '8'), row(2, '6'), row(1, '3')], store)
+    assert len(published(watcher)) == 2
+
+
+def test_tail_events_replays_after_last_event_id(watcher):
+    for n in range(3):
+        watcher.publish({'type': 'log', 'message': str(n)})
+    watcher.stopped = True
+    chunks = list(tail_events(watcher, last_event_id=0))
+    assert json.loads(chunks[0][6:])['message'] == 'Connected to live tail'
+    assert [chunk.split('\n')[0] for chunk in chunks[1:]] == ['id: 1', 'id: 2']
+    assert watcher.subscribers == 0
+
+
+def test_watch_holds_a_scrape_slot_only_while_it_runs(watcher, store, monkeypatch):
+    manager = JobManager(workers=1)
+    monkeypatch.setattr(live_tail, 'scrape_jobs', manager)
+
+    def acquire(timeout=None):
+        # The watcher's slot is taken by now
+        with pytest.raises(SlotBusy):
+            manager.reserve('someone else')
+        raise PoolTimeout()
+
+    monkeypatch.setattr(live_tail.driver_pool, 'acquire', acquire)
+    with pytest.raises(PoolTimeout):
+        watcher._watch(store)
+    manager.reserve('someone else')()
@@ -0,0 +1,76 @@
+"""
+Incremental model state against a full rebuild, and dataset eviction.
+
+Run from backend/: python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+import model_state
+from model_state import DatasetEvicted, ModelState, drop_model, get_model
+from predictions import ensemble_prediction, ngram_counts
+
+
+def random_digits(n, seed):
+    return np.random.default_rng(seed).integers(0, 10, n).astype(np.uint8)
+
+
+def test_incremental_counts_match_rebuild():
+    series = random_digits(3000, 7)
+    state = ModelState(capacity=16)
+    # Single appends, a short batch (appended one by one) and long vectorized batches
+    for d in series[:10]:
+        state.append(d)
+    state.extend(series[10:20])
+    state.extend(series[20:1500])
+    state.extend(series[1500:])
+
+    rebuilt = ngram_counts(series)
+    for order, table in rebuilt.items():
+        np.testing.assert_array_equal(state.counts[order], table)
+    np.testing.assert_array_equal(state.series, series)
+    np.testing.assert_array_equal(state.unigram, np.bincount(series, minlength=10))
+    np.testing.assert_array_equal(state.continuation, (rebuilt[1] > 0).sum(axis=0))
+    assert state.predict() == ensemble_prediction(series)
+
+
+def test_model_state_rejects_out_of_range():
+    with pytest.raises(ValueError):
+        ModelState().extend([1, 2, 10])
+
+
+def test_evicted_dataset_is_reported(monkeypatch):
+    monkeypatch.setattr(model_state, 'MAX_DATASETS', 2)
+    monkeypatch.setattr(model_state, '_models', model_state.OrderedDict())
+    monkeypatch.setattr(model_state, '_evicted', model_state.OrderedDict())
+
+    first = get_model('a')
+    get_model('b')
+    assert get_model('a') is first
+    # 'b' is now the least recently used
+    get_model('c')
+    with pytest.raises(DatasetEvicted):
+        get_model('b')
+    with pytest.raises(DatasetEvicted):
+        get_model('b', create=False)
+
+    assert drop_model('b')
+    assert get_model('b', create=False) is None
+    assert not drop_model('b')
+
+
+def test_evicted_dataset_returns_404(monkeypatch):
+    from app import app
+
+    monkeypatch.setattr(model_state, 'MAX_DATASETS', 1)
+    monkeypatch.setattr(model_state, '_models', model_state.OrderedDict())
+    monkeypatch.setattr(model_state, '_evicted', model_state.OrderedDict())
+    client = app.test_client()
+
+    assert client.post('/api/datasets/a/draws', json={'numbers': [1, 2, 3]}).status_code == 200
+    assert client.post('/api/datasets/b/draws', json={'numbers': [4]}).status_code == 200
+    response = client.post('/api/predict', json={'dataset': 'a'})
+    assert response.status_code == 404
+    assert 'evicted' in response.get_json()['error']
+    assert client.delete('/api/datasets/a').status_code == 200
+    assert client.post('/api/datasets/a/draws', json={'numbers': [5]}).get_json()['count'] == 1
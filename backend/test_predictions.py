@@ -0,0 +1,55 @@
+"""
+The NumPy prediction engine against the frontend's calculateEnsemblePrediction.
+
+Run from backend/: python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from predictions import ensemble_prediction
+
+
+def lcg_digits(n, seed):
+    """Deterministic digits (the same generator produced the JS vectors below)."""
+    digits = []
+    x = seed
+    for _ in range(n):
+        x = (1103515245 * x + 12345) % 2 ** 31
+        digits.append((x >> 16) % 10)
+    return np.array(digits, dtype=np.uint8)
+
+
+# calculateEnsemblePrediction(...) from frontend/src/components/predictions, run
+# under node on the same series: allProbabilities, top digits, confidence, entropy
+JS_ENSEMBLE = [
+    (lcg_digits(20, 2), [5.5046974821, 6.9296636739, 6.8970797647, 8.2557413506, 7.9668454415,
+                         40.5094413903, 6.0670041251, 6.4292452133, 5.755985371, 5.6842961875],
+     [5, 3, 4, 1, 2], '14.2', '2.85'),
+    (lcg_digits(60, 3), [3.95843284, 15.974139264, 4.1052985682, 6.0809677086, 2.8897021749,
+                         31.3773902814, 14.7233849714, 11.6018914555, 6.8393523468, 2.4494403891],
+     [5, 1, 6, 7, 8], '13.4', '2.88'),
+    (lcg_digits(250, 4), [9.9070757116, 13.1925294077, 9.634748739, 14.0361261966, 7.8339718715,
+                          6.8185143235, 5.3759519338, 9.3087697305, 7.9574822723, 15.9348298134],
+     [9, 3, 1, 0, 2], '2.2', '3.25'),
+    (np.arange(120, dtype=np.uint8) % 10, [71.6584503979, 9.5757284864, 0.4561426045, 0.5829326606,
+                                           0.7809391747, 1.0875256778, 1.5590636346, 2.2808027758,
+                                           3.3818745928, 8.6365399948],
+     [0, 1, 9, 8, 7], '53.0', '1.56'),
+    (np.array([3] * 40 + [7] * 40, dtype=np.uint8), [0.1636636199, 0.2482608208, 0.3765860437, 7.8562447976,
+                                                     0.8665154073, 1.3144144454, 1.9938310614, 83.8722382972,
+                                                     1.9938310614, 1.3144144454],
+     [7, 3, 6, 8, 5], '69.4', '1.02'),
+]
+
+
+@pytest.mark.parametrize('series, probabilities, top, confidence, entropy', JS_ENSEMBLE)
+def test_ensemble_matches_frontend(series, probabilities, top, confidence, entropy):
+    result = ensemble_prediction(series)
+    np.testing.assert_allclose(result['allProbabilities'], probabilities, atol=1e-8)
+    assert [p['digit'] for p in result['topPredictions']] == top
+    assert result['confidence'] == confidence
+    assert result['entropy'] == entropy
+
+
+def test_ensemble_needs_twenty_draws():
+    assert ensemble_prediction(lcg_digits(19, 1)) is None
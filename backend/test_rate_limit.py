@@ -0,0 +1,37 @@
+"""
+Token bucket refill and reservations.
+
+Run from backend/: python -m pytest -q
+"""
+import time
+
+import pytest
+
+from rate_limit import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_burst_then_steady_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Callers past the burst queue up half a second apart
+    assert [bucket.reserve() for _ in range(3)] == [0.5, 1.0, 1.5]
+    clock[0] += 1.5
+    assert bucket.reserve() == 0.5
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    clock[0] += 60
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 1.0]
+
+
+def test_zero_rate_turns_the_limit_off(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
@@ -0,0 +1,133 @@
+"""
+Page fetching across several sessions, opening extra sessions from the
+pool, and scrape request parsing. Browsers are replaced by fakes.
+
+Run from backend/: python -m pytest -q
+"""
+import threading
+
+import pytest
+
+import scraper
+from driver_pool import PoolTimeout
+from metrics import PhaseTimer, Registry
+from scraper import PageFetcher, open_sessions
+
+
+class FakeDriver:
+    def __init__(self, name, fail_pages=()):
+        self.name = name
+        self.page = 1
+        self.fail_pages = set(fail_pages)
+        self.current_url = 'http://grid'
+
+    def get_cookies(self):
+        return [{'name': 'session', 'value': 'x'}]
+
+
+class FakePool:
+    def __init__(self, drivers, error=None):
+        self.idle = list(drivers)
+        self.error = error
+        self.released = []
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        if self.idle:
+            return self.idle.pop(0)
+        if self.error:
+            raise self.error
+        raise PoolTimeout()
+
+    def release(self, driver, discard=False):
+        with self.lock:
+            self.released.append((driver.name, discard))
+
+
+@pytest.fixture
+def fake_pages(monkeypatch):
+    def go_to_page(driver, waiter, num, go_button):
+        driver.page = num
+        return 0.0
+
+    def extract_page_rows(driver):
+        if driver.page in driver.fail_pages:
+            driver.fail_pages.discard(driver.page)
+            raise RuntimeError(f"{driver.name} failed on page {driver.page}")
+        return [(str(driver.page % 10), '09-DEC-2025', '10:00:00 AM')]
+
+    monkeypatch.setattr(scraper, 'go_to_page', go_to_page)
+    monkeypatch.setattr(scraper, 'extract_page_rows', extract_page_rows)
+
+
+def phases():
+    return PhaseTimer(Registry())
+
+
+def fetch_all(fetcher):
+    try:
+        return [(num, rows, error) for num, rows, _, error in fetcher.in_order()]
+    finally:
+        fetcher.close()
+
+
+def test_fetcher_returns_pages_in_order(fake_pages):
+    sessions = [(FakeDriver(f'd{n}'), None) for n in range(3)]
+    results = fetch_all(PageFetcher(sessions, 'go', 7, phases()))
+    assert [num for num, _, _ in results] == list(range(1, 8))
+    assert all(error is None and rows[0][0] == str(num) for num, rows, error in results)
+
+
+def test_failed_page_is_requeued_and_session_retired(fake_pages):
+    bad = FakeDriver('bad', fail_pages=range(1, 8))
+    good = FakeDriver('good')
+    fetcher = PageFetcher([(bad, None), (good, None)], 'go', 5, phases())
+    results = fetch_all(fetcher)
+    assert [num for num, _, _ in results] == [1, 2, 3, 4, 5]
+    assert all(error is None for _, _, error in results)
+    assert fetcher.retired == [bad]
+
+
+def test_last_session_reports_the_error(fake_pages):
+    results = fetch_all(PageFetcher([(FakeDriver('only', fail_pages=[2]), None)], 'go', 3, phases()))
+    assert [(num, error is not None) for num, _, error in results] == [(1, False), (2, True), (3, False)]
+
+
+def test_open_sessions_keeps_drivers_leased_before_an_error(monkeypatch):
+    pool = FakePool([FakeDriver('a'), FakeDriver('b')], error=RuntimeError('Chrome failed to start'))
+    monkeypatch.setattr(scraper, 'driver_pool', pool)
+    monkeypatch.setattr(scraper, 'clone_session', lambda driver, cookies, url: f'waiter-{driver.name}')
+
+    sessions, errors = open_sessions(FakeDriver('main'), 3, phases())
+    assert [(driver.name, waiter) for driver, waiter in sessions] == [('a', 'waiter-a'), ('b', 'waiter-b')]
+    assert errors == ['Chrome failed to start']
+    assert pool.released == []
+
+
+def test_open_sessions_releases_drivers_that_fail_to_join(monkeypatch):
+    pool = FakePool([FakeDriver('a'), FakeDriver('b')])
+    monkeypatch.setattr(scraper, 'driver_pool', pool)
+
+    def clone_session(driver, cookies, url):
+        if driver.name == 'b':
+            raise RuntimeError('cookie rejected')
+        return 'waiter'
+
+    monkeypatch.setattr(scraper, 'clone_session', clone_session)
+    sessions, errors = open_sessions(FakeDriver('main'), 5, phases())
+    assert [driver.name for driver, _ in sessions] == ['a']
+    assert errors == ['cookie rejected']
+    assert pool.released == [('b', True)]
+
+
+def test_scrape_request_validation():
+    from app import app
+
+    client = app.test_client()
+    body = {'username': 'u', 'password': 'p'}
+    for extra, message in (({'fetch': 'ftp'}, 'Fetch'), ({'pages': 0}, 'Pages'), ({'concurrency': 'x'}, 'Concurrency')):
+        response = client.post('/api/jobs', json={**body, **extra})
+        assert response.status_code == 400
+        assert response.get_json()['error'].startswith(message)
+    assert client.post('/api/scrape', json={'username': 'u'}).status_code == 400
+    assert b'Fetch must be' in client.get('/api/scrape/stream?username=u&password=p&fetch=ftp').data
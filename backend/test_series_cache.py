@@ -0,0 +1,71 @@
+"""
+Series cache kept in step with the draw store: appends, back-fills and
+NOT OPEN draws being filled in.
+
+Run from backend/: python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from series_cache import NOT_OPEN, SeriesCache, open_digits, since
+from storage import DrawStore
+
+
+def row(minute, number):
+    return (number, '09-DEC-2025', f'10:{minute:02d}:00 AM')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DrawStore(str(tmp_path / 'draws.db'))
+
+
+def test_appends_new_draws_without_a_new_generation(store):
+    store.insert([row(1, '3'), row(2, '5')])
+    cache = SeriesCache(store)
+    ts, digits = cache.arrays()
+    assert digits.tolist() == [3, 5]
+    assert not digits.flags.writeable
+
+    store.insert([row(3, '7'), row(4, 'NOT OPEN')])
+    new_ts, new_digits = cache.arrays()
+    assert new_digits.tolist() == [3, 5, 7, NOT_OPEN]
+    assert np.diff(new_ts).tolist() == [60, 60, 60]
+    assert cache.generation == 0
+    # Views handed out earlier keep their contents
+    assert digits.tolist() == [3, 5]
+    assert open_digits(new_digits).tolist() == [3, 5, 7]
+    assert since(new_ts, new_digits, int(new_ts[1]))[1].tolist() == [7, NOT_OPEN]
+
+
+def test_back_filled_draws_reload(store):
+    store.insert([row(5, '1'), row(6, '2')])
+    cache = SeriesCache(store)
+    cache.arrays()
+    store.insert([row(4, '9')])
+    assert cache.arrays()[1].tolist() == [9, 1, 2]
+    assert cache.generation == 1
+
+
+def test_filled_placeholders(store):
+    store.insert([row(1, '3'), row(2, 'NOT OPEN'), row(3, '4'), row(4, 'NOT OPEN')])
+    cache = SeriesCache(store)
+    before = cache.arrays()[1]
+
+    # The trailing placeholder landing is not a change to the open draws before it
+    store.insert([row(4, '8')])
+    assert cache.arrays()[1].tolist() == [3, NOT_OPEN, 4, 8]
+    assert cache.generation == 0
+
+    store.insert([row(2, '6')])
+    assert cache.arrays()[1].tolist() == [3, 6, 4, 8]
+    assert cache.generation == 1
+    assert before.tolist() == [3, NOT_OPEN, 4, NOT_OPEN]
+
+
+def test_between(store):
+    store.insert([row(m, str(m)) for m in range(1, 6)])
+    cache = SeriesCache(store)
+    ts, _ = cache.arrays()
+    assert cache.between(int(ts[1]), int(ts[3]))[1].tolist() == [2, 3, 4]
+    assert cache.between(end=int(ts[0]))[1].tolist() == [1]
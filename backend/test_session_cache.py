@@ -0,0 +1,55 @@
+"""
+Saved login sessions: expiry, cookie expiry and credential checks.
+
+Run from backend/: python -m pytest -q
+"""
+import os
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from session_cache import SessionCache
+
+COOKIES = [{'name': 'ASP.NET_SessionId', 'value': 'abc', 'domain': 'site.test'}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1765276713.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SessionCache(str(tmp_path / 'sessions'), Fernet.generate_key(), ttl=600)
+
+
+def test_saved_session_expires_after_ttl(cache, clock):
+    cache.save('user', 'pass', COOKIES, 'http://site.test/data')
+    clock[0] += 599
+    assert cache.load('user', 'pass') == {'cookies': COOKIES, 'url': 'http://site.test/data'}
+    clock[0] += 2
+    assert cache.load('user', 'pass') is None
+    assert os.listdir(cache.directory) == []
+
+
+def test_expired_cookies_are_dropped(cache, clock):
+    cookies = COOKIES + [{'name': 'auth', 'value': 'x', 'expiry': clock[0] + 60}]
+    cache.save('user', 'pass', cookies, 'http://site.test/data')
+    assert cache.load('user', 'pass')['cookies'] == cookies
+    clock[0] += 61
+    assert cache.load('user', 'pass')['cookies'] == COOKIES
+
+    cache.save('user', 'pass', cookies[1:], 'http://site.test/data')
+    assert cache.load('user', 'pass') is None
+
+
+def test_session_needs_both_credentials_and_the_key(cache, clock):
+    cache.save('user', 'pass', COOKIES, 'http://site.test/data')
+    assert cache.load('user', 'wrong') is None
+    other = SessionCache(cache.directory, Fernet.generate_key())
+    assert other.load('user', 'pass') is None
+    cache.drop('user', 'pass')
+    assert cache.load('user', 'pass') is None
@@ -0,0 +1,77 @@
+"""
+Draw store: NOT OPEN placeholders, the sync point and incremental row splitting.
+
+Run from backend/: python -m pytest -q
+"""
+import datetime
+
+import pytest
+
+from storage import DrawStore, _digit, from_epoch, split_new_rows, to_epoch
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DrawStore(str(tmp_path / 'draws.db'))
+
+
+def epoch(date, time_of_day):
+    return to_epoch(datetime.datetime.strptime(f"{date} {time_of_day}", '%d-%b-%Y %I:%M:%S %p'))
+
+
+def test_insert_skips_stored_draws(store):
+    rows = [('3', '09-DEC-2025', '10:00:00 AM'), ('7', '09-DEC-2025', '10:01:00 AM')]
+    assert store.insert(rows) == 2
+    assert store.insert(rows + [('1', 'bad date', '10:02:00 AM')]) == 0
+    assert store.count() == 2
+    assert store.changes == 2
+
+
+def test_not_open_row_is_filled_in(store):
+    assert store.insert([('NOT OPEN', '09-DEC-2025', '10:00:00 AM')]) == 1
+    # Another placeholder doesn't count as a change
+    assert store.insert([('NOT OPEN', '09-DEC-2025', '10:00:00 AM')]) == 0
+    assert store.insert([('4', '09-DEC-2025', '10:00:00 AM')]) == 1
+    # A stored digit is never overwritten
+    assert store.insert([('5', '09-DEC-2025', '10:00:00 AM')]) == 0
+    assert store.insert([('NOT OPEN', '09-DEC-2025', '10:00:00 AM')]) == 0
+    assert store.changes == 2
+    assert store.series() == [(epoch('09-DEC-2025', '10:00:00 AM'), 4)]
+
+
+def test_superscript_is_not_a_digit(store):
+    assert _digit(' 7 ') == 7
+    assert _digit('²') is None
+    assert store.insert([('²', '09-DEC-2025', '10:00:00 AM')]) == 1
+    assert store.series() == [(epoch('09-DEC-2025', '10:00:00 AM'), None)]
+
+
+def test_latest_skips_placeholders(store):
+    assert store.latest() is None
+    store.insert([('NOT OPEN', '09-DEC-2025', '10:01:00 AM')])
+    assert store.latest() is None
+    store.insert([('2', '09-DEC-2025', '10:00:00 AM')])
+    assert store.latest() == datetime.datetime(2025, 12, 9, 10, 0, 0)
+    store.insert([('8', '09-DEC-2025', '10:01:00 AM')])
+    assert store.latest() == datetime.datetime(2025, 12, 9, 10, 1, 0)
+
+
+def test_digits_at(store):
+    store.insert([('2', '09-DEC-2025', '10:00:00 AM'), ('NOT OPEN', '09-DEC-2025', '10:01:00 AM')])
+    first, second = epoch('09-DEC-2025', '10:00:00 AM'), epoch('09-DEC-2025', '10:01:00 AM')
+    assert store.digits_at([first, second, second + 60]) == [(first, 2)]
+    assert from_epoch(first) == datetime.datetime(2025, 12, 9, 10, 0, 0)
+
+
+def test_split_new_rows():
+    rows = [
+        ('5', '09-DEC-2025', '10:03:00 AM'),
+        ('4', '09-DEC-2025', '10:02:00 AM'),
+        ('3', '09-DEC-2025', '10:01:00 AM'),
+        ('2', '09-DEC-2025', '10:00:00 AM'),
+    ]
+    last_synced = datetime.datetime(2025, 12, 9, 10, 1, 0)
+    assert split_new_rows(rows, last_synced) == (rows[:2], True)
+    assert split_new_rows(rows[:2], last_synced) == (rows[:2], False)
+    # Unparseable rows are kept; the store skips them
+    assert split_new_rows([('1', '', '')] + rows, last_synced) == ([('1', '', '')] + rows[:2], True)
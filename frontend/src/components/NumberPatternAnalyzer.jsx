@@ -31,6 +31,8 @@ const NumberPatternAnalyzer = () => {
   const [isConnecting, setIsConnecting] = useState(false);
   const [connectError, setConnectError] = useState('');
   const [connectLogs, setConnectLogs] = useState([]);
+  const [serverPrediction, setServerPrediction] = useState(null);
+  const [serverFailed, setServerFailed] = useState(false);
 
 
   const handleTextInput = (text) => {
@@ -70,6 +72,8 @@ const NumberPatternAnalyzer = () => {
     });
 
     const eventSource = new EventSource(`${API_URL}/api/scrape/stream?${params}`);
+    // Draws received so far, newest first (pages arrive newest first)
+    const collected = [];
 
     eventSource.onmessage = (event) => {
       try {
@@ -77,18 +81,21 @@ const NumberPatternAnalyzer = () => {
 
         if (data.type === 'log') {
           setConnectLogs(prev => [...prev, { message: data.message, type: data.log_type }]);
+        } else if (data.type === 'queued') {
+          setConnectLogs(prev => [...prev, { message: data.message, type: 'info' }]);
+        } else if (data.type === 'records') {
+          const numbers = data.data.Number.map(n => parseInt(n)).filter(n => !isNaN(n) && n >= 0 && n <= 9);
+          collected.push(...numbers);
+          // Show what has arrived so far, oldest first, newest last
+          const orderedNumbers = [...collected].reverse();
+          setTextInput(orderedNumbers.join(', '));
+          setData(orderedNumbers);
         } else if (data.type === 'error') {
           setConnectError(data.message);
           setIsConnecting(false);
           eventSource.close();
         } else if (data.type === 'complete') {
-          // Extract numbers from the scraped data (oldest first, newest last)
-          const numbers = data.data.data.Number.map(n => parseInt(n)).filter(n => !isNaN(n) && n >= 0 && n <= 9);
-          // Reverse to get oldest first, newest last
-          const orderedNumbers = numbers.reverse();
-          const numbersText = orderedNumbers.join(', ');
-          setTextInput(numbersText);
-          setData(orderedNumbers);
+          // The draws already arrived as records events; this is just the summary
           setIsConnecting(false);
           eventSource.close();
           // Keep modal open to show completion, user can close manually
@@ -105,57 +112,94 @@ const NumberPatternAnalyzer = () => {
     };
   };
 
+  // The ensemble runs on the backend (/api/predict) so long histories don't
+  // freeze the browser. The methods below only run here when the backend
+  // can't be reached, or for the Deep Analysis tab.
+  useEffect(() => {
+    if (data.length < 20) {
+      setServerPrediction(null);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      fetch(`${API_URL}/api/predict`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ numbers: data }),
+        signal: controller.signal
+      })
+        .then(response => {
+          if (!response.ok) throw new Error(`HTTP ${response.status}`);
+          return response.json();
+        })
+        .then(result => {
+          setServerPrediction(result);
+          setServerFailed(false);
+        })
+        .catch(e => {
+          if (e.name !== 'AbortError') setServerFailed(true);
+        });
+    }, 300);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [data]);
+
+  const computeLocally = serverFailed || activeTab === 'analysis';
+  const localData = useMemo(() => (computeLocally ? data : []), [computeLocally, data]);
+
   // Use imported prediction methods
-  const higherOrderMarkov = useMemo(() => calculateHigherOrderMarkov(data), [data]);
+  const higherOrderMarkov = useMemo(() => calculateHigherOrderMarkov(localData), [localData]);
 
   const variableOrderMarkov = useMemo(() =>
-    calculateVariableOrderMarkov(data, higherOrderMarkov),
-    [data, higherOrderMarkov]
+    calculateVariableOrderMarkov(localData, higherOrderMarkov),
+    [localData, higherOrderMarkov]
   );
 
   const kneserNeySmoothing = useMemo(() =>
-    calculateKneserNeySmoothing(data, higherOrderMarkov),
-    [data, higherOrderMarkov]
+    calculateKneserNeySmoothing(localData, higherOrderMarkov),
+    [localData, higherOrderMarkov]
   );
 
   const recencyWeightedMarkov = useMemo(() =>
-    calculateRecencyWeightedMarkov(data),
-    [data]
+    calculateRecencyWeightedMarkov(localData),
+    [localData]
   );
 
   const patternCompletion = useMemo(() =>
-    calculatePatternCompletion(data),
-    [data]
+    calculatePatternCompletion(localData),
+    [localData]
   );
 
   const positionalPatterns = useMemo(() =>
-    calculatePositionalPatterns(data),
-    [data]
+    calculatePositionalPatterns(localData),
+    [localData]
   );
 
   const sequenceMomentum = useMemo(() =>
-    calculateSequenceMomentum(data),
-    [data]
+    calculateSequenceMomentum(localData),
+    [localData]
   );
 
   const entropyWeighting = useMemo(() =>
-    calculateEntropyWeighting(data),
-    [data]
+    calculateEntropyWeighting(localData),
+    [localData]
   );
 
   const changePointDetection = useMemo(() =>
-    calculateChangePointDetection(data),
-    [data]
+    calculateChangePointDetection(localData),
+    [localData]
   );
 
   const bayesianAveraging = useMemo(() =>
-    calculateBayesianAveraging(data, higherOrderMarkov, kneserNeySmoothing, recencyWeightedMarkov),
-    [data, higherOrderMarkov, kneserNeySmoothing, recencyWeightedMarkov]
+    calculateBayesianAveraging(localData, higherOrderMarkov, kneserNeySmoothing, recencyWeightedMarkov),
+    [localData, higherOrderMarkov, kneserNeySmoothing, recencyWeightedMarkov]
   );
 
-  const ensemblePrediction = useMemo(() =>
+  const localEnsemblePrediction = useMemo(() =>
     calculateEnsemblePrediction(
-      data,
+      localData,
       higherOrderMarkov,
       variableOrderMarkov,
       kneserNeySmoothing,
@@ -166,11 +210,13 @@ const NumberPatternAnalyzer = () => {
       entropyWeighting,
       changePointDetection
     ),
-    [data, higherOrderMarkov, variableOrderMarkov, kneserNeySmoothing,
+    [localData, higherOrderMarkov, variableOrderMarkov, kneserNeySmoothing,
       recencyWeightedMarkov, patternCompletion, positionalPatterns,
       sequenceMomentum, entropyWeighting, changePointDetection]
   );
 
+  const ensemblePrediction = serverFailed ? localEnsemblePrediction : serverPrediction;
+
   const basicStats = useMemo(() => {
     if (data.length === 0) return { frequency: [], mean: 0 };
     const frequency = Array(10).fill(0);